@@ -0,0 +1 @@
+"""Benchmarks for pdj-sitegen, see `benchmarks/README.md`"""
@@ -0,0 +1,112 @@
+"""Compare two results files written by `benchmarks.run`
+
+usage:
+
+	python -m benchmarks.compare baseline.json new.json
+
+prints, per scenario, wall time, pages/sec and peak RSS of both runs with the
+relative change, then the same for each stage. Changes smaller than
+`--threshold` percent are not marked.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+
+def _pct(old: float | None, new: float | None) -> float | None:
+	if old is None or new is None or old == 0:
+		return None
+	return (new - old) / old * 100
+
+
+def _row(
+	name: str, old: float | None, new: float | None, threshold: float, unit: str = ""
+) -> str:
+	def fmt(value: float | None) -> str:
+		return "-" if value is None else f"{value:.3f}{unit}"
+
+	pct: float | None = _pct(old, new)
+	change: str = "" if pct is None else f"{pct:+7.1f}%"
+	mark: str = " *" if pct is not None and abs(pct) >= threshold else ""
+	return f"  {name:<28}{fmt(old):>14}{fmt(new):>14}{change:>10}{mark}"
+
+
+def compare(
+	baseline: dict[str, Any], new: dict[str, Any], threshold: float = 5.0
+) -> str:
+	"""human-readable comparison of two `benchmarks.run` results"""
+	lines: list[str] = []
+	for label, results in (("baseline", baseline), ("new", new)):
+		meta: dict[str, Any] = results["meta"]
+		lines.append(
+			f"{label:<9} {meta['commit'][:10]}{' (dirty)' if meta['dirty'] else ''}"
+			f"  {meta['timestamp']}  size={meta['size']}  jobs={meta['jobs']}"
+			f"  fake_pandoc={meta['fake_pandoc']}"
+		)
+	if baseline["meta"]["spec"] != new["meta"]["spec"]:
+		lines.append("warning: the runs used different site specs")
+
+	for scenario, new_result in new["scenarios"].items():
+		old_result: dict[str, Any] | None = baseline["scenarios"].get(scenario)
+		if old_result is None:
+			continue
+		lines += ["", f"{scenario}:", f"  {'':<28}{'baseline':>14}{'new':>14}"]
+		lines.append(
+			_row("wall", old_result["wall"], new_result["wall"], threshold, "s")
+		)
+		lines.append(
+			_row(
+				"pages/sec",
+				old_result["pages_per_sec"],
+				new_result["pages_per_sec"],
+				threshold,
+			)
+		)
+		lines.append(
+			_row(
+				"peak RSS (MB)",
+				old_result["peak_rss_mb"],
+				new_result["peak_rss_mb"],
+				threshold,
+			)
+		)
+		for stage, new_stage in new_result["stages"].items():
+			old_stage: dict[str, float] | None = old_result["stages"].get(stage)
+			lines.append(
+				_row(
+					f"{stage} (wall)",
+					None if old_stage is None else old_stage["wall"],
+					new_stage["wall"],
+					threshold,
+					"s",
+				)
+			)
+	return "\n".join(lines)
+
+
+def main() -> None:
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(
+		description="Compare two pdj-sitegen benchmark results.",
+	)
+	parser.add_argument("baseline", type=Path, help="results of the baseline run")
+	parser.add_argument("new", type=Path, help="results of the run to compare")
+	parser.add_argument(
+		"--threshold",
+		type=float,
+		default=5.0,
+		help="mark changes of at least this many percent (default: 5)",
+	)
+	args: argparse.Namespace = parser.parse_args()
+	print(
+		compare(
+			json.loads(args.baseline.read_text(encoding="utf-8")),
+			json.loads(args.new.read_text(encoding="utf-8")),
+			threshold=args.threshold,
+		)
+	)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,143 @@
+"""Time the filter executables, which pandoc starts once per page
+
+Each command is run `--repeat` times on the same pandoc JSON document, fed
+on stdin as pandoc does, and the per-invocation wall time is reported. The
+commands import the filter the same way the `pdj-links-md2html` and
+`pdj-csv-code-table` scripts do. `python` (an empty interpreter) is the floor
+every filter pays, and `links_md2html (pandocfilters)` runs the same filter
+function through `pandocfilters.toJSONFilter`, for reference, if installed.
+
+usage:
+
+	python -m benchmarks.filter_startup [--repeat 20] [--paragraphs 50] [-o results.json]
+
+the document is synthetic, so pandoc does not need to be installed.
+"""
+
+import argparse
+import importlib.util
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+FILTER_COMMANDS: dict[str, str] = {
+	"python": "pass",
+	"links_md2html": "from pdj_sitegen.filters.links_md2html import main; main()",
+	"csv_code_table": "from pdj_sitegen.filters.csv_code_table import main; main()",
+}
+"""Python statements to time, by name."""
+
+PANDOCFILTERS_COMMAND: str = (
+	"import pandocfilters; "
+	"from pdj_sitegen.filters.links_md2html import links_md2html; "
+	"pandocfilters.toJSONFilter(links_md2html)"
+)
+
+
+def sample_document(n_paragraphs: int) -> dict[str, Any]:
+	"""a pandoc JSON document with paragraphs of text and links, and one CSV table"""
+
+	def text(words: str) -> list[dict[str, Any]]:
+		inlines: list[dict[str, Any]] = []
+		for word in words.split():
+			if inlines:
+				inlines.append({"t": "Space"})
+			inlines.append({"t": "Str", "c": word})
+		return inlines
+
+	blocks: list[dict[str, Any]] = []
+	for i in range(n_paragraphs):
+		link: dict[str, Any] = {
+			"t": "Link",
+			"c": [["", [], []], text(f"page {i}"), [f"section/page_{i}.md", ""]],
+		}
+		blocks.append(
+			{
+				"t": "Para",
+				"c": [*text("some words before a link to"), {"t": "Space"}, link],
+			}
+		)
+	blocks.append(
+		{
+			"t": "CodeBlock",
+			"c": [
+				["", ["csv_table"], [["header", "1"]]],
+				"\n".join(f"{i},name {i},{i * 2.5}" for i in range(20)),
+			],
+		}
+	)
+	return {"pandoc-api-version": [1, 23, 1], "meta": {}, "blocks": blocks}
+
+
+def time_command(statement: str, stdin: bytes, repeat: int) -> list[float]:
+	"""wall time in seconds of each of `repeat` runs of `python -c statement`"""
+	times: list[float] = []
+	for _ in range(repeat):
+		start: float = time.perf_counter()
+		subprocess.run(
+			[sys.executable, "-c", statement, "html"],
+			input=stdin,
+			capture_output=True,
+			check=True,
+		)
+		times.append(time.perf_counter() - start)
+	return times
+
+
+def run(repeat: int, n_paragraphs: int) -> dict[str, dict[str, float]]:
+	"""time every command, returning mean, median and min in milliseconds"""
+	stdin: bytes = json.dumps(sample_document(n_paragraphs)).encode("utf-8")
+	commands: dict[str, str] = dict(FILTER_COMMANDS)
+	if importlib.util.find_spec("pandocfilters") is not None:
+		commands["links_md2html (pandocfilters)"] = PANDOCFILTERS_COMMAND
+
+	results: dict[str, dict[str, float]] = {}
+	for name, statement in commands.items():
+		# the first run warms up the filesystem and bytecode caches
+		time_command(statement, stdin, 1)
+		times: list[float] = time_command(statement, stdin, repeat)
+		results[name] = {
+			"mean_ms": statistics.mean(times) * 1000,
+			"median_ms": statistics.median(times) * 1000,
+			"min_ms": min(times) * 1000,
+		}
+	return results
+
+
+def main() -> None:
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(
+		description="Time the startup and run time of the pdj-sitegen pandoc filters.",
+	)
+	parser.add_argument(
+		"--repeat", type=int, default=20, help="runs per command (default: 20)"
+	)
+	parser.add_argument(
+		"--paragraphs",
+		type=int,
+		default=50,
+		help="paragraphs with a link in the sample document (default: 50)",
+	)
+	parser.add_argument(
+		"-o", "--output", type=Path, default=None, help="also write results as JSON"
+	)
+	args: argparse.Namespace = parser.parse_args()
+
+	results: dict[str, dict[str, float]] = run(args.repeat, args.paragraphs)
+	print(f"  {'':<32}{'mean':>10}{'median':>10}{'min':>10}")
+	for name, result in results.items():
+		print(
+			f"  {name:<32}{result['mean_ms']:>8.1f}ms{result['median_ms']:>8.1f}ms"
+			f"{result['min_ms']:>8.1f}ms"
+		)
+	if args.output is not None:
+		args.output.parent.mkdir(parents=True, exist_ok=True)
+		args.output.write_text(json.dumps(results, indent="\t"), encoding="utf-8")
+		print(f"results written to '{args.output}'")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,413 @@
+"""Generate a synthetic site in the style of `site_src`, at any size
+
+The output is fully determined by the `SiteSpec`, so the same spec always
+produces the same site and benchmark results can be compared across commits.
+
+Layout of a generated site:
+
+- `config.yml`
+- `templates/` : `default.html.jinja2`, plus `base.html.jinja2` and
+  `macros.html.jinja2` for `template_complexity=2`
+- `content/index.md` : lists every section, uses `docs`
+- `content/section_XXXX/_index.md` : lists its pages, uses `child_docs_folder`
+- `content/section_XXXX/page_XXXXXX.md` : pages with `frontmatter_keys` extra
+  frontmatter keys, and a CSV table on every `csv_every`-th page
+- `content/resources/` : `n_assets` asset files
+
+usage:
+
+	python -m benchmarks.generate_site OUT_DIR [--size 1k] [--pages N] ...
+"""
+
+import argparse
+import json
+import random
+import shutil
+from dataclasses import asdict, dataclass, fields, replace
+from pathlib import Path
+
+WORDS: list[str] = [
+	"lorem",
+	"ipsum",
+	"dolor",
+	"sit",
+	"amet",
+	"consectetur",
+	"adipiscing",
+	"elit",
+	"sed",
+	"do",
+	"eiusmod",
+	"tempor",
+	"incididunt",
+	"ut",
+	"labore",
+	"et",
+	"dolore",
+	"magna",
+	"aliqua",
+	"enim",
+	"ad",
+	"minim",
+	"veniam",
+	"quis",
+	"nostrud",
+	"exercitation",
+	"ullamco",
+	"laboris",
+	"nisi",
+	"aliquip",
+	"ex",
+	"ea",
+	"commodo",
+	"consequat",
+	"duis",
+	"aute",
+	"irure",
+	"in",
+	"reprehenderit",
+	"voluptate",
+	"velit",
+	"esse",
+	"cillum",
+	"eu",
+	"fugiat",
+	"nulla",
+	"pariatur",
+]
+
+
+@dataclass(frozen=True)
+class SiteSpec:
+	"""parameters of a generated site
+
+	# Attributes:
+	 - `n_pages : int` - number of regular pages, not counting index pages
+	 - `pages_per_section : int` - pages per section directory
+	 - `frontmatter_keys : int` - extra frontmatter keys per page
+	 - `paragraphs : int` - body paragraphs per page
+	 - `template_complexity : int` - 0: bare template, 1: like `site_src`, 2: inheritance, includes and macros
+	 - `csv_every : int` - every n-th page gets a CSV table, 0 for none
+	 - `csv_rows : int` - rows per CSV table
+	 - `n_assets : int` - number of asset files
+	 - `asset_size : int` - bytes per asset file
+	 - `seed : int` - random seed
+	"""
+
+	n_pages: int = 1000
+	pages_per_section: int = 100
+	frontmatter_keys: int = 5
+	paragraphs: int = 5
+	template_complexity: int = 1
+	csv_every: int = 10
+	csv_rows: int = 20
+	n_assets: int = 100
+	asset_size: int = 4096
+	seed: int = 0
+
+
+PRESETS: dict[str, SiteSpec] = {
+	"1k": SiteSpec(n_pages=1_000),
+	"10k": SiteSpec(n_pages=10_000, n_assets=1_000),
+	"50k": SiteSpec(n_pages=50_000, pages_per_section=250, n_assets=5_000),
+}
+"""Named site sizes."""
+
+TEMPLATE_BARE: str = """\
+<!DOCTYPE html>
+<html><head><title>{{ frontmatter.title }}</title></head>
+<body>{{ __content__ }}</body></html>
+"""
+
+TEMPLATE_SITE_SRC: str = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>{{ frontmatter.title }} - {{ config.globals_.site_name }}</title>
+    <link rel="stylesheet" href="{{ file_meta.path_to_root }}/resources/style.css">
+</head>
+<body>
+    <nav class="nav">
+        <a class="nav" href="{{ file_meta.path_to_root }}/index.html">Home</a>
+        {% for link in config.globals_.nav %}
+        <a class="nav" href="{{ file_meta.path_to_root }}/{{ link }}">{{ link }}</a>
+        {% endfor %}
+    </nav>
+    <main>
+        {{ __content__ | safe }}
+    </main>
+    {% if frontmatter.tags %}
+    <footer>
+        <p>tags: {{ frontmatter.tags | join(", ") }}</p>
+        <p>modified: {{ file_meta.modified_time_str }}</p>
+    </footer>
+    {% endif %}
+</body>
+</html>
+"""
+
+TEMPLATE_BASE: str = """\
+{% import "macros.html.jinja2" as macros %}
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>{% block title %}{{ config.globals_.site_name }}{% endblock %}</title>
+    <link rel="stylesheet" href="{{ file_meta.path_to_root }}/resources/style.css">
+</head>
+<body>
+    <nav class="nav">{{ macros.nav(config.globals_.nav, file_meta.path_to_root) }}</nav>
+    <main>{% block main %}{% endblock %}</main>
+    <footer>{% block footer %}{% endblock %}</footer>
+</body>
+</html>
+"""
+
+TEMPLATE_MACROS: str = """\
+{% macro nav(links, root) %}
+<a class="nav" href="{{ root }}/index.html">Home</a>
+{% for link in links %}<a class="nav" href="{{ root }}/{{ link }}">{{ link | title }}</a>{% endfor %}
+{% endmacro %}
+
+{% macro meta_table(frontmatter) %}
+<table class="meta">
+{% for key, value in frontmatter | dictsort %}
+{% if not key.startswith("__") %}
+<tr><th>{{ key }}</th><td>{{ value if value is string else value | tojson }}</td></tr>
+{% endif %}
+{% endfor %}
+</table>
+{% endmacro %}
+
+{% macro tag_list(tags) %}
+<ul class="tags">{% for tag in tags | sort %}<li>{{ tag | upper }}</li>{% endfor %}</ul>
+{% endmacro %}
+"""
+
+TEMPLATE_EXTENDS: str = """\
+{% extends "base.html.jinja2" %}
+{% import "macros.html.jinja2" as macros %}
+{% block title %}{{ frontmatter.title }} - {{ super() }}{% endblock %}
+{% block main %}
+{{ macros.meta_table(frontmatter) }}
+{{ __content__ | safe }}
+{% endblock %}
+{% block footer %}
+{% if frontmatter.tags %}{{ macros.tag_list(frontmatter.tags) }}{% endif %}
+<p>modified: {{ file_meta.modified_time_str }}</p>
+{% endblock %}
+"""
+
+INDEX_BODY: str = """\
+# {{ frontmatter.title }}
+
+{% for key, doc in docs.items() if key.endswith("/_index") %}
+- [{{ doc.frontmatter.title }}]({{ doc.file_meta.path_html }})
+{% endfor %}
+"""
+
+SECTION_BODY: str = """\
+# {{ frontmatter.title }}
+
+{% for key, doc in child_docs_folder.items() | sort %}
+- [{{ doc.frontmatter.title }}]({{ doc.file_meta.path_html }}): {{ doc.frontmatter.description }}
+{% endfor %}
+"""
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+	words: list[str] = rng.choices(WORDS, k=n_words)
+	return " ".join(words).capitalize() + "."
+
+
+def _frontmatter(fields_: dict[str, object]) -> str:
+	# JSON values are valid YAML, and avoid depending on a YAML emitter here
+	lines: list[str] = [f"{key}: {json.dumps(value)}" for key, value in fields_.items()]
+	return "---\n" + "\n".join(lines) + "\n---\n"
+
+
+def page_content(spec: SiteSpec, idx: int) -> str:
+	"""markdown source of the regular page with index `idx`"""
+	rng: random.Random = random.Random(f"{spec.seed}-page-{idx}")
+	fm: dict[str, object] = {
+		"title": _sentence(rng, 4).rstrip("."),
+		"description": _sentence(rng, 12),
+		"date": f"20{rng.randint(10, 29)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+		"tags": rng.sample(WORDS, k=3),
+	}
+	for key_idx in range(spec.frontmatter_keys):
+		fm[f"extra_{key_idx}"] = _sentence(rng, 6)
+
+	body: list[str] = ["# {{ frontmatter.title }}\n\n{{ frontmatter.description }}\n"]
+	for par_idx in range(spec.paragraphs):
+		if par_idx % 3 == 1:
+			body.append(f"## {_sentence(rng, 3).rstrip('.')}\n")
+		body.append(
+			" ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(4)) + "\n"
+		)
+	body.append(
+		"```python\n"
+		+ "\n".join(f"{w} = {rng.randint(0, 999)}" for w in rng.sample(WORDS, k=4))
+		+ "\n```\n"
+	)
+	if spec.csv_every and idx % spec.csv_every == 0:
+		rows: list[str] = ["name,count,value"]
+		rows += [
+			f"{rng.choice(WORDS)},{rng.randint(0, 1000)},{rng.random():.4f}"
+			for _ in range(spec.csv_rows)
+		]
+		body.append(
+			'```{.csv_table header=1 aligns=LRR caption="generated table"}\n'
+			+ "\n".join(rows)
+			+ "\n```\n"
+		)
+	return _frontmatter(fm) + "\n" + "\n".join(body)
+
+
+def page_path(spec: SiteSpec, idx: int) -> str:
+	"""path of the regular page with index `idx`, relative to the content directory"""
+	return f"section_{idx // spec.pages_per_section:04d}/page_{idx:06d}.md"
+
+
+def config_text(spec: SiteSpec) -> str:
+	"""contents of `config.yml` for a generated site"""
+	pandoc: str = (
+		"__pandoc__:\n  filter:\n    - csv_code_table\n" if spec.csv_every else ""
+	)
+	return (
+		"content_dir: content\n"
+		"templates_dir: templates\n"
+		"default_template: default.html.jinja2\n"
+		"output_dir: output\n"
+		"cache_dir: .pdj-sitegen/cache\n"
+		"jinja_env_kwargs:\n  trim_blocks: true\n  lstrip_blocks: true\n"
+		"pandoc_fmt_from: markdown+smart-yaml_metadata_block\n"
+		"pandoc_fmt_to: html\n" + pandoc + "globals_:\n"
+		"  site_name: Generated Site\n"
+		"  nav:\n    - about.html\n    - blog.html\n    - projects.html\n"
+	)
+
+
+def _write(path: Path, text: str) -> None:
+	"""write `text` to `path`, leaving it (and its mtime) alone if unchanged"""
+	if path.exists() and path.read_text(encoding="utf-8") == text:
+		return
+	path.write_text(text, encoding="utf-8")
+
+
+def generate_site(out_dir: Path, spec: SiteSpec, clean: bool = True) -> int:
+	"""write a generated site to `out_dir`
+
+	     # Parameters:
+	      - `out_dir : Path` - directory for the site, containing `config.yml`
+	      - `spec : SiteSpec` - what to generate
+	      - `clean : bool` - remove `out_dir` first. otherwise only files that
+	differ from the generated ones are rewritten, undoing edits
+
+	     # Returns:
+	      - `int` - total number of markdown files, including index pages
+	"""
+	if clean and out_dir.exists():
+		shutil.rmtree(out_dir)
+	content_dir: Path = out_dir / "content"
+	templates_dir: Path = out_dir / "templates"
+	resources_dir: Path = content_dir / "resources"
+	for d in (content_dir, templates_dir, resources_dir):
+		d.mkdir(parents=True, exist_ok=True)
+
+	_write(out_dir / "config.yml", config_text(spec))
+
+	if spec.template_complexity <= 0:
+		_write(templates_dir / "default.html.jinja2", TEMPLATE_BARE)
+	elif spec.template_complexity == 1:
+		_write(templates_dir / "default.html.jinja2", TEMPLATE_SITE_SRC)
+	else:
+		_write(templates_dir / "base.html.jinja2", TEMPLATE_BASE)
+		_write(templates_dir / "macros.html.jinja2", TEMPLATE_MACROS)
+		_write(templates_dir / "default.html.jinja2", TEMPLATE_EXTENDS)
+
+	_write(
+		content_dir / "index.md",
+		_frontmatter({"title": "Home", "tags": ["index"]}) + "\n" + INDEX_BODY,
+	)
+	n_sections: int = -(-spec.n_pages // spec.pages_per_section)
+	for section_idx in range(n_sections):
+		section_dir: Path = content_dir / f"section_{section_idx:04d}"
+		section_dir.mkdir(exist_ok=True)
+		_write(
+			section_dir / "_index.md",
+			_frontmatter(
+				{
+					"title": f"Section {section_idx}",
+					"description": f"section {section_idx}",
+					"tags": ["index"],
+				}
+			)
+			+ "\n"
+			+ SECTION_BODY,
+		)
+	for idx in range(spec.n_pages):
+		_write(content_dir / page_path(spec, idx), page_content(spec, idx))
+
+	_write(resources_dir / "style.css", "body { font-family: sans-serif; }\n")
+	asset_rng: random.Random = random.Random(f"{spec.seed}-assets")
+	for asset_idx in range(spec.n_assets):
+		ext: str = ("png", "svg", "css", "json")[asset_idx % 4]
+		subdir: Path = resources_dir / f"assets_{asset_idx // 500:03d}"
+		subdir.mkdir(exist_ok=True)
+		asset: Path = subdir / f"asset_{asset_idx:06d}.{ext}"
+		data: bytes = asset_rng.randbytes(spec.asset_size)
+		# assets are never edited by the benchmarks
+		if not asset.exists():
+			asset.write_bytes(data)
+
+	return spec.n_pages + n_sections + 1
+
+
+def spec_from_args(args: argparse.Namespace) -> SiteSpec:
+	"""a preset, with any `SiteSpec` field given on the command line overridden"""
+	spec: SiteSpec = PRESETS[args.size]
+	overrides: dict[str, int] = {
+		f.name: getattr(args, f.name)
+		for f in fields(SiteSpec)
+		if getattr(args, f.name, None) is not None
+	}
+	return replace(spec, **overrides)
+
+
+def add_spec_args(parser: argparse.ArgumentParser) -> None:
+	"""add `--size` and one option per `SiteSpec` field"""
+	parser.add_argument(
+		"--size",
+		choices=sorted(PRESETS),
+		default="1k",
+		help="preset site size (default: 1k)",
+	)
+	for f in fields(SiteSpec):
+		parser.add_argument(
+			f"--{f.name.replace('_', '-')}",
+			dest=f.name,
+			type=int,
+			default=None,
+			help=f"override `{f.name}` of the preset",
+		)
+	# `--n-pages` reads badly, so also accept `--pages`
+	parser.add_argument("--pages", dest="n_pages", type=int, help=argparse.SUPPRESS)
+
+
+def main() -> None:
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(
+		description="Generate a synthetic pdj-sitegen site for benchmarking.",
+	)
+	parser.add_argument("out_dir", type=Path, help="directory to write the site to")
+	add_spec_args(parser)
+	args: argparse.Namespace = parser.parse_args()
+	spec: SiteSpec = spec_from_args(args)
+	n_files: int = generate_site(args.out_dir, spec)
+	print(f"generated {n_files} markdown files in '{args.out_dir}'")
+	print(json.dumps(asdict(spec), indent=2))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,271 @@
+"""Run build scenarios on a generated site and write the results to JSON
+
+Scenarios, run in this order on the same site, each in a fresh process so
+that peak RSS is measured per scenario:
+
+- `cold` : no output, no cache, full build
+- `noop` : smart rebuild with nothing changed
+- `single_edit` : smart rebuild after editing the body of one page
+- `template_edit` : full rebuild after editing the default template
+
+Each scenario records wall time, pages converted, pages/sec (total pages over
+wall time), peak RSS of the build process and of its children (pandoc), and
+the per-stage timings from `pdj_sitegen.profiling`. Compare two result files
+with `python -m benchmarks.compare`.
+
+usage:
+
+	python -m benchmarks.run [--size 1k] [--jobs N] [--fake-pandoc] [-o results.json]
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from benchmarks.generate_site import (
+	SiteSpec,
+	add_spec_args,
+	generate_site,
+	page_path,
+	spec_from_args,
+)
+
+SCENARIOS: dict[str, bool] = {
+	"cold": False,
+	"noop": True,
+	"single_edit": True,
+	"template_edit": False,
+}
+"""Scenario names, mapped to whether they use smart rebuild."""
+
+REPO_ROOT: Path = Path(__file__).parent.parent
+
+
+def prepare_scenario(site_dir: Path, spec: SiteSpec, scenario: str) -> None:
+	"""make the changes a scenario measures, before the timed build"""
+	if scenario == "cold":
+		for path in ("output", ".pdj-sitegen"):
+			shutil.rmtree(site_dir / path, ignore_errors=True)
+		(site_dir / ".build_time").unlink(missing_ok=True)
+	elif scenario == "single_edit":
+		page: Path = site_dir / "content" / page_path(spec, spec.n_pages // 2)
+		with open(page, "a", encoding="utf-8") as f:
+			f.write("\nAn edited paragraph.\n")
+	elif scenario == "template_edit":
+		template: Path = site_dir / "templates" / "default.html.jinja2"
+		with open(template, "a", encoding="utf-8") as f:
+			f.write("\n<!-- edited -->\n")
+
+
+def run_scenario(
+	site_dir: Path,
+	spec: SiteSpec,
+	scenario: str,
+	jobs: int,
+	fake_pandoc: bool,
+	low_memory: bool = False,
+	executor: str = "async",
+) -> dict[str, Any]:
+	"""prepare and time one scenario in this process"""
+	import pypandoc  # type: ignore[import-untyped]
+
+	from pdj_sitegen.build import pipeline
+	from pdj_sitegen.profiling import peak_rss_mb, start_profiling, stop_profiling
+
+	if fake_pandoc:
+		pypandoc.convert_text = lambda source, to, format, extra_args: source
+		# with `--jobs`, pandoc runs as a subprocess without going through pypandoc
+		fake: Path = site_dir / "fake_pandoc"
+		fake.write_text(
+			f"#!{sys.executable}\nimport sys\nsys.stdout.write(sys.stdin.read())\n"
+		)
+		fake.chmod(0o755)
+		pypandoc.get_pandoc_path = lambda: str(fake)
+
+	prepare_scenario(site_dir, spec, scenario)
+	profiler = start_profiling()
+	start: float = time.perf_counter()
+	try:
+		pipeline(
+			config_path=site_dir / "config.yml",
+			verbose=False,
+			smart_rebuild=SCENARIOS[scenario],
+			jobs=jobs,
+			low_memory=low_memory,
+			executor=executor,
+		)
+	finally:
+		stop_profiling()
+	wall: float = time.perf_counter() - start
+	report: dict[str, Any] = profiler.report()
+	n_pages: int = report["stages"].get("frontmatter_render", {}).get("count", 0)
+	n_pages = max(n_pages, len(list((site_dir / "content").rglob("*.md"))))
+	peak_rss, peak_rss_children = peak_rss_mb()
+	return {
+		"wall": wall,
+		"pages_total": n_pages,
+		"pages_converted": report["stages"].get("page", {}).get("count", 0),
+		"pages_per_sec": n_pages / wall,
+		"peak_rss_mb": peak_rss,
+		"peak_rss_children_mb": peak_rss_children,
+		"stages": report["stages"],
+	}
+
+
+def _git_info() -> dict[str, Any]:
+	def git(*args: str) -> str:
+		return subprocess.run(
+			["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=False
+		).stdout.strip()
+
+	return {
+		"commit": git("rev-parse", "HEAD"),
+		"dirty": bool(git("status", "--porcelain")),
+	}
+
+
+def main() -> None:
+	parser: argparse.ArgumentParser = argparse.ArgumentParser(
+		description="Benchmark pdj-sitegen builds on a generated site.",
+	)
+	add_spec_args(parser)
+	parser.add_argument(
+		"--scenarios",
+		type=str,
+		default=",".join(SCENARIOS),
+		help=f"comma-separated scenarios to run (default: {','.join(SCENARIOS)})",
+	)
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="passed to the build")
+	parser.add_argument(
+		"--fake-pandoc",
+		action="store_true",
+		help="replace pandoc with a passthrough, to measure everything else",
+	)
+	parser.add_argument(
+		"--work-dir",
+		type=Path,
+		default=REPO_ROOT / "benchmarks" / ".sites",
+		help="where generated sites are kept (default: benchmarks/.sites)",
+	)
+	parser.add_argument(
+		"--regenerate",
+		action="store_true",
+		help="regenerate the site even if it exists",
+	)
+	parser.add_argument(
+		"-o",
+		"--output",
+		type=Path,
+		default=None,
+		help="results file (default: benchmarks/results/<commit>_<size>.json)",
+	)
+	parser.add_argument("--low-memory", action="store_true", help="passed to the build")
+	parser.add_argument(
+		"--executor",
+		choices=("async", "process"),
+		default="async",
+		help="passed to the build",
+	)
+	# internal: run a single scenario and print its result as JSON
+	parser.add_argument("--worker", type=str, default=None, help=argparse.SUPPRESS)
+	args: argparse.Namespace = parser.parse_args()
+	spec: SiteSpec = spec_from_args(args)
+
+	if args.worker is not None:
+		worker_args: dict[str, Any] = json.loads(args.worker)
+		result: dict[str, Any] = run_scenario(
+			site_dir=Path(worker_args["site_dir"]),
+			spec=spec,
+			scenario=worker_args["scenario"],
+			jobs=args.jobs,
+			fake_pandoc=args.fake_pandoc,
+			low_memory=args.low_memory,
+			executor=args.executor,
+		)
+		print(json.dumps(result))
+		return
+
+	scenarios: list[str] = [s for s in args.scenarios.split(",") if s]
+	for scenario in scenarios:
+		if scenario not in SCENARIOS:
+			parser.error(
+				f"unknown scenario '{scenario}', expected one of {list(SCENARIOS)}"
+			)
+
+	# sites are keyed by their spec, so changing any parameter regenerates
+	spec_hash: str = hashlib.sha1(
+		json.dumps(asdict(spec), sort_keys=True).encode()
+	).hexdigest()[:10]
+	site_dir: Path = args.work_dir / f"site_{spec.n_pages}_{spec_hash}"
+	if args.regenerate or not (site_dir / "config.yml").exists():
+		print(f"generating site in '{site_dir}'...")
+		generate_site(site_dir, spec)
+	else:
+		# undo edits made by previous runs
+		generate_site(site_dir, spec, clean=False)
+
+	git_info: dict[str, Any] = _git_info()
+	results: dict[str, Any] = {
+		"meta": {
+			**git_info,
+			"timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+			"python": platform.python_version(),
+			"platform": platform.platform(),
+			"size": args.size,
+			"spec": asdict(spec),
+			"jobs": args.jobs,
+			"fake_pandoc": args.fake_pandoc,
+			"low_memory": args.low_memory,
+			"executor": args.executor,
+		},
+		"scenarios": {},
+	}
+	for scenario in scenarios:
+		cmd: list[str] = [
+			sys.executable,
+			"-m",
+			"benchmarks.run",
+			*sys.argv[1:],
+			"--worker",
+			json.dumps({"site_dir": str(site_dir), "scenario": scenario}),
+		]
+		proc = subprocess.run(
+			cmd, cwd=REPO_ROOT, capture_output=True, text=True, check=False
+		)
+		if proc.returncode != 0:
+			print(proc.stdout, proc.stderr, sep="\n", file=sys.stderr)
+			raise SystemExit(f"scenario '{scenario}' failed")
+		result = json.loads(proc.stdout.strip().splitlines()[-1])
+		results["scenarios"][scenario] = result
+		print(
+			f"{scenario:<14} {result['wall']:8.3f}s  {result['pages_per_sec']:10.1f} pages/s"
+			f"  {result['pages_converted']:6} converted"
+			+ (
+				f"  peak RSS {result['peak_rss_mb']:.0f} MB"
+				if result["peak_rss_mb"] is not None
+				else ""
+			)
+		)
+
+	output: Path = args.output or (
+		REPO_ROOT
+		/ "benchmarks"
+		/ "results"
+		/ f"{git_info['commit'][:10] or 'nogit'}_{args.size}.json"
+	)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	output.write_text(json.dumps(results, indent="\t"), encoding="utf-8")
+	print(f"results written to '{output}'")
+
+
+if __name__ == "__main__":
+	main()
@@ -13,30 +13,50 @@ Pipeline:
 - Copy content files to output directory (based on copy_include/copy_exclude patterns)
 """
 
-import argparse
-import datetime
+import contextlib
 import fnmatch
 import functools
 import json
-import re
+import os
 import shutil
 import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from collections.abc import Callable, Iterable
-from typing import Any
-
-import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
-import tqdm
-from jinja2 import Environment, FileSystemLoader, Template
-from muutils.json_serialize import json_serialize
-from muutils.spinner import NoOpContextManager, SpinnerContext
-from bs4 import BeautifulSoup
-
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping
+from typing import TYPE_CHECKING, Any
+
+from pdj_sitegen.build_log import (
+	LOG_FORMATS,
+	BuildLog,
+	active_build_log,
+	start_build_log,
+	stop_build_log,
+)
+from pdj_sitegen.cache import (
+	TEMPLATE_BYTECODE_DIRNAME,
+	BuildCache,
+	FrontmatterEntry,
+	StatSignature,
+	hash_context,
+	hash_text,
+	load_page_times,
+	save_page_times,
+	stat_signature,
+)
 from pdj_sitegen.config import Config
+from pdj_sitegen.document import (
+	BodyRef,
+	Document,
+	FileMeta,
+	_normalize_newlines,
+	cached_bodies,
+	json_default,
+)
 from pdj_sitegen.consts import (
 	FORMAT_PARSERS,
 	FRONTMATTER_DELIMS,
-	FRONTMATTER_REGEX,
+	YAML_LOADER,
 	Format,
 )
 from pdj_sitegen.exceptions import (
@@ -46,6 +66,45 @@ from pdj_sitegen.exceptions import (
 	RenderError,
 	SplitMarkdownError,
 )
+from pdj_sitegen.intermediates import (
+	IntermediatesBuffer,
+	IntermediatesWriter,
+	active_writer,
+	check_stages,
+	selected_stages,
+	start_buffer,
+	start_writer,
+	stop_writer,
+)
+from pdj_sitegen.profiling import (
+	Profiler,
+	Span,
+	active_profiler,
+	drain_spans,
+	page_stages_active,
+	peak_rss_mb,
+	pop_page_stages,
+	record_spans,
+	span,
+	start_page_stages,
+	start_profiling,
+	stop_page_stages,
+	stop_profiling,
+	trace_track,
+	write_report,
+)
+from pdj_sitegen.schedule import ProgressEstimate, longest_first, page_costs
+from pdj_sitegen.shard import ShardSpec, assign_pages, file_shard, write_manifest
+from pdj_sitegen.shared_docs import SharedDocs, write_shared_docs
+
+if TYPE_CHECKING:
+	from concurrent.futures import ProcessPoolExecutor
+
+	from jinja2 import Environment, Template
+
+# jinja2, pypandoc, tqdm, bs4, muutils, asyncio and multiprocessing are imported
+# in the functions which use them, since a run only needs some of them, and
+# `--help` or `merge` none. pandoc is patched in tests through `pypandoc.convert_text`
 
 
 def should_copy(rel_path: str, include: list[str], exclude: list[str]) -> bool:
@@ -79,12 +138,17 @@ def should_copy(rel_path: str, include: list[str], exclude: list[str]) -> bool:
 	return not include  # Empty include = copy everything not excluded
 
 
+COPY_BATCH_SIZE: int = 64
+"""Files per `copy_batch` profiling span in `copy_content_files`."""
+
+
 def copy_content_files(
 	content_dir: Path,
 	output_dir: Path,
 	include: list[str],
 	exclude: list[str],
 	verbose: bool = True,
+	select: Callable[[str], bool] | None = None,
 ) -> int:
 	"""Copy files from content_dir to output_dir based on include/exclude patterns.
 
@@ -99,31 +163,92 @@ def copy_content_files(
 	   glob patterns for files to exclude
 	 - `verbose : bool`
 	   whether to print progress information
+	 - `select : Callable[[str], bool] | None`
+	   if provided, only copy the files whose relative path it returns True for,
+	   used to split the files between shards (see `pdj_sitegen.shard`)
 
 	# Returns:
 	 - `int`
 	   number of files copied
 	"""
-	copied_count = 0
+	to_copy: list[tuple[Path, Path]] = []
 	for file_path in content_dir.rglob("*"):
 		if file_path.is_file():
 			rel_path = file_path.relative_to(content_dir).as_posix()
-			if should_copy(rel_path, include, exclude):
-				dest = output_dir / rel_path
+			if should_copy(rel_path, include, exclude) and (
+				select is None or select(rel_path)
+			):
+				to_copy.append((file_path, output_dir / rel_path))
+	for start in range(0, len(to_copy), COPY_BATCH_SIZE):
+		batch: list[tuple[Path, Path]] = to_copy[start : start + COPY_BATCH_SIZE]
+		with span("copy_batch", n_files=len(batch)):
+			for file_path, dest in batch:
 				dest.parent.mkdir(parents=True, exist_ok=True)
 				shutil.copy2(file_path, dest)
-				copied_count += 1
+	copied_count = len(to_copy)
 	if verbose:
 		print(f"Copied {copied_count} resource files")
 	return copied_count
 
 
+def find_frontmatter(content: str) -> tuple[Format, int, int, int]:
+	"""locate the frontmatter and body of markdown content, without copying either
+
+	a linear scan for the delimiter lines, accepting exactly what
+	`FRONTMATTER_REGEX` accepts, plus a leading byte order mark and CRLF line
+	endings. the first line must be one of `FRONTMATTER_DELIMS`, and the
+	frontmatter ends at the next line consisting of the same delimiter, which
+	must be followed by a newline. the line right after the opening delimiter
+	is always part of the frontmatter.
+
+	# Parameters:
+	 - `content : str`
+	   markdown content to scan
+
+	# Returns:
+	 - `tuple[Format, int, int, int]`
+	   tuple of frontmatter format, frontmatter start and end offsets, and body start offset.
+	   the frontmatter is `content[start:end]` and the body is `content[body_start:]`
+
+	# Raises:
+	 - `SplitMarkdownError` : if the content does not start with frontmatter
+	"""
+	start: int = 1 if content.startswith("\ufeff") else 0
+	first_line_end: int = content.find("\n", start)
+	if first_line_end == -1:
+		raise SplitMarkdownError(f"No frontmatter found in content\n{content = }")
+	delimiter: str = content[start:first_line_end].removesuffix("\r")
+	if delimiter not in FRONTMATTER_DELIMS:
+		raise SplitMarkdownError(f"No frontmatter found in content\n{content = }")
+
+	fm_start: int = first_line_end + 1
+	needle: str = "\n" + delimiter
+	# the closing delimiter must be a whole line, and must be followed by a newline
+	idx: int = content.find(needle, fm_start)
+	while idx != -1:
+		line_end: int = idx + len(needle)
+		if content.startswith("\n", line_end):
+			body_start: int = line_end + 1
+			break
+		if content.startswith("\r\n", line_end):
+			body_start = line_end + 2
+			break
+		idx = content.find(needle, idx + 1)
+	else:
+		raise SplitMarkdownError(f"No frontmatter found in content\n{content = }")
+
+	fm_end: int = idx
+	if fm_end > fm_start and content[fm_end - 1] == "\r":
+		fm_end -= 1
+	return FRONTMATTER_DELIMS[delimiter], fm_start, fm_end, body_start
+
+
 def split_md(
 	content: str,
 ) -> tuple[str, str, Format]:
 	"""parse markdown into a tuple of frontmatter, body, and frontmatter format
 
-	will use `FRONTMATTER_REGEX` to split the markdown content into frontmatter and body.
+	will use `find_frontmatter` to split the markdown content into frontmatter and body.
 	the possible delimiters are defined in `FRONTMATTER_DELIMS`.
 
 	# Parameters:
@@ -135,32 +260,65 @@ def split_md(
 	   tuple of frontmatter, body, and frontmatter format (yaml, json, toml)
 
 	# Raises:
-	 - `SplitMarkdownError` : if the regex does not match
+	 - `SplitMarkdownError` : if no frontmatter is found
 	"""
-	match: re.Match[str] | None = re.match(FRONTMATTER_REGEX, content)
-	frontmatter: str
-	body: str
 	fmt: Format
-	if match:
-		# if the regex matches, extract the frontmatter, body, and format
-		delimiter: str = match.group("delimiter")
-		frontmatter = match.group("frontmatter")
-		if not isinstance(frontmatter, str):
-			raise TypeError(f"Expected frontmatter to be str, got {type(frontmatter)}")
-		body = match.group("body")
-		if not isinstance(body, str):
-			raise TypeError(f"Expected body to be str, got {type(body)}")
-		fmt = FRONTMATTER_DELIMS[delimiter]
-	else:
-		raise SplitMarkdownError(f"No frontmatter found in content\n{content = }")
+	fm_start: int
+	fm_end: int
+	body_start: int
+	fmt, fm_start, fm_end, body_start = find_frontmatter(content)
+	return content[fm_start:fm_end], content[body_start:], fmt
 
-	return frontmatter, body, fmt
+
+def read_frontmatter(file_path: Path) -> tuple[str, Format, int]:
+	"""read only the frontmatter of a markdown file, stopping at the closing delimiter
+
+	follows the same rules as `find_frontmatter`: the first line must be one of
+	`FRONTMATTER_DELIMS`, and the frontmatter ends at the next line consisting
+	of the same delimiter (which must be followed by a newline).
+
+	# Parameters:
+	 - `file_path : Path`
+	   path to the markdown file
+
+	# Returns:
+	 - `tuple[str, Format, int]`
+	   tuple of frontmatter, frontmatter format, and byte offset of the body
+
+	# Raises:
+	 - `SplitMarkdownError` : if the file does not start with frontmatter
+	"""
+	with open(file_path, "rb") as f:
+		first_line: str = f.readline().decode("utf-8").removeprefix("\ufeff")
+		delimiter: str = first_line.rstrip("\r\n")
+		if delimiter not in FRONTMATTER_DELIMS or not first_line.endswith("\n"):
+			raise SplitMarkdownError(
+				"No frontmatter found", file_path=file_path.as_posix()
+			)
+
+		fm_lines: list[str] = []
+		for line_bytes in iter(f.readline, b""):
+			line: str = line_bytes.decode("utf-8")
+			# as in `find_frontmatter`, the line right after the opening
+			# delimiter is always part of the frontmatter
+			if fm_lines and line.endswith("\n") and line.rstrip("\r\n") == delimiter:
+				return (
+					_normalize_newlines("".join(fm_lines))[:-1],
+					FRONTMATTER_DELIMS[delimiter],
+					f.tell(),
+				)
+			fm_lines.append(line)
+
+	raise SplitMarkdownError(
+		f"No closing {delimiter!r} frontmatter delimiter found",
+		file_path=file_path.as_posix(),
+	)
 
 
 def render(
 	content: str,
 	context: dict[str, Any],
-	jinja_env: Environment,
+	jinja_env: "Environment",
 ) -> str:
 	"""render content given context and jinja2 environment. raise RenderError if error occurs
 
@@ -206,21 +364,161 @@ def render(
 	return output
 
 
+def load_document(
+	file_path: Path,
+	content_dir: Path,
+	frontmatter_context: dict[str, Any],
+	jinja_env: "Environment",
+	normalize_index_names: bool = True,
+	cache_entry: FrontmatterEntry | None = None,
+) -> tuple[str, Document, FrontmatterEntry]:
+	"""read, render, and parse the frontmatter of a single markdown file
+
+	if `cache_entry` is given and the stat signature of the file matches it,
+	the cached frontmatter is used and the file is not read at all.
+
+	# Parameters:
+	 - `file_path : Path`
+	   path to the markdown file, inside `content_dir`
+	 - `content_dir : Path`
+	   content directory, documents are keyed by their path relative to it
+	 - `frontmatter_context : dict[str, Any]`
+	   context to use to render the frontmatter *before* parsing it into a dict
+	 - `jinja_env : Environment`
+	   jinja2 environment to use for rendering
+	 - `normalize_index_names : bool`
+	   if True, `_index.md` files are renamed to `index.html` in output
+	 - `cache_entry : FrontmatterEntry | None`
+	   cached frontmatter for this file from a previous build, rendered with the same `frontmatter_context`
+
+	# Returns:
+	 - `tuple[str, Document, FrontmatterEntry]`
+	   key of the document, the document (see `build_document_tree`), and
+	   the cache entry for the file (`cache_entry` itself if it was reused)
+
+	# Raises:
+	 - `SplitMarkdownError` : if the file has no frontmatter
+	 - `RenderError` : if rendering the frontmatter fails
+	"""
+	st: os.stat_result = file_path.stat()
+	file_meta: FileMeta = FileMeta(
+		path=file_path.relative_to(content_dir).as_posix().removesuffix(".md"),
+		path_raw=file_path.as_posix(),
+		modified_time=st.st_mtime,
+		# `_index` -> `index` in the output path, if enabled
+		index_renamed=normalize_index_names and file_path.stem == "_index",
+	)
+	file_path_str: str = file_meta.path
+
+	stat_sig: StatSignature = stat_signature(st)
+	if cache_entry is None or cache_entry.stat_sig != stat_sig:
+		frontmatter_raw: str
+		fmt: Format
+		body_offset: int
+		with span("frontmatter_render", page=file_path_str):
+			frontmatter_raw, fmt, body_offset = read_frontmatter(file_path)
+
+			frontmatter_rendered: str = render(
+				content=frontmatter_raw,
+				context={**frontmatter_context, "file_meta": file_meta},
+				jinja_env=jinja_env,
+			)
+			cache_entry = FrontmatterEntry(
+				stat_sig=stat_sig,
+				content_hash=hash_text(frontmatter_raw),
+				frontmatter=FORMAT_PARSERS[fmt](frontmatter_rendered),
+				body_offset=body_offset,
+				fmt=fmt,
+			)
+
+	return (
+		file_path_str,
+		Document(
+			frontmatter=cache_entry.frontmatter,
+			body=BodyRef(file_meta.path_raw, cache_entry.body_offset),
+			file_meta=file_meta,
+		),
+		cache_entry,
+	)
+
+
+# arguments to `load_document` other than the file path, set once per
+# discovery worker process by `_init_discovery_worker`
+_discovery_worker_kwargs: dict[str, Any] = {}
+
+
+def _init_discovery_worker(
+	kwargs: dict[str, Any], profiler_t0: float | None = None
+) -> None:
+	_discovery_worker_kwargs.update(kwargs)
+	if profiler_t0 is not None:
+		start_profiling(t0=profiler_t0)
+
+
+def _load_document_in_worker(
+	args: tuple[Path, FrontmatterEntry | None],
+) -> tuple[tuple[str, Document, FrontmatterEntry] | None, list[Span]]:
+	"""`load_document` for a worker process, returning None on any error
+
+	exceptions lose their cause chain and traceback when sent between
+	processes, so instead of returning them, the parent re-runs failed files
+	itself to get the original exception. also returns the profiling spans
+	recorded for the file, if the parent is profiling.
+	"""
+	result: tuple[str, Document, FrontmatterEntry] | None
+	try:
+		result = load_document(args[0], **_discovery_worker_kwargs, cache_entry=args[1])
+	# any error is raised again by the parent, which loads the file itself
+	except Exception:  # noqa: BLE001
+		result = None
+	return result, drain_spans()
+
+
+def resolve_jobs(jobs: int) -> int:
+	"""number of worker processes to use: `jobs`, or the cpu count if `jobs <= 0`"""
+	return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+def progress_bar(
+	items: list[Path], verbose: bool, desc: str, unit: str
+) -> Iterable[Path]:
+	"""`items` wrapped in a tqdm progress bar if `verbose`, without importing tqdm otherwise"""
+	if not verbose:
+		return items
+	import tqdm
+
+	return tqdm.tqdm(items, desc=desc, unit=unit)
+
+
 def build_document_tree(
 	content_dir: Path,
 	frontmatter_context: dict[str, Any],
-	jinja_env: Environment,
+	jinja_env: "Environment",
 	verbose: bool = True,
 	normalize_index_names: bool = True,
-) -> dict[str, dict[str, Any]]:
+	jobs: int = 1,
+	cache: BuildCache | None = None,
+	cached_keys: set[str] | None = None,
+) -> dict[str, Document]:
 	"""given a dir of markdown files, return a dict of documents with rendered frontmatter
 
 	documents are keyed by their path relative to `content_dir`, with suffix removed.
-	the dict for each document will contain:
+	each `Document` is a read-only mapping containing:
 
 	- `frontmatter: dict[str, Any]` : rendered and parsed frontmatter for that document
-	- `body: str` : plain, unrendered markdown content for that document
-	- `file_meta: dict[str, Any]` : metadata about the file, including `"path", "path_html", "path_raw", "modified_time"`
+	- `body: BodyRef` : lazy handle to the plain, unrendered markdown content for that document.
+	  only the frontmatter of each file is read here, the body is read when the page is converted
+	- `file_meta: FileMeta` : metadata about the file, see `FILE_META_KEYS`
+
+	with `jobs > 1`, files are processed by a pool of worker processes. the
+	order of the returned dict and the errors raised are the same as for a
+	serial build: files which fail in a worker are re-run in this process,
+	in order.
+
+	if a `cache` is given, the frontmatter of files whose stat signature is
+	unchanged is taken from it without reading the file, and the cache is
+	updated in place with the frontmatter of every file found. the caller
+	must make sure the cache was loaded for the same `frontmatter_context`.
 
 	# Parameters:
 	 - `content_dir : Path`
@@ -228,16 +526,23 @@ def build_document_tree(
 	 - `frontmatter_context : dict[str, Any]`
 	   context to use to render the frontmatter *before* parsing it into a dict
 	 - `jinja_env : Environment`
-	   jinja2 environment to use for rendering
+	   jinja2 environment to use for rendering. must be picklable if `jobs > 1`
 	 - `normalize_index_names : bool`
 	   if True, `_index.md` files are renamed to `index.html` in output
+	 - `jobs : int`
+	   number of worker processes, see `resolve_jobs`. `1` processes files serially
+	 - `cache : BuildCache | None`
+	   frontmatter cache from the previous build, updated in place
+	 - `cached_keys : set[str] | None`
+	   if provided, the keys of the documents whose frontmatter was taken from `cache` are added to it
 
 	# Returns:
-	 - `dict[str, dict[str, Any]]`
+	 - `dict[str, Document]`
 	   dict of documents with rendered frontmatter.
 
 	# Raises:
 	 - `ConflictingIndexError` : if both `index.md` and `_index.md` exist in the same directory
+	 - `MultipleExceptions` : if any files are missing frontmatter
 	"""
 	md_files: list[Path] = list(content_dir.rglob("*.md"))
 
@@ -260,72 +565,98 @@ def build_document_tree(
 					rel_dir = "(root)"
 				raise ConflictingIndexError(rel_dir, sorted(index_files))
 
+	cache_entries: list[FrontmatterEntry | None] = [
+		cache.frontmatter.get(file_path.as_posix()) if cache is not None else None
+		for file_path in md_files
+	]
+	# files with a valid cache entry are cheap to load, only send the rest to workers
+	pool_indices: list[int] = []
+	jobs = resolve_jobs(jobs)
+	if jobs > 1:
+		pool_indices = [
+			idx
+			for idx, (file_path, entry) in enumerate(zip(md_files, cache_entries))
+			if entry is None or entry.stat_sig != stat_signature(file_path.stat())
+		]
+		jobs = min(jobs, len(pool_indices))
+
 	if verbose:
-		print(f"Found {len(md_files)} markdown files in '{content_dir}'")
+		print(
+			f"Found {len(md_files)} markdown files in '{content_dir}'"
+			+ (f", using {jobs} worker processes" if jobs > 1 else "")
+		)
 
-	docs: dict[str, dict[str, Any]] = {}
+	load_kwargs: dict[str, Any] = {
+		"content_dir": content_dir,
+		"frontmatter_context": frontmatter_context,
+		"jinja_env": jinja_env,
+		"normalize_index_names": normalize_index_names,
+	}
+	docs: dict[str, Document] = {}
 	errors: dict[str, Exception] = {}
 
-	for file_path in tqdm.tqdm(
-		md_files,
-		desc="building document tree",
-		unit="file",
-		disable=not verbose,
-	):
-		file_path_str: str = (
-			file_path.relative_to(content_dir).as_posix().removesuffix(".md")
+	new_entries: dict[str, FrontmatterEntry] = {}
+	n_cached: int = 0
+
+	executor: ProcessPoolExecutor | None = None
+	pool_results: Iterator[
+		tuple[tuple[str, Document, FrontmatterEntry] | None, list[Span]]
+	]
+	if jobs > 1:
+		import concurrent.futures
+
+		profiler: Profiler | None = active_profiler()
+		executor = concurrent.futures.ProcessPoolExecutor(
+			max_workers=jobs,
+			initializer=_init_discovery_worker,
+			initargs=(load_kwargs, profiler.t0 if profiler is not None else None),
 		)
+		pool_results = executor.map(
+			_load_document_in_worker,
+			[(md_files[idx], cache_entries[idx]) for idx in pool_indices],
+			chunksize=max(1, len(pool_indices) // (jobs * 8)),
+		)
+	else:
+		pool_results = iter(())
+	pool_indices_set: set[int] = set(pool_indices)
 
-		# Compute output path, normalizing _index -> index if enabled
-		output_path_str: str = file_path_str
-		if normalize_index_names and file_path.stem == "_index":
-			# Replace _index with index in the output path
-			parent_str = file_path.parent.relative_to(content_dir).as_posix()
-			if parent_str == ".":
-				output_path_str = "index"
-			else:
-				output_path_str = f"{parent_str}/index"
-
-		with open(file_path, "r", encoding="utf-8") as f:
-			content: str = f.read()
-
-		try:
-			frontmatter_raw: str
-			body: str
-			fmt: Format
-			frontmatter_raw, body, fmt = split_md(content)
-
-			last_modified_time: float = file_path.stat().st_mtime
-			file_meta: dict[str, Any] = {
-				"path": file_path_str,
-				"path_stem": file_path.stem,
-				"path_html": f"{output_path_str}.html",
-				"path_raw": file_path.as_posix(),
-				"path_to_root": "/".join([".."] * file_path_str.count("/")) or ".",
-				"modified_time": last_modified_time,
-				"modified_time_str": datetime.datetime.fromtimestamp(
-					last_modified_time
-				).strftime("%Y-%m-%d %H:%M:%S"),
-			}
-
-			frontmatter_rendered: str = render(
-				content=frontmatter_raw,
-				context={**frontmatter_context, "file_meta": file_meta},
-				jinja_env=jinja_env,
-			)
-			frontmatter: dict[str, Any] = FORMAT_PARSERS[fmt](frontmatter_rendered)
-
-			docs[file_path_str] = {
-				"frontmatter": frontmatter,
-				"body": body,
-				"file_meta": file_meta,
-			}
-		except SplitMarkdownError as e:
-			# Add file path context if not already set
-			if not e.file_path:
-				e = SplitMarkdownError(str(e), file_path=file_path.as_posix())
-			errors[file_path.as_posix()] = e
-			continue
+	try:
+		for idx, file_path in enumerate(
+			progress_bar(md_files, verbose, desc="building document tree", unit="file")
+		):
+			result: tuple[str, Document, FrontmatterEntry] | None = None
+			if idx in pool_indices_set:
+				result, worker_spans = next(pool_results)
+				record_spans(worker_spans)
+			try:
+				if result is None:
+					# serial build, cached file, or the file failed in a worker
+					result = load_document(
+						file_path, **load_kwargs, cache_entry=cache_entries[idx]
+					)
+			except SplitMarkdownError as e:
+				# Add file path context if not already set
+				if not e.file_path:
+					e = SplitMarkdownError(str(e), file_path=file_path.as_posix())
+				errors[file_path.as_posix()] = e
+				continue
+			key, doc, entry = result
+			docs[key] = doc
+			new_entries[file_path.as_posix()] = entry
+			old_entry: FrontmatterEntry | None = cache_entries[idx]
+			if old_entry is not None and old_entry.stat_sig == entry.stat_sig:
+				n_cached += 1
+				if cached_keys is not None:
+					cached_keys.add(key)
+	finally:
+		if executor is not None:
+			executor.shutdown(cancel_futures=True)
+
+	if cache is not None:
+		# also drops entries for deleted files
+		cache.frontmatter = new_entries
+		if verbose:
+			print(f"Frontmatter cache: {n_cached} hits, {len(docs) - n_cached} misses")
 
 	if errors:
 		print(
@@ -402,91 +733,129 @@ def process_pandoc_args(pandoc_args: dict[str, Any]) -> list[str]:
 
 
 def dump_intermediate(
-	content: str,
+	content: str | Callable[[], str],
 	intermediates_dir: Path | None,
 	fmt: str,
 	path: str,
 	subdir: str | None = None,
 ) -> None:
-	"""Dump content to an intermediate file if intermediates_dir is specified"""
+	"""Dump content to an intermediate file if intermediates_dir is specified
+
+	the file is `{subdir}/{path}.{fmt}`, where `subdir` defaults to `fmt`.
+	`content` may be a callable, only called if the file is written. see
+	`write_intermediate_file` for where the file goes.
+	"""
 	if intermediates_dir:
 		if subdir is None:
 			subdir = fmt
-		output_path: Path = intermediates_dir / fmt / f"{path}.{fmt}"
-		output_path.parent.mkdir(parents=True, exist_ok=True)
-		with open(output_path, "w", encoding="utf-8") as f:
-			f.write(content)
+		write_intermediate_file(intermediates_dir, f"{subdir}/{path}.{fmt}", content)
 
 
-def convert_single_markdown_file(
-	path: str,
-	output_root: Path,
-	doc: dict[str, Any],
-	docs: dict[str, dict[str, Any]],
-	jinja_env: Environment,
-	config: Config,
-	intermediates_dir: Path | None = None,
+def write_intermediate_file(
+	intermediates_dir: Path,
+	rel_path: str,
+	content: str | Callable[[], str],
 ) -> None:
-	"""Convert a single markdown document to HTML.
+	"""write an intermediate file to `rel_path` under `intermediates_dir`
 
-	This function performs the full conversion pipeline for one document:
-	1. Extract frontmatter, body, and file metadata from the doc dict
-	2. Build context with frontmatter, config, all docs, and directory info
-	3. Render the markdown body with Jinja2
-	4. Convert rendered markdown to HTML with Pandoc
-	5. Apply the HTML template with the converted content
-	6. Optionally prettify the HTML output
-	7. Write the final HTML to the output directory
+	if an `IntermediatesWriter` or `IntermediatesBuffer` is active for
+	`intermediates_dir` (see `pdj_sitegen.intermediates`), the file is passed
+	to it instead of being written here.
+	"""
+	writer: IntermediatesWriter | IntermediatesBuffer | None = active_writer()
+	if writer is not None and writer.intermediates_dir == intermediates_dir:
+		writer.write(rel_path, content)
+		return
+	output_path: Path = intermediates_dir / rel_path
+	output_path.parent.mkdir(parents=True, exist_ok=True)
+	with open(output_path, "w", encoding="utf-8") as f:
+		f.write(content() if callable(content) else content)
 
-	# Parameters:
+
+def intermediate_stages(
+	path: str, config: Config, intermediates_dir: Path | None
+) -> frozenset[str]:
+	"""stages of `path` to dump to `intermediates_dir`, empty if it is None"""
+	if intermediates_dir is None:
+		return frozenset()
+	return selected_stages(
+		path, config.intermediates_include, config.intermediates_stages
+	)
+
+
+@dataclass(slots=True)
+class PreparedPage:
+	"""a page whose markdown body has been rendered, ready to be converted by pandoc
+
+	# Attributes:
 	 - `path : str` - relative path of the document (without .md extension)
-	 - `output_root : Path` - root directory for output (typically the config file's parent)
-	 - `doc : dict[str, Any]` - document dict with 'frontmatter', 'body', and 'file_meta' keys
-	 - `docs : dict[str, dict[str, Any]]` - dictionary of all documents in the site
-	 - `jinja_env : Environment` - Jinja2 environment for template rendering
-	 - `config : Config` - site configuration
-	 - `intermediates_dir : Path | None` - if provided, intermediate files are saved for debugging
+	 - `context : dict[str, Any]` - template context of the page
+	 - `markdown : str` - rendered markdown body
+	 - `pandoc_args : list[str]` - extra arguments for pandoc, see `process_pandoc_args`
 	"""
-	frontmatter: dict[str, Any] = doc.get("frontmatter", {})
-	if not isinstance(frontmatter, dict):
-		raise TypeError(f"Expected frontmatter to be dict, got {type(frontmatter)}")
-	body: str = doc.get("body", "")
-	if not isinstance(body, str):
-		raise TypeError(f"Expected body to be str, got {type(body)}")
-	file_meta: dict[str, Any] = doc.get("file_meta", {})
-	if not isinstance(file_meta, dict):
-		raise TypeError(f"Expected file_meta to be dict, got {type(file_meta)}")
-
-	# Get directory info for new template variables
-	file_dir: Path = Path(file_meta["path_raw"]).parent
-	file_dir_rel: str = str(Path(file_meta["path"]).parent)
-
-	context: dict[str, Any] = {
-		**frontmatter,
-		"frontmatter": frontmatter,
-		"file_meta": file_meta,
-		"config": config.serialize(),
-		"docs": docs,
-		# Docs matching by path prefix (original child_docs behavior)
-		"child_docs_dotlist": {
-			k: v for k, v in docs.items() if (k.startswith(path) and k != path)
-		},
-		# Docs in same folder (excluding current file)
-		"child_docs_folder": {
-			k: v
-			for k, v in docs.items()
-			if (str(Path(k).parent) == file_dir_rel and k != path)
-		},
-		# All files in the directory (filenames only)
-		"dir_files": [f.name for f in file_dir.iterdir() if f.is_file()],
-		# All subdirectories in the directory (names only)
-		"dir_subdirs": [d.name for d in file_dir.iterdir() if d.is_dir()],
-		# All files recursively (relative paths from dir)
-		"dir_contents_recursive": [
-			str(f.relative_to(file_dir)) for f in file_dir.rglob("*") if f.is_file()
-		],
-	}
 
+	path: str
+	context: dict[str, Any]
+	markdown: str
+	pandoc_args: list[str]
+
+
+def prepare_markdown_file(
+	path: str,
+	doc: Mapping[str, Any],
+	docs: Mapping[str, Mapping[str, Any]],
+	jinja_env: "Environment",
+	config: Config,
+	intermediates_dir: Path | None = None,
+) -> PreparedPage:
+	"""steps 1 to 3 of `render_single_markdown_file`: build the context and render the body"""
+	with span("context", page=path):
+		frontmatter: dict[str, Any] = doc.get("frontmatter", {})
+		if not isinstance(frontmatter, dict):
+			raise TypeError(f"Expected frontmatter to be dict, got {type(frontmatter)}")
+		body: str | BodyRef = doc.get("body", "")
+		if isinstance(body, BodyRef):
+			body = body.read()
+		if not isinstance(body, str):
+			raise TypeError(f"Expected body to be str, got {type(body)}")
+		file_meta: Mapping[str, Any] = doc.get("file_meta", {})
+		if not isinstance(file_meta, Mapping):
+			raise TypeError(
+				f"Expected file_meta to be a mapping, got {type(file_meta)}"
+			)
+
+		# Get directory info for new template variables
+		file_dir: Path = Path(file_meta["path_raw"]).parent
+		file_dir_rel: str = str(Path(file_meta["path"]).parent)
+
+		context: dict[str, Any] = {
+			**frontmatter,
+			"frontmatter": frontmatter,
+			"file_meta": file_meta,
+			"config": config.serialize(),
+			"docs": docs,
+			# Docs matching by path prefix (original child_docs behavior)
+			# keys are filtered first, so that lazy mappings like `SharedDocs` only load matches
+			"child_docs_dotlist": {
+				k: docs[k] for k in docs if (k.startswith(path) and k != path)
+			},
+			# Docs in same folder (excluding current file)
+			"child_docs_folder": {
+				k: docs[k]
+				for k in docs
+				if (str(Path(k).parent) == file_dir_rel and k != path)
+			},
+			# All files in the directory (filenames only)
+			"dir_files": [f.name for f in file_dir.iterdir() if f.is_file()],
+			# All subdirectories in the directory (names only)
+			"dir_subdirs": [d.name for d in file_dir.iterdir() if d.is_dir()],
+			# All files recursively (relative paths from dir)
+			"dir_contents_recursive": [
+				str(f.relative_to(file_dir)) for f in file_dir.rglob("*") if f.is_file()
+			],
+		}
+
+	stages: frozenset[str] = intermediate_stages(path, config, intermediates_dir)
 	dump_intermediate_partial: Callable[..., None] = functools.partial(
 		dump_intermediate,
 		intermediates_dir=intermediates_dir,
@@ -494,43 +863,59 @@ def convert_single_markdown_file(
 	)
 
 	# dump frontmatter to intermediates
-	dump_intermediate_partial(
-		content=str(frontmatter),
-		fmt="txt",
-		subdir="frontmatter_txt",
-	)
-	dump_intermediate_partial(
-		content=json.dumps(json_serialize(frontmatter)),
-		fmt="json",
-		subdir="frontmatter_json",
-	)
+	# serialized only if intermediates are written, and then in the writer thread
+	if "frontmatter" in stages:
+		from muutils.json_serialize import json_serialize
+
+		dump_intermediate_partial(content=lambda: str(frontmatter), fmt="txt")
+		dump_intermediate_partial(
+			content=lambda: json.dumps(json_serialize(frontmatter)), fmt="json"
+		)
 
 	# Now, execute a template on the content with context
 	# Render Markdown content with Jinja2
-	rendered_md: str = render(
-		content=body,
-		context=context,
-		jinja_env=jinja_env,
-	)
+	# templates may read other documents' bodies, see `cached_bodies`
+	with span("body_render", page=path), cached_bodies():
+		rendered_md: str = render(
+			content=body,
+			context=context,
+			jinja_env=jinja_env,
+		)
 
-	dump_intermediate_partial(content=rendered_md, fmt="md")
+	if "md" in stages:
+		dump_intermediate_partial(content=rendered_md, fmt="md")
 
-	# Convert Markdown to HTML using Pandoc
+	# arguments for converting Markdown to HTML using Pandoc
 	pandoc_args: list[str] = process_pandoc_args(
 		{
 			**config.__pandoc__,
 			**context["frontmatter"].get("__pandoc__", {}),
 		}
 	)
-
-	html_content: str = pypandoc.convert_text(
-		source=rendered_md,
-		to=config.pandoc_fmt_to,
-		format=config.pandoc_fmt_from,
-		extra_args=pandoc_args,
+	return PreparedPage(
+		path=path, context=context, markdown=rendered_md, pandoc_args=pandoc_args
 	)
 
-	dump_intermediate_partial(content=html_content, fmt="html")
+
+def finish_markdown_file(
+	page: PreparedPage,
+	html_content: str,
+	jinja_env: "Environment",
+	config: Config,
+	intermediates_dir: Path | None = None,
+) -> str:
+	"""steps 5 and 6 of `render_single_markdown_file`: apply the HTML template to pandoc's output"""
+	path: str = page.path
+	context: dict[str, Any] = page.context
+	frontmatter: dict[str, Any] = context["frontmatter"]
+	stages: frozenset[str] = intermediate_stages(path, config, intermediates_dir)
+	if "html" in stages:
+		dump_intermediate(
+			content=html_content,
+			intermediates_dir=intermediates_dir,
+			fmt="html",
+			path=context["file_meta"]["path"],
+		)
 
 	# Determine which HTML template to use
 	template_name: str = frontmatter.get(
@@ -539,37 +924,537 @@ def convert_single_markdown_file(
 	)
 
 	# Render final HTML
-	template: Template = jinja_env.get_template(template_name)
-	final_html: str = template.render({"__content__": html_content, **context})
+	with span("template_render", page=path, template=template_name), cached_bodies():
+		template: Template = jinja_env.get_template(template_name)
+		final_html: str = template.render({"__content__": html_content, **context})
 	if config.prettify:
-		final_html = str(
-			BeautifulSoup(final_html, "html.parser").prettify(formatter="minimal")
+		from bs4 import BeautifulSoup
+
+		with span("prettify", page=path):
+			final_html = str(
+				BeautifulSoup(final_html, "html.parser").prettify(formatter="minimal")
+			)
+	if "final" in stages:
+		dump_intermediate(
+			content=final_html,
+			intermediates_dir=intermediates_dir,
+			fmt="html",
+			path=context["file_meta"]["path"],
+			subdir="final",
 		)
+	return final_html
+
+
+def render_single_markdown_file(
+	path: str,
+	doc: Mapping[str, Any],
+	docs: Mapping[str, Mapping[str, Any]],
+	jinja_env: "Environment",
+	config: Config,
+	intermediates_dir: Path | None = None,
+) -> str:
+	"""Render a single markdown document to its final HTML, without writing it.
+
+	This function performs the full conversion pipeline for one document:
+	1. Extract frontmatter, body, and file metadata from the doc dict
+	2. Build context with frontmatter, config, all docs, and directory info
+	3. Render the markdown body with Jinja2
+	4. Convert rendered markdown to HTML with Pandoc
+	5. Apply the HTML template with the converted content
+	6. Optionally prettify the HTML output
+
+	Steps 1-3 are `prepare_markdown_file` and steps 5-6 are
+	`finish_markdown_file`, so that pandoc can run asynchronously in between,
+	see `convert_markdown_files`.
+
+	# Parameters:
+	 - `path : str` - relative path of the document (without .md extension)
+	 - `doc : Mapping[str, Any]` - `Document` or dict with 'frontmatter', 'body' (str or `BodyRef`), and 'file_meta' keys
+	 - `docs : Mapping[str, Mapping[str, Any]]` - all documents in the site
+	 - `jinja_env : Environment` - Jinja2 environment for template rendering
+	 - `config : Config` - site configuration
+	 - `intermediates_dir : Path | None` - if provided, intermediate files are saved for debugging
+
+	# Returns:
+	 - `str` - the final HTML of the page
+	"""
+	page: PreparedPage = prepare_markdown_file(
+		path=path,
+		doc=doc,
+		docs=docs,
+		jinja_env=jinja_env,
+		config=config,
+		intermediates_dir=intermediates_dir,
+	)
+	import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+
+	with span("pandoc", page=path):
+		html_content: str = pypandoc.convert_text(
+			source=page.markdown,
+			to=config.pandoc_fmt_to,
+			format=config.pandoc_fmt_from,
+			extra_args=page.pandoc_args,
+		)
+	return finish_markdown_file(
+		page=page,
+		html_content=html_content,
+		jinja_env=jinja_env,
+		config=config,
+		intermediates_dir=intermediates_dir,
+	)
+
+
+async def pandoc_convert_async(
+	source: str,
+	to: str,
+	format: str,
+	extra_args: list[str],
+) -> str:
+	"""`pypandoc.convert_text` for a string, as an asyncio subprocess
+
+	runs the pandoc found by pypandoc with the same arguments, without
+	pypandoc's format validation. anything pandoc prints to stderr is passed on.
+
+	# Raises:
+	 - `RuntimeError` : if pandoc exits with an error, with the same message as pypandoc
+	"""
+	import asyncio
+
+	import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+
+	process: asyncio.subprocess.Process = await asyncio.create_subprocess_exec(
+		pypandoc.get_pandoc_path(),
+		f"--from={format}",
+		f"--to={to}",
+		*extra_args,
+		stdin=asyncio.subprocess.PIPE,
+		stdout=asyncio.subprocess.PIPE,
+		stderr=asyncio.subprocess.PIPE,
+	)
+	try:
+		stdout, stderr = await process.communicate(source.encode("utf-8"))
+	except asyncio.CancelledError:
+		process.kill()
+		await process.wait()
+		raise
+	stderr_text: str = stderr.decode("utf-8", errors="replace")
+	if process.returncode != 0:
+		raise RuntimeError(
+			f'Pandoc died with exitcode "{process.returncode}" during conversion: '
+			f"{stderr_text}"
+		)
+	if stderr_text:
+		print(stderr_text, end="", file=sys.stderr)
+	return stdout.decode("utf-8", errors="replace")
+
+
+def _write_page(
+	path: str,
+	output_root: Path,
+	doc: Mapping[str, Any],
+	config: Config,
+	final_html: str,
+) -> None:
+	with span("write", page=path):
+		output_path: Path = (
+			output_root / config.output_dir / doc["file_meta"]["path_html"]
+		)
+		output_path.parent.mkdir(parents=True, exist_ok=True)
+		with open(output_path, "w", encoding="utf-8") as f:
+			f.write(final_html)
+
+
+def convert_single_markdown_file(
+	path: str,
+	output_root: Path,
+	doc: Mapping[str, Any],
+	docs: Mapping[str, Mapping[str, Any]],
+	jinja_env: "Environment",
+	config: Config,
+	intermediates_dir: Path | None = None,
+) -> None:
+	"""Convert a single markdown document to HTML and write it to the output directory.
+
+	See `render_single_markdown_file` for the conversion steps.
+
+	# Parameters:
+	 - `path : str` - relative path of the document (without .md extension)
+	 - `output_root : Path` - root directory for output (typically the config file's parent)
+	 - `doc : Mapping[str, Any]` - `Document` or dict with 'frontmatter', 'body' (str or `BodyRef`), and 'file_meta' keys
+	 - `docs : Mapping[str, Mapping[str, Any]]` - all documents in the site
+	 - `jinja_env : Environment` - Jinja2 environment for template rendering
+	 - `config : Config` - site configuration
+	 - `intermediates_dir : Path | None` - if provided, intermediate files are saved for debugging
+	"""
+	final_html: str = render_single_markdown_file(
+		path=path,
+		doc=doc,
+		docs=docs,
+		jinja_env=jinja_env,
+		config=config,
+		intermediates_dir=intermediates_dir,
+	)
 
 	# Output HTML file
-	output_path: Path = output_root / config.output_dir / file_meta["path_html"]
-	output_path.parent.mkdir(parents=True, exist_ok=True)
-	with open(output_path, "w", encoding="utf-8") as f:
-		f.write(final_html)
+	_write_page(path, output_root, doc, config, final_html)
+
+
+EXECUTORS: tuple[str, ...] = ("async", "process")
+"""How pages are converted with `jobs > 1`, see `convert_markdown_files`."""
+
+_convert_worker_state: dict[str, Any] = {}
+
+
+def _init_convert_worker(
+	docs_path: Path,
+	config: Config,
+	output_root: Path,
+	intermediates_dir: Path | None,
+	low_memory: bool,
+	profiler_t0: float | None = None,
+) -> None:
+	# intermediates are sent back to the parent's writer, see `_convert_page_in_worker`
+	if intermediates_dir is not None:
+		start_buffer(intermediates_dir)
+	_convert_worker_state.update(
+		pages=SharedDocs(docs_path),
+		docs=SharedDocs(docs_path, bodies=not low_memory),
+		jinja_env=create_jinja_env(config, output_root),
+		config=config,
+		output_root=output_root,
+		intermediates_dir=intermediates_dir,
+	)
+	if profiler_t0 is not None:
+		start_profiling(t0=profiler_t0)
+
+
+def _convert_page_in_worker(
+	path: str,
+) -> tuple[str, bool, float, list[Span], list[tuple[str, str]]]:
+	"""`convert_single_markdown_file` for a worker process, returning whether it succeeded
+
+	as in `_load_document_in_worker`, exceptions are not sent back: the parent
+	converts failed pages again itself to get the original exception. also
+	returns the wall time of the page, the profiling spans recorded for it,
+	and its intermediate files (relative path and content) for the parent to
+	write, none if the page failed since the parent converts it again.
+	"""
+	state: dict[str, Any] = _convert_worker_state
+	ok: bool = True
+	start: float = time.perf_counter()
+	try:
+		with span("page", doc=path):
+			convert_single_markdown_file(
+				path=path,
+				output_root=state["output_root"],
+				doc=state["pages"][path],
+				docs=state["docs"],
+				jinja_env=state["jinja_env"],
+				config=state["config"],
+				intermediates_dir=state["intermediates_dir"],
+			)
+	# the parent converts failed pages again to raise the original exception
+	except Exception:  # noqa: BLE001
+		ok = False
+	# keep only the documents of one page in memory, see `SharedDocs`
+	state["pages"].clear_cache()
+	state["docs"].clear_cache()
+	buffer: IntermediatesWriter | IntermediatesBuffer | None = active_writer()
+	files: list[tuple[str, str]] = (
+		buffer.drain() if isinstance(buffer, IntermediatesBuffer) else []
+	)
+	return path, ok, time.perf_counter() - start, drain_spans(), files if ok else []
+
+
+PROCESS_TASKS_PER_WORKER: int = 2
+"""Pages submitted per worker process ahead of the ones that are done."""
+
+
+def _convert_pages_in_processes(
+	paths: Iterable[str],
+	docs: Mapping[str, Mapping[str, Any]],
+	config: Config,
+	output_root: Path,
+	intermediates_dir: Path | None,
+	low_memory: bool,
+	jobs: int,
+	on_converted: Callable[[str, float], None] | None = None,
+	max_errors: int | None = None,
+) -> list[str]:
+	"""convert pages in `jobs` worker processes, returning the paths of those which failed
+
+	`docs` is written once to a temporary file which the workers memory-map
+	(see `pdj_sitegen.shared_docs`), and each task only sends a document key,
+	so neither the documents nor the config are pickled per page. workers
+	create their own jinja environment, which loads compiled templates from
+	the bytecode cache if there is one, see `create_jinja_env`.
+
+	`paths` is consumed as workers become free, at most
+	`PROCESS_TASKS_PER_WORKER` pages per worker ahead, so pages start in the
+	given order. `on_converted` is called with the path and wall time of each
+	converted page. failed pages are returned in the order they finished.
+
+	once `max_errors` pages failed, no more pages are taken from `paths`, the
+	pool is shut down with the pages which have not started yet cancelled, and
+	only the first `max_errors` failures are returned. pages already running
+	can't be interrupted, those which fail count as not converted.
+	"""
+	import concurrent.futures
+	import tempfile
+
+	fd, docs_file = tempfile.mkstemp(prefix="pdj-sitegen-docs-", suffix=".bin")
+	os.close(fd)
+	docs_path: Path = Path(docs_file)
+	failed: list[str] = []
+	try:
+		with span("shared_docs"):
+			write_shared_docs(docs, docs_path)
+		profiler: Profiler | None = active_profiler()
+		with concurrent.futures.ProcessPoolExecutor(
+			max_workers=jobs,
+			initializer=_init_convert_worker,
+			initargs=(
+				docs_path,
+				config,
+				output_root,
+				intermediates_dir,
+				low_memory,
+				# workers send back spans if per-page stages are timed for the build log
+				(
+					profiler.t0
+					if profiler is not None
+					else (time.perf_counter() if page_stages_active() else None)
+				),
+			),
+		) as executor:
+			pending: set[concurrent.futures.Future[Any]] = set()
+
+			def stopped() -> bool:
+				return max_errors is not None and len(failed) >= max_errors
+
+			def collect(return_when: str) -> None:
+				nonlocal pending
+				done, pending = concurrent.futures.wait(
+					pending, return_when=return_when
+				)
+				for future in done:
+					if future.cancelled():
+						continue
+					path, ok, seconds, worker_spans, files = future.result()
+					record_spans(worker_spans)
+					if intermediates_dir is not None:
+						for rel_path, content in files:
+							write_intermediate_file(
+								intermediates_dir, rel_path, content
+							)
+					if not ok:
+						if not stopped():
+							failed.append(path)
+					elif on_converted is not None:
+						on_converted(path, seconds)
+
+			for path in paths:
+				if len(pending) >= jobs * PROCESS_TASKS_PER_WORKER:
+					collect(concurrent.futures.FIRST_COMPLETED)
+				if stopped():
+					break
+				pending.add(executor.submit(_convert_page_in_worker, path))
+			while pending and not stopped():
+				collect(concurrent.futures.FIRST_COMPLETED)
+			if pending:
+				executor.shutdown(wait=True, cancel_futures=True)
+				collect(concurrent.futures.ALL_COMPLETED)
+	finally:
+		docs_path.unlink(missing_ok=True)
+	return failed
+
+
+async def _convert_pages_async(
+	pages: Iterable[tuple[str, Mapping[str, Any]]],
+	output_root: Path,
+	docs: Mapping[str, Mapping[str, Any]],
+	jinja_env: "Environment",
+	config: Config,
+	intermediates_dir: Path | None,
+	jobs: int,
+	on_error: Callable[[str, Exception], None],
+	on_converted: Callable[[str, float], None] | None = None,
+	max_errors: int | None = None,
+) -> None:
+	"""convert pages with up to `jobs` concurrent pandoc processes, see `convert_markdown_files`
+
+	each page is prepared (context and body rendering) in the event loop, then
+	a task converts it with `pandoc_convert_async` and finishes and writes it.
+	a new page is only prepared once fewer than `jobs` pages are in flight,
+	which bounds both the number of pandoc processes and the memory used.
+	errors are passed to `on_error` with the raw path of the page, and
+	`on_converted` is called with the path and wall time of each converted page.
+	once `max_errors` pages failed, no more pages are prepared and the pages in
+	flight are cancelled, killing their pandoc processes.
+
+	each page in flight records its spans on its own trace track (see
+	`trace_track`), which is reused once the page's `page` span is closed.
+	a page only counts as done once its span is closed, so there are `jobs` tracks.
+	"""
+	import asyncio
+
+	in_flight: asyncio.Semaphore = asyncio.Semaphore(jobs)
+	tasks: set[asyncio.Task[None]] = set()
+	n_errors: int = 0
+	busy_tracks: set[int] = set()
+
+	def page_failed(path_raw: str, e: Exception) -> None:
+		nonlocal n_errors
+		n_errors += 1
+		on_error(path_raw, e)
+		if max_errors is not None and n_errors >= max_errors:
+			current: asyncio.Task[Any] | None = asyncio.current_task()
+			for task in list(tasks):
+				if task is not current:
+					task.cancel()
+
+	async def convert_and_write(
+		path: str,
+		doc: Mapping[str, Any],
+		page: PreparedPage,
+		page_span: contextlib.ExitStack,
+		start: float,
+	) -> None:
+		try:
+			with span("pandoc", page=path):
+				html_content: str = await pandoc_convert_async(
+					source=page.markdown,
+					to=config.pandoc_fmt_to,
+					format=config.pandoc_fmt_from,
+					extra_args=page.pandoc_args,
+				)
+			final_html: str = finish_markdown_file(
+				page=page,
+				html_content=html_content,
+				jinja_env=jinja_env,
+				config=config,
+				intermediates_dir=intermediates_dir,
+			)
+			_write_page(path, output_root, doc, config, final_html)
+			if on_converted is not None:
+				on_converted(path, time.perf_counter() - start)
+		# errors of each page are collected and raised together, like in serial builds
+		except Exception as e:  # noqa: BLE001
+			page_failed(doc["file_meta"]["path_raw"], e)
+
+	for path, doc in pages:
+		await in_flight.acquire()
+		if max_errors is not None and n_errors >= max_errors:
+			break
+		start: float = time.perf_counter()
+		track: int = min(set(range(len(busy_tracks) + 1)) - busy_tracks)
+		busy_tracks.add(track)
+		page_span: contextlib.ExitStack = contextlib.ExitStack()
+		# the next page starts, and the track is freed, after the span is closed
+		page_span.callback(in_flight.release)
+		page_span.callback(busy_tracks.discard, track)
+		with trace_track(track):
+			page_span.enter_context(span("page", doc=path))
+			try:
+				page: PreparedPage = prepare_markdown_file(
+					path=path,
+					doc=doc,
+					docs=docs,
+					jinja_env=jinja_env,
+					config=config,
+					intermediates_dir=intermediates_dir,
+				)
+			except Exception as e:  # noqa: BLE001
+				page_span.close()
+				page_failed(doc["file_meta"]["path_raw"], e)
+				continue
+			# the task inherits the track
+			task: asyncio.Task[None] = asyncio.create_task(
+				convert_and_write(path, doc, page, page_span, start)
+			)
+		tasks.add(task)
+		task.add_done_callback(tasks.discard)
+		# also closes the span of a task cancelled before it started
+		task.add_done_callback(lambda _, page_span=page_span: page_span.close())
+	# cancelled tasks are not errors, see `page_failed`
+	await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def docs_without_bodies(
+	docs: Mapping[str, Mapping[str, Any]],
+) -> dict[str, Document]:
+	"""copy of `docs` with only the `frontmatter` and `file_meta` of each document
+
+	the frontmatter and file metadata are shared with `docs`, not copied
+	"""
+	return {
+		key: (
+			doc.without_body()
+			if isinstance(doc, Document)
+			else Document(doc["frontmatter"], None, doc["file_meta"])
+		)
+		for key, doc in docs.items()
+	}
 
 
 def convert_markdown_files(
-	docs: dict[str, dict[str, Any]],
-	jinja_env: Environment,
+	docs: Mapping[str, Mapping[str, Any]],
+	jinja_env: "Environment",
 	config: Config,
 	output_root: Path,
 	smart_rebuild: bool,
 	rebuild_time: float,
 	verbose: bool = True,
 	intermediates_dir: Path | None = None,
+	keys: Collection[str] | None = None,
+	low_memory: bool = False,
+	jobs: int = 1,
+	executor: str = "async",
+	page_times: dict[str, float] | None = None,
+	max_errors: int | None = None,
+	cached_keys: Collection[str] | None = None,
 ) -> None:
 	"""Convert all markdown documents to HTML files.
 
 	Iterates through all documents and converts each to HTML. Supports smart
-	rebuild mode where only modified files are reprocessed.
+	rebuild mode where only modified files are reprocessed, and converting
+	only a subset of documents via `keys` (all of `docs` is still used as context).
+
+	With `low_memory`, the `docs` given to templates contain only the
+	`frontmatter` and `file_meta` of each document, so that templates cannot
+	read every body into memory (see `docs_without_bodies`). Each page's body
+	is read when it is converted, and its HTML is dropped once written.
+
+	With `jobs > 1`, up to `jobs` pandoc processes run concurrently through
+	asyncio (see `pandoc_convert_async`), while the next pages are rendered and
+	finished pages are written. Errors are reported in document order as in a
+	serial build. The CPU times of profiling spans then include work on other
+	pages done while they were waiting.
+
+	With `executor="process"` instead, pages are rendered and converted in
+	`jobs` worker processes, which read `docs` from a shared memory-mapped
+	index (see `_convert_pages_in_processes`). This also parallelizes template
+	rendering, at the cost of starting the workers. Workers send the
+	intermediate files of each page back with its result, and they are
+	written here, through the background writer if one is active.
+
+	`page_times` holds the conversion time of each page in the last build (see
+	`cache.load_page_times`), and is updated with the times of this build. With
+	`jobs > 1`, pages start in order of decreasing time, so that long pages do
+	not start last, and progress lines show the share of the estimated work
+	done and the estimated time left, see `pdj_sitegen.schedule`.
+
+	By default every page is converted, and all errors are raised together at
+	the end. With `max_errors`, the build stops once that many pages failed:
+	no more pages are started, pandoc processes in flight are killed, and
+	worker processes finish their current page and exit. The exception then
+	records the number of pages which were not converted in `n_skipped`.
+
+	If a build log is active (see `pdj_sitegen.build_log`), a `page` event is
+	logged for every page, with the time of each stage of the page.
 
 	# Parameters:
-	 - `docs : dict[str, dict[str, Any]]` - dictionary of documents from build_document_tree()
+	 - `docs : Mapping[str, Mapping[str, Any]]` - documents from build_document_tree()
 	 - `jinja_env : Environment` - Jinja2 environment for template rendering
 	 - `config : Config` - site configuration
 	 - `output_root : Path` - root directory for output
@@ -577,62 +1462,336 @@ def convert_markdown_files(
 	 - `rebuild_time : float` - Unix timestamp of last build (for smart rebuild)
 	 - `verbose : bool` - if True, print progress information
 	 - `intermediates_dir : Path | None` - if provided, save intermediate files for debugging
+	 - `keys : Collection[str] | None` - if provided, only convert the documents with these keys
+	 - `low_memory : bool` - if True, leave document bodies out of the template context
+	 - `jobs : int` - number of concurrent pandoc processes, see `resolve_jobs`
+	 - `executor : str` - one of `EXECUTORS`, how pages are converted if `jobs > 1`
+	 - `page_times : dict[str, float] | None` - seconds each page took to convert in the last build, updated with those of this build
+	 - `max_errors : int | None` - if provided, stop converting after this many failed pages (1 to fail fast)
+	 - `cached_keys : Collection[str] | None` - keys of the documents whose frontmatter came from the build cache, for the build log
 
 	# Raises:
+	 - `ValueError` : if `executor` is not one of `EXECUTORS`, or `max_errors` is less than 1
 	 - `ConversionError` : if a single file fails to convert
 	 - `MultipleExceptions` : if multiple files fail to convert
 	"""
-	n_files: int = len(docs)
+	if executor not in EXECUTORS:
+		raise ValueError(f"invalid executor {executor!r}, expected one of {EXECUTORS}")
+	if max_errors is not None and max_errors < 1:
+		raise ValueError(f"max_errors must be at least 1, got {max_errors}")
+	to_convert: Mapping[str, Mapping[str, Any]] = (
+		docs if keys is None else {k: v for k, v in docs.items() if k in keys}
+	)
+	context_docs: Mapping[str, Mapping[str, Any]] = (
+		docs_without_bodies(docs) if low_memory else docs
+	)
+	n_files: int = len(to_convert)
+	jobs = resolve_jobs(jobs)
 	path: str
-	doc: dict[str, Any]
+	doc: Mapping[str, Any]
 	exceptions: dict[str, Exception] = {}
+	costs: dict[str, float] = page_costs(to_convert, page_times or {})
+	progress: ProgressEstimate = ProgressEstimate(
+		costs, jobs=jobs, timed=bool(page_times)
+	)
+	# with several pages in flight, start the longest ones first
+	order: list[str] = longest_first(costs) if jobs > 1 else list(to_convert)
+	keys_by_path_raw: dict[str, str] = {
+		doc["file_meta"]["path_raw"]: key for key, doc in to_convert.items()
+	}
+	log: BuildLog | None = active_build_log()
+
+	def log_page(
+		path: str,
+		status: str,
+		seconds: float | None = None,
+		error: Exception | None = None,
+	) -> None:
+		if log is None:
+			return
+		file_meta: Mapping[str, Any] = to_convert[path]["file_meta"]
+		log.page(
+			path=path,
+			source=file_meta["path_raw"],
+			status=status,
+			cache=(
+				None
+				if cached_keys is None
+				else ("hit" if path in cached_keys else "miss")
+			),
+			seconds=seconds,
+			stages=pop_page_stages(path),
+			output=file_meta["path_html"] if status == "built" else None,
+			output_file=(
+				output_root / config.output_dir / file_meta["path_html"]
+				if status == "built"
+				else None
+			),
+			error=None if error is None else f"{type(error).__name__}: {error}",
+		)
+
 	if verbose:
-		print(f"Converting {n_files} markdown files to HTML...")
-	for idx, (path, doc) in enumerate(docs.items()):
-		path_raw: str = doc["file_meta"]["path_raw"]
-		if smart_rebuild and Path(path_raw).stat().st_mtime <= rebuild_time:
-			if verbose:
-				print(f"\t({idx + 1:3} / {n_files})  [unmodified]  '{path_raw}'")
-		else:
-			if verbose:
-				print(f"\t({idx + 1:3} / {n_files})  [building..]  '{path_raw}'")
+		print(
+			f"Converting {n_files} markdown files to HTML..."
+			+ (
+				(
+					f" (up to {jobs} concurrent pandoc processes)"
+					if executor == "async"
+					else f" (in {jobs} worker processes)"
+				)
+				if jobs > 1
+				else ""
+			)
+		)
 
-			try:
+	def pages_to_build() -> Iterator[tuple[str, Mapping[str, Any]]]:
+		for path in order:
+			if max_errors is not None and len(exceptions) >= max_errors:
+				return
+			doc = to_convert[path]
+			path_raw: str = doc["file_meta"]["path_raw"]
+			if smart_rebuild and Path(path_raw).stat().st_mtime <= rebuild_time:
+				progress.done(path, skipped=True)
+				log_page(path, "unmodified")
+				if verbose:
+					print(f"\t({progress.format()})  [unmodified]  '{path_raw}'")
+			else:
+				if verbose:
+					print(f"\t({progress.format()})  [building..]  '{path_raw}'")
+				yield path, doc
+
+	def on_converted(path: str, seconds: float) -> None:
+		progress.done(path)
+		log_page(path, "built", seconds=seconds)
+		if page_times is not None:
+			page_times[path] = seconds
+
+	def on_error(path_raw: str, e: Exception) -> None:
+		exceptions[path_raw] = e
+		progress.done(keys_by_path_raw[path_raw])
+		log_page(keys_by_path_raw[path_raw], "failed", error=e)
+		if verbose:
+			print(f"\t\t\033[91mERROR: could not convert '{path_raw}'\033[0m")
+
+	def convert_here(path: str, doc: Mapping[str, Any]) -> None:
+		start: float = time.perf_counter()
+		try:
+			with span("page", doc=path):
 				convert_single_markdown_file(
 					path=path,
 					output_root=output_root,
 					doc=doc,
-					docs=docs,
+					docs=context_docs,
 					jinja_env=jinja_env,
 					config=config,
 					intermediates_dir=intermediates_dir,
 				)
-			except Exception as e:
-				if isinstance(e, (KeyboardInterrupt, SystemExit)):
-					raise
-				exceptions[path_raw] = e
-				if verbose:
-					print(f"\t\t\033[91mERROR: could not convert '{path_raw}'\033[0m")
+		# errors are collected per page and raised together after conversion
+		except Exception as e:  # noqa: BLE001
+			on_error(doc["file_meta"]["path_raw"], e)
+		else:
+			on_converted(path, time.perf_counter() - start)
+
+	if log is not None:
+		start_page_stages()
+	try:
+		if jobs > 1 and executor == "process":
+			failed_in_order: list[str] = _convert_pages_in_processes(
+				(path for path, _ in pages_to_build()),
+				docs=docs,
+				config=config,
+				output_root=output_root,
+				intermediates_dir=intermediates_dir,
+				low_memory=low_memory,
+				jobs=jobs,
+				on_converted=on_converted,
+				max_errors=max_errors,
+			)
+			# exceptions lose their traceback between processes, so get them here,
+			# in document order
+			failed: set[str] = set(failed_in_order)
+			for path, doc in to_convert.items():
+				if path in failed:
+					convert_here(path, doc)
+		elif jobs > 1:
+			import asyncio
+
+			asyncio.run(
+				_convert_pages_async(
+					pages_to_build(),
+					output_root=output_root,
+					docs=context_docs,
+					jinja_env=jinja_env,
+					config=config,
+					intermediates_dir=intermediates_dir,
+					jobs=jobs,
+					on_error=on_error,
+					on_converted=on_converted,
+					max_errors=max_errors,
+				)
+			)
+			# pages finish out of order, report errors in document order
+			doc_index: dict[str, int] = {key: idx for idx, key in enumerate(to_convert)}
+			exceptions = dict(
+				sorted(
+					exceptions.items(),
+					key=lambda kv: doc_index[keys_by_path_raw[kv[0]]],
+				)
+			)
+		else:
+			for path, doc in pages_to_build():
+				convert_here(path, doc)
+	finally:
+		if log is not None:
+			stop_page_stages()
+
 	if exceptions:
+		# pages neither converted, failed, nor skipped as unmodified
+		n_skipped: int = n_files - len(progress.done_keys)
+		stopped: str = ""
+		if n_skipped:
+			stopped = f" (stopped early, {n_skipped} files not converted)"
+			if verbose:
+				print(
+					f"\t\033[91mstopped after {len(exceptions)} errors, "
+					f"{n_skipped} files not converted\033[0m"
+				)
 		first_key: str = next(iter(exceptions.keys()))
 		if len(exceptions) == 1:
 			raise ConversionError(
-				f"error converting file '{first_key}'",
+				f"error converting file '{first_key}'{stopped}",
 				n_failed=1,
 				n_total=n_files,
+				n_skipped=n_skipped,
 			) from exceptions[first_key]
 		else:
 			raise MultipleExceptions(
-				f"failed to convert {len(exceptions)}/{n_files} files",
+				f"failed to convert {len(exceptions)}/{n_files} files{stopped}",
 				exceptions,
 				n_total=n_files,
+				n_skipped=n_skipped,
 			) from exceptions[first_key]
 
 
+def create_jinja_env(config: Config, root_dir: Path) -> "Environment":
+	"""create the Jinja2 environment for a site, loading templates from `config.templates_dir`
+
+	if `config.cache_dir` is set, compiled templates are also cached there, in
+	`TEMPLATE_BYTECODE_DIRNAME`, unless `jinja_env_kwargs` sets a `bytecode_cache`
+	"""
+	from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+	env_kwargs: dict[str, Any] = dict(config.jinja_env_kwargs)
+	if config.cache_dir and "bytecode_cache" not in env_kwargs:
+		bytecode_dir: Path = root_dir / config.cache_dir / TEMPLATE_BYTECODE_DIRNAME
+		bytecode_dir.mkdir(parents=True, exist_ok=True)
+		env_kwargs["bytecode_cache"] = FileSystemBytecodeCache(str(bytecode_dir))
+	jinja_env: Environment = Environment(
+		loader=FileSystemLoader([root_dir / config.templates_dir]),
+		**env_kwargs,
+	)
+	# so that `tojson` accepts documents, which are mappings but not dicts
+	jinja_env.policies["json.dumps_kwargs"] = {
+		**jinja_env.policies["json.dumps_kwargs"],
+		"default": json_default,
+	}
+	return jinja_env
+
+
+def prewarm_templates(
+	jinja_env: "Environment",
+	docs: Mapping[str, Mapping[str, Any]],
+	config: Config,
+) -> list[str]:
+	"""load and compile every template used by a page before conversion, so that errors show up early
+
+	compiles the default template, every `__template__` referenced in
+	frontmatter, and the templates these pull in through `extends`, `include`,
+	`import`, or `from`, recursively. other files in `config.templates_dir`
+	(images, scripts, templates not used by any page) are left alone, as are
+	templates referenced by a name computed at render time. compiled templates
+	stay in the environment's cache for the conversion, and in its bytecode
+	cache if there is one (see `create_jinja_env`).
+
+	# Parameters:
+	 - `jinja_env : Environment` - environment the pages will be rendered with
+	 - `docs : Mapping[str, Mapping[str, Any]]` - documents, for `__template__` references
+	 - `config : Config` - for the default template
+
+	# Returns:
+	 - `list[str]` - names of the templates compiled, sorted
+
+	# Raises:
+	 - `RenderError` : for the first template which can't be loaded or compiled,
+	   or which is referenced by a page but does not exist
+	"""
+	from jinja2 import TemplateNotFound, meta
+
+	# template name -> documents referencing it
+	referenced: dict[str, list[str]] = {config.default_template.as_posix(): []}
+	for path, doc in docs.items():
+		name: Any = doc["frontmatter"].get("__template__")
+		if name is not None:
+			referenced.setdefault(str(name), []).append(path)
+
+	compiled: set[str] = set()
+	to_compile: list[str] = sorted(referenced, reverse=True)
+	while to_compile:
+		name = to_compile.pop()
+		if name in compiled:
+			continue
+		source: str | None = None
+		try:
+			source = jinja_env.loader.get_source(jinja_env, name)[0]  # type: ignore[union-attr]
+			jinja_env.get_template(name)
+		except TemplateNotFound as e:
+			if name not in referenced:
+				# pulled in by another template, maybe with `ignore missing`:
+				# if it is needed, rendering the page reports it
+				continue
+			raise _template_error(jinja_env, name, source, referenced[name]) from e
+		except Exception as e:
+			raise _template_error(
+				jinja_env, name, source, referenced.get(name, [])
+			) from e
+		compiled.add(name)
+		# names computed at render time are `None`
+		to_compile += [
+			ref
+			for ref in meta.find_referenced_templates(jinja_env.parse(source))
+			if ref is not None and ref not in compiled
+		]
+	return sorted(compiled)
+
+
+def _template_error(
+	jinja_env: "Environment",
+	name: str,
+	source: str | None,
+	users: list[str],
+) -> RenderError:
+	"""`RenderError` for the template `name`, used by the pages `users`"""
+	return RenderError(
+		f"Error compiling template '{name}'"
+		+ (f", used by {', '.join(repr(u) for u in users[:5])}" if users else "")
+		+ (f" and {len(users) - 5} more" if len(users) > 5 else ""),
+		kind="create_template",
+		content=source,
+		context=None,
+		jinja_env=jinja_env,
+		template=None,
+	)
+
+
 def pipeline(
 	config_path: Path,
 	verbose: bool = True,
 	smart_rebuild: bool = False,
+	jobs: int = 1,
+	low_memory: bool = False,
+	executor: str = "async",
+	shard: ShardSpec | None = None,
+	max_errors: int | None = None,
 ) -> None:
 	"""build the website
 
@@ -643,29 +1802,52 @@ def pipeline(
 	- set up a Jinja2 environment according to the config
 	- build a document tree from the markdown files in the content directory
 	- process the markdown files into HTML files and write them to the output directory
+
+	`jobs` is the number of worker processes to use for parallel stages, see `resolve_jobs`,
+	and `executor` how pages are converted in parallel, see `convert_markdown_files`
+
+	with `low_memory`, templates get `docs` without bodies (see
+	`convert_markdown_files`), the frontmatter cache is released once saved,
+	and the peak memory use is printed at the end of the build
+
+	with `shard`, only the pages and content files assigned to that shard are
+	written, together with a manifest for `merge`, see `pdj_sitegen.shard`
+
+	with `max_errors`, conversion stops once that many pages failed, see
+	`convert_markdown_files`
+
+	if a build log is active, the discovery, every page, and the copying of
+	content files are logged to it, see `pdj_sitegen.build_log`
 	"""
 
 	# set up spinner context manager, depending on verbosity
-	sp_class: Any = (
-		functools.partial(SpinnerContext, update_interval=0.01)
-		if verbose
-		else NoOpContextManager
-	)
+	sp_class: Any
+	if verbose:
+		from muutils.spinner import SpinnerContext
+
+		# the default stream of the spinner is bound when muutils is imported
+		sp_class = functools.partial(
+			SpinnerContext, update_interval=0.01, output_stream=sys.stdout
+		)
+	else:
+		from muutils.spinner import NoOpContextManager
+
+		sp_class = NoOpContextManager
 
 	# get config path, change to the directory containing the config file
 	root_dir: Path = config_path.parent
 	root_dir_absolute: Path = root_dir.absolute()
 
 	# read config and set up Jinja environment
-	with sp_class(message="read config and set up jinja environment..."):
+	with (
+		sp_class(message="read config and set up jinja environment..."),
+		span("config"),
+	):
 		# Read the config file
 		config: Config = Config.read(root_dir_absolute / config_path.name)
 
 		# Set up Jinja2 environment
-		jinja_env: Environment = Environment(
-			loader=FileSystemLoader([root_dir_absolute / config.templates_dir]),
-			**config.jinja_env_kwargs,
-		)
+		jinja_env: Environment = create_jinja_env(config, root_dir_absolute)
 
 		# figure out the last rebuild time, then touch the file to update its mtime
 		rebuild_time: float
@@ -678,49 +1860,156 @@ def pipeline(
 
 		build_time_path.touch()
 
-	# build doc tree (get .md files from `config.content_dir`, split content and frontmatter, execute templates on frontmatter)
-	docs: dict[str, dict[str, Any]] = build_document_tree(
-		content_dir=root_dir_absolute / config.content_dir,
-		frontmatter_context={"config": config.serialize()},
-		jinja_env=jinja_env,
-		verbose=verbose,
-		normalize_index_names=config.normalize_index_names,
+	if verbose:
+		print(f"YAML loader: {YAML_LOADER.__name__}")
+
+	cache_dir: Path | None = (
+		root_dir_absolute / config.cache_dir if config.cache_dir else None
 	)
+	log: BuildLog | None = active_build_log()
+	cached_keys: set[str] | None = set() if cache_dir is not None else None
+	with span("discovery"):
+		# load the frontmatter cache, which is only valid for the same frontmatter context
+		frontmatter_context: dict[str, Any] = {"config": config.serialize()}
+		cache: BuildCache = BuildCache.load(
+			cache_dir=cache_dir,
+			context_hash=hash_context(frontmatter_context),
+		)
+
+		# build doc tree (get .md files from `config.content_dir`, split content and frontmatter, execute templates on frontmatter)
+		docs: dict[str, Document] = build_document_tree(
+			content_dir=root_dir_absolute / config.content_dir,
+			frontmatter_context=frontmatter_context,
+			jinja_env=jinja_env,
+			verbose=verbose,
+			normalize_index_names=config.normalize_index_names,
+			jobs=jobs,
+			cache=cache,
+			cached_keys=cached_keys,
+		)
+		cache.save()
+		if low_memory:
+			# the cache entries are only needed again by the next build
+			del cache
+
+	if log is not None:
+		log.emit(
+			"discovery",
+			pages=len(docs),
+			cache_hits=None if cached_keys is None else len(cached_keys),
+		)
+
+	# compile all templates up front, so a broken template fails the build before any conversion
+	with sp_class(message="compiling templates..."), span("templates"):
+		templates: list[str] = prewarm_templates(jinja_env, docs, config)
+	if verbose:
+		print(f"Compiled {len(templates)} templates")
 
 	# convert markdown files to HTML (execute templates with frontmatter on content, convert to HTML with Pandoc, execute template on HTML)
-	convert_markdown_files(
-		docs=docs,
-		jinja_env=jinja_env,
-		config=config,
-		output_root=root_dir_absolute,
-		smart_rebuild=smart_rebuild,
-		rebuild_time=rebuild_time,
-		verbose=verbose,
-		intermediates_dir=(
-			root_dir_absolute / config.intermediates_dir
-			if config.intermediates_dir
-			else None
-		),
+	intermediates_dir: Path | None = (
+		root_dir_absolute / config.intermediates_dir
+		if config.intermediates_dir
+		else None
 	)
+	if intermediates_dir is not None:
+		check_stages(config.intermediates_stages)
+	# conversion times of the last build, to balance shards and updated by this build
+	page_times: dict[str, float] = load_page_times(cache_dir)
+	keys: set[str] | None = None
+	assignment: dict[str, int] = {}
+	if shard is not None:
+		assignment = assign_pages(docs, page_times, shard.count)
+		keys = {k for k, s in assignment.items() if s == shard.index}
+		if verbose:
+			print(f"Shard {shard}: converting {len(keys)} of {len(docs)} pages")
+	if intermediates_dir is not None:
+		# intermediates are written in the background, see `pdj_sitegen.intermediates`
+		start_writer(intermediates_dir, archive=config.intermediates_archive)
+	try:
+		with span("convert"):
+			convert_markdown_files(
+				docs=docs,
+				jinja_env=jinja_env,
+				config=config,
+				output_root=root_dir_absolute,
+				smart_rebuild=smart_rebuild,
+				rebuild_time=rebuild_time,
+				verbose=verbose,
+				intermediates_dir=intermediates_dir,
+				keys=keys,
+				low_memory=low_memory,
+				jobs=jobs,
+				executor=executor,
+				page_times=page_times,
+				max_errors=max_errors,
+				cached_keys=cached_keys,
+			)
+	except BaseException:
+		# a conversion error is more useful than an error writing intermediates
+		with contextlib.suppress(Exception):
+			stop_writer()
+		raise
+	with span("intermediates"):
+		stop_writer()
+	if shard is None:
+		save_page_times(cache_dir, {k: v for k, v in page_times.items() if k in docs})
 
 	# copy content files to output dir (excluding .md by default)
-	with sp_class(message="Copying content files..."):
-		copy_content_files(
+	with sp_class(message="Copying content files..."), span("copy"):
+		files_copied: int = copy_content_files(
 			content_dir=root_dir_absolute / config.content_dir,
 			output_dir=root_dir_absolute / config.output_dir,
 			include=config.copy_include,
 			exclude=config.copy_exclude,
 			verbose=verbose,
+			select=(
+				None
+				if shard is None
+				else lambda rel_path: file_shard(rel_path, shard.count) == shard.index
+			),
 		)
 
+	if log is not None:
+		log.emit("copy", files_copied=files_copied)
+
+	if shard is not None:
+		write_manifest(
+			root_dir_absolute / config.output_dir, shard, assignment, page_times
+		)
+
+	if low_memory and verbose and log is None:
+		peak_rss: float | None
+		peak_rss_children: float | None
+		peak_rss, peak_rss_children = peak_rss_mb()
+		if peak_rss is not None:
+			print(
+				f"Peak memory: {peak_rss:.0f} MB"
+				f" (largest child process: {peak_rss_children:.0f} MB)"
+			)
+
 
 def main() -> None:
 	"""Parse command-line arguments and run the build pipeline.
 
 	This is the main entry point for the pdj-sitegen CLI. It parses arguments
 	for the config file path, verbosity, and smart rebuild mode, then calls
-	pipeline() with the parsed options.
+	pipeline() with the parsed options. `serve` as the first argument starts
+	the development server instead, see `pdj_sitegen.serve`, and `merge`
+	combines the outputs of a sharded build, see `pdj_sitegen.shard`.
 	"""
+	if sys.argv[1:2] == ["serve"]:
+		from pdj_sitegen.serve import main as serve_main
+
+		serve_main(sys.argv[2:])
+		return
+	if sys.argv[1:2] == ["merge"]:
+		from pdj_sitegen.shard import main as merge_main
+
+		merge_main(sys.argv[2:])
+		return
+
+	import argparse
+
 	# parse args
 	arg_parser: argparse.ArgumentParser = argparse.ArgumentParser(
 		description="Build a static site from markdown content using Pandoc and Jinja2.",
@@ -730,6 +2019,19 @@ Examples:
   python -m pdj_sitegen config.toml             # Build with TOML config
   python -m pdj_sitegen config.yml -s           # Smart rebuild (only modified files)
   python -m pdj_sitegen config.yml -q           # Quiet mode (minimal output)
+  python -m pdj_sitegen config.yml -j 0         # Use one worker process per CPU
+  python -m pdj_sitegen config.yml -w           # Rebuild affected pages on every change
+  python -m pdj_sitegen config.yml --low-memory # Bound memory use for very large sites
+  python -m pdj_sitegen config.yml --fail-fast  # Stop at the first page that fails
+  python -m pdj_sitegen config.yml --profile    # Write a timing report to .pdj-sitegen/
+  python -m pdj_sitegen config.yml --trace      # Write a Chrome/Perfetto trace to .pdj-sitegen/
+
+To serve a site for development, rendering pages on demand with live reload:
+  python -m pdj_sitegen serve config.yml        # see `serve --help`
+
+To split a build across machines, build every shard, then merge their outputs:
+  python -m pdj_sitegen config.yml --shard 2/4  # pages and files of shard 2 of 4
+  python -m pdj_sitegen merge config.yml DIR... # see `merge --help`
 
 To generate a default config file:
   python -m pdj_sitegen.config        # prints TOML (default)
@@ -759,12 +2061,168 @@ For more information, see: https://miv.name/pdj-sitegen/
 			"Uses .build_time file to track last build timestamp"
 		),
 	)
-	args: argparse.Namespace = arg_parser.parse_args()
-	pipeline(
-		config_path=Path(args.config_path),
-		verbose=not args.quiet,
-		smart_rebuild=args.smart_rebuild,
+	arg_parser.add_argument(
+		"-j",
+		"--jobs",
+		type=int,
+		default=1,
+		help=(
+			"number of worker processes for reading and rendering frontmatter, and "
+			"of concurrent pandoc processes. 0 uses one per CPU (default: 1)"
+		),
+	)
+	arg_parser.add_argument(
+		"--executor",
+		choices=EXECUTORS,
+		default="async",
+		help=(
+			"how pages are converted with --jobs: 'async' renders templates in this "
+			"process and runs pandoc concurrently, 'process' renders and converts "
+			"whole pages in worker processes (default: async)"
+		),
+	)
+	arg_parser.add_argument(
+		"-w",
+		"--watch",
+		action="store_true",
+		help=(
+			"build the site, then keep it in memory and rebuild only the affected "
+			"pages whenever content, templates, or the config change"
+		),
+	)
+	arg_parser.add_argument(
+		"--profile",
+		action="store_true",
+		help=(
+			"record wall and CPU time per stage and per page, and write a report "
+			"to .pdj-sitegen/<timestamp>/ next to the config file"
+		),
+	)
+	arg_parser.add_argument(
+		"--low-memory",
+		action="store_true",
+		help=(
+			"keep memory use bounded for very large sites: templates get `docs` "
+			"without bodies, and the peak memory use is printed at the end"
+		),
 	)
+	arg_parser.add_argument(
+		"--trace",
+		action="store_true",
+		help=(
+			"write a Chrome/Perfetto trace-event file of the build, including "
+			"discovery workers, to .pdj-sitegen/<timestamp>/trace.json"
+		),
+	)
+	arg_parser.add_argument(
+		"--shard",
+		type=str,
+		default=None,
+		metavar="K/N",
+		help=(
+			"only convert the pages and copy the files assigned to shard K of N, "
+			"balanced by the page times of the last build, then combine the "
+			"outputs of all shards with `merge`"
+		),
+	)
+	arg_parser.add_argument(
+		"--log-format",
+		choices=LOG_FORMATS,
+		default="text",
+		help=(
+			"'text' prints progress for humans, 'jsonl' writes one JSON event per "
+			"line to stdout instead, with the status, timings, and output size "
+			"of every page (default: text)"
+		),
+	)
+	error_limits = arg_parser.add_mutually_exclusive_group()
+	error_limits.add_argument(
+		"--fail-fast",
+		action="store_true",
+		help=(
+			"stop at the first page that fails to convert, instead of converting "
+			"every page and reporting all errors at the end"
+		),
+	)
+	error_limits.add_argument(
+		"--max-errors",
+		type=int,
+		default=None,
+		metavar="N",
+		help="stop once N pages failed to convert",
+	)
+	args: argparse.Namespace = arg_parser.parse_args()
+	max_errors: int | None = 1 if args.fail_fast else args.max_errors
+	if max_errors is not None and max_errors < 1:
+		arg_parser.error("--max-errors must be at least 1")
+	shard: ShardSpec | None = None
+	if args.shard is not None:
+		try:
+			shard = ShardSpec.parse(args.shard)
+		except ValueError as e:
+			arg_parser.error(str(e))
+		if args.watch:
+			arg_parser.error("--shard can't be used with --watch")
+	if args.watch and args.log_format != "text":
+		arg_parser.error("--log-format jsonl can't be used with --watch")
+	if args.watch:
+		from pdj_sitegen.watch import watch
+
+		watch(
+			config_path=Path(args.config_path),
+			verbose=not args.quiet,
+			jobs=args.jobs,
+		)
+		return
+	log: BuildLog | None = None
+	if args.log_format == "jsonl":
+		log = start_build_log()
+		log.emit(
+			"build_start",
+			config=args.config_path,
+			jobs=resolve_jobs(args.jobs),
+			executor=args.executor,
+		)
+	if args.profile or args.trace:
+		start_profiling()
+	error: BaseException | None = None
+	try:
+		pipeline(
+			config_path=Path(args.config_path),
+			verbose=not args.quiet and log is None,
+			smart_rebuild=args.smart_rebuild,
+			jobs=args.jobs,
+			low_memory=args.low_memory,
+			executor=args.executor,
+			shard=shard,
+			max_errors=max_errors,
+		)
+	except BaseException as e:
+		error = e
+		raise
+	finally:
+		profiler: Profiler | None = stop_profiling()
+		if profiler is not None:
+			report_dir: Path = write_report(
+				profiler,
+				Path(args.config_path).parent.absolute(),
+				profile=args.profile,
+				trace=args.trace,
+			)
+			# keep stdout for the build log
+			print(
+				f"Profile written to {report_dir}/",
+				file=sys.stdout if log is None else sys.stderr,
+			)
+		if log is not None:
+			log.emit(
+				"build_end",
+				status="ok" if error is None else "failed",
+				pages=dict(log.page_counts),
+				peak_rss_mb=peak_rss_mb()[0],
+				error=None if error is None else f"{type(error).__name__}: {error}",
+			)
+			stop_build_log()
 
 
 if __name__ == "__main__":
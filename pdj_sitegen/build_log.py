@@ -0,0 +1,166 @@
+"""Machine-readable build log, one JSON object per line
+
+With `--log-format jsonl`, the human progress output is replaced by events
+written to stdout, for build dashboards and other tools. Every event has an
+`event` type and `t`, the seconds since the log was started:
+
+- `build_start` : `config`, `jobs`, `executor`
+- `discovery` : `pages`, and `cache_hits` of the frontmatter cache
+- `page` : one per page, with `path` (the document key), `source`, `status`
+  (`built`, `unmodified`, or `failed`), `cache` (`hit` or `miss` of the
+  frontmatter cache, or null without a cache), `seconds`, `stages` (wall
+  seconds of each stage, see `pdj_sitegen.profiling`), `output` (the HTML
+  file, relative to the output directory) and its size in `bytes`, and
+  `error` for failed pages
+- `copy` : `files_copied`
+- `build_end` : `status` (`ok` or `failed`), `pages` (counts by status),
+  `peak_rss_mb`, and `error` if the build failed. its `t` is the build time
+
+Events are queued without ever blocking the build, and serialized and written
+by a background thread, which flushes whenever the queue runs empty. The size
+of the output file of a page is also read in that thread, see `BuildLog.page`.
+If the stream can't be written, for example because it is a closed pipe, the
+remaining events are dropped.
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Self, TextIO
+
+LOG_FORMATS: tuple[str, ...] = ("text", "jsonl")
+"""Values of `--log-format`: human progress output, or `BuildLog` events."""
+
+LOG_BUFFER_SIZE: int = 1 << 16
+"""Bytes buffered before the log is written to its stream."""
+
+
+class BuildLog:
+	"""writes events as JSON lines to `stream` from a background thread
+
+	use as a context manager, or call `close()`, which waits for all queued
+	events to be written.
+
+	# Parameters:
+	 - `stream : TextIO` - where to write the events, by default stdout
+	"""
+
+	def __init__(self, stream: TextIO | None = None) -> None:
+		self.stream: TextIO = sys.stdout if stream is None else stream
+		self.t0: float = time.perf_counter()
+		self.n_events: int = 0
+		self.page_counts: dict[str, int] = {}
+		self._queue: queue.SimpleQueue[dict[str, Any] | None] = queue.SimpleQueue()
+		self._thread: threading.Thread = threading.Thread(
+			target=self._run, name="pdj-sitegen-build-log", daemon=True
+		)
+		self._thread.start()
+
+	def emit(self, event: str, **fields: Any) -> None:
+		"""queue an event, never blocking"""
+		self._queue.put(
+			{"event": event, "t": round(time.perf_counter() - self.t0, 6), **fields}
+		)
+
+	def page(
+		self,
+		path: str,
+		source: str,
+		status: str,
+		cache: str | None = None,
+		seconds: float | None = None,
+		stages: dict[str, float] | None = None,
+		output: str | None = None,
+		output_file: Path | None = None,
+		error: str | None = None,
+	) -> None:
+		"""queue a `page` event, see the module docstring
+
+		`bytes` is the size of `output_file`, read when the event is written,
+		or null if there is no such file
+		"""
+		self.page_counts[status] = self.page_counts.get(status, 0) + 1
+		self.emit(
+			"page",
+			path=path,
+			source=source,
+			status=status,
+			cache=cache,
+			seconds=None if seconds is None else round(seconds, 6),
+			stages={k: round(v, 6) for k, v in (stages or {}).items()},
+			output=output,
+			bytes=output_file,
+			error=error,
+		)
+
+	def close(self) -> None:
+		"""write all queued events, then stop the thread"""
+		if self._thread.is_alive():
+			self._queue.put(None)
+			self._thread.join()
+
+	def __enter__(self) -> Self:
+		return self
+
+	def __exit__(self, *exc_info: object) -> None:
+		self.close()
+
+	def _run(self) -> None:
+		buffer: list[str] = []
+		size: int = 0
+		# cleared if the stream can't be written, after which events are dropped
+		writing: bool = True
+		while True:
+			item: dict[str, Any] | None = self._queue.get()
+			if item is not None and writing:
+				if isinstance(item.get("bytes"), Path):
+					try:
+						item["bytes"] = os.stat(item["bytes"]).st_size
+					except OSError:
+						item["bytes"] = None
+				line: str = json.dumps(item, default=str) + "\n"
+				buffer.append(line)
+				size += len(line)
+				self.n_events += 1
+			if writing and (
+				item is None or size >= LOG_BUFFER_SIZE or self._queue.empty()
+			):
+				try:
+					self.stream.write("".join(buffer))
+					self.stream.flush()
+				# like a closed pipe (`--log-format jsonl | head`): keep taking
+				# events from the queue, so the build and `close()` go on as usual
+				except OSError:
+					writing = False
+				buffer.clear()
+				size = 0
+			if item is None:
+				return
+
+
+_active: BuildLog | None = None
+
+
+def start_build_log(stream: TextIO | None = None) -> BuildLog:
+	"""activate a build log, used by the pipeline until `stop_build_log()`"""
+	global _active
+	_active = BuildLog(stream)
+	return _active
+
+
+def active_build_log() -> BuildLog | None:
+	"""the active build log, if any"""
+	return _active
+
+
+def stop_build_log() -> None:
+	"""deactivate the active build log and wait for it to write all events"""
+	global _active
+	log: BuildLog | None = _active
+	_active = None
+	if log is not None:
+		log.close()
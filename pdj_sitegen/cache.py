@@ -0,0 +1,181 @@
+"""Persistent build cache for pdj-sitegen.
+
+The cache is a single pickle file in `Config.cache_dir`, holding data that
+lets a rebuild skip work:
+
+- `FrontmatterEntry`: rendered and parsed frontmatter of one markdown file,
+  reused when the file and the frontmatter context are unchanged
+- `BuildCache`: the cache itself, with `load()` and `save()`
+
+A missing, unreadable, or outdated cache file is treated as empty. Compiled
+Jinja2 templates are also kept in the cache directory, in
+`TEMPLATE_BYTECODE_DIRNAME`, see `build.create_jinja_env`, and so are the
+conversion times of pages in `PAGE_TIMES_FNAME`, see `load_page_times`.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pdj_sitegen.consts import Format
+
+CACHE_VERSION: int = 1
+"""Bump this when the layout of the cached data changes."""
+
+CACHE_FNAME: str = "build_cache.pickle"
+"""Name of the cache file inside the cache directory."""
+
+TEMPLATE_BYTECODE_DIRNAME: str = "templates"
+"""Subdirectory of the cache directory for Jinja2's template bytecode cache."""
+
+PAGE_TIMES_FNAME: str = "page_times.json"
+"""Name of the file with per-page conversion times inside the cache directory."""
+
+StatSignature = tuple[int, int]
+"""`(st_mtime_ns, st_size)` of a file."""
+
+
+def stat_signature(st: os.stat_result) -> StatSignature:
+	"""get the signature used to detect changed files from a stat result"""
+	return (st.st_mtime_ns, st.st_size)
+
+
+def hash_text(text: str) -> str:
+	"""stable hash of a string, used for cache keys"""
+	return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def hash_context(context: dict[str, Any]) -> str:
+	"""stable hash of a JSON-like rendering context"""
+	return hash_text(json.dumps(context, sort_keys=True, default=str))
+
+
+@dataclass(slots=True)
+class FrontmatterEntry:
+	"""cached frontmatter of a single markdown file
+
+	only reused if the stat signature of the file is unchanged, since the
+	frontmatter may be rendered using the modification time from `file_meta`.
+	`content_hash` lets callers tell frontmatter edits apart from body edits.
+
+	# Attributes:
+	 - `stat_sig : StatSignature` - stat signature of the file when it was cached
+	 - `content_hash : str` - `hash_text` of the raw frontmatter section
+	 - `frontmatter : dict[str, Any]` - rendered and parsed frontmatter
+	 - `body_offset : int` - byte offset of the body in the file
+	 - `fmt : Format` - format of the frontmatter
+	"""
+
+	stat_sig: StatSignature
+	content_hash: str
+	frontmatter: dict[str, Any]
+	body_offset: int
+	fmt: Format
+
+
+@dataclass
+class BuildCache:
+	"""data persisted between builds, stored in `<cache_dir>/build_cache.pickle`
+
+	# Attributes:
+	 - `path : Path | None` - cache file location. if None, `save()` does nothing
+	 - `context_hash : str` - `hash_context` of the frontmatter rendering context
+	 - `frontmatter : dict[str, FrontmatterEntry]` - keyed by the raw path of the markdown file
+	"""
+
+	path: Path | None = None
+	context_hash: str = ""
+	frontmatter: dict[str, FrontmatterEntry] = field(default_factory=dict)
+
+	@classmethod
+	def load(cls, cache_dir: Path | None, context_hash: str) -> "BuildCache":
+		"""load the cache from `cache_dir`, or return an empty cache
+
+		frontmatter entries are dropped if they were rendered with a different context
+
+		# Parameters:
+		 - `cache_dir : Path | None` - directory holding the cache file. if None, caching is disabled
+		 - `context_hash : str` - `hash_context` of the current frontmatter rendering context
+
+		# Returns:
+		 - `BuildCache` - the loaded cache, or an empty one if missing or invalid
+		"""
+		if cache_dir is None:
+			return cls(path=None, context_hash=context_hash)
+		path: Path = cache_dir / CACHE_FNAME
+		data: dict[str, Any] = {}
+		try:
+			with open(path, "rb") as f:
+				data = pickle.load(f)
+		except FileNotFoundError:
+			pass
+		# a corrupted pickle can raise almost anything, and the cache is only an
+		# optimization, so any failure to read it means starting from scratch
+		except Exception as e:  # noqa: BLE001
+			import warnings
+
+			warnings.warn(f"Ignoring unreadable build cache {path}: {e}")
+
+		if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+			data = {}
+
+		cache: BuildCache = cls(path=path, context_hash=context_hash)
+		if data.get("context_hash") == context_hash:
+			cache.frontmatter = data.get("frontmatter", {})
+		return cache
+
+	def save(self) -> None:
+		"""write the cache to `self.path`, atomically replacing the old file"""
+		if self.path is None:
+			return
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_path: Path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+		with open(tmp_path, "wb") as f:
+			pickle.dump(
+				{
+					"version": CACHE_VERSION,
+					"context_hash": self.context_hash,
+					"frontmatter": self.frontmatter,
+				},
+				f,
+				protocol=pickle.HIGHEST_PROTOCOL,
+			)
+		os.replace(tmp_path, self.path)
+
+
+def load_page_times(cache_dir: Path | None) -> dict[str, float]:
+	"""seconds each page took to convert, keyed by document key, or `{}` if unknown
+
+	unlike the frontmatter cache, the times are kept when the config changes,
+	since they are only used as estimates, see `pdj_sitegen.shard`
+	"""
+	if cache_dir is None:
+		return {}
+	try:
+		with open(cache_dir / PAGE_TIMES_FNAME, encoding="utf-8") as f:
+			data: Any = json.load(f)
+	except (OSError, ValueError):
+		return {}
+	if not isinstance(data, dict):
+		return {}
+	return {str(k): float(v) for k, v in data.items() if isinstance(v, (int, float))}
+
+
+def save_page_times(cache_dir: Path | None, page_times: dict[str, float]) -> None:
+	"""write `page_times` to `cache_dir`, atomically replacing the old file"""
+	if cache_dir is None:
+		return
+	cache_dir.mkdir(parents=True, exist_ok=True)
+	path: Path = cache_dir / PAGE_TIMES_FNAME
+	tmp_path: Path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+	with open(tmp_path, "w", encoding="utf-8") as f:
+		json.dump(
+			{k: round(v, 6) for k, v in sorted(page_times.items())},
+			f,
+			indent="\t",
+		)
+	os.replace(tmp_path, path)
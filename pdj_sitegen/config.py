@@ -9,12 +9,11 @@ This module provides:
 - CLI for printing default config templates (python -m pdj_sitegen.config)
 """
 
-import importlib.resources
 import json
 import tomllib
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import yaml
 
@@ -22,15 +21,36 @@ import pdj_sitegen
 from pdj_sitegen.consts import (
 	FORMAT_MAP,
 	Format,
+	yaml_safe_load,
 )
 
-DEFAULT_CONFIG_YAML: str = (
-	importlib.resources.files(pdj_sitegen).joinpath("data", "config.yml").read_text()
-)
 
-DEFAULT_CONFIG_TOML: str = (
-	importlib.resources.files(pdj_sitegen).joinpath("data", "config.toml").read_text()
-)
+def default_config_text(fmt: Format) -> str:
+	"""text of the default config file shipped with the package, `yaml` or `toml`"""
+	import importlib.resources
+
+	suffix: str = {"yaml": "yml", "toml": "toml"}[fmt]
+	return (
+		importlib.resources.files(pdj_sitegen)
+		.joinpath("data", f"config.{suffix}")
+		.read_text()
+	)
+
+
+if TYPE_CHECKING:
+	DEFAULT_CONFIG_YAML: str
+	"""the default config file, in YAML"""
+	DEFAULT_CONFIG_TOML: str
+	"""the default config file, in TOML"""
+
+
+def __getattr__(name: str) -> str:
+	# `DEFAULT_CONFIG_YAML` and `DEFAULT_CONFIG_TOML` are only read when accessed
+	if name == "DEFAULT_CONFIG_YAML":
+		return default_config_text("yaml")
+	if name == "DEFAULT_CONFIG_TOML":
+		return default_config_text("toml")
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def read_data_file(file_path: Path, fmt: Format | None = None) -> dict[str, Any]:
@@ -46,7 +66,7 @@ def read_data_file(file_path: Path, fmt: Format | None = None) -> dict[str, Any]
 	match fmt:
 		case "yaml":
 			with open(file_path, "r", encoding="utf-8") as f:
-				return yaml.safe_load(f)
+				return yaml_safe_load(f)
 		case "json":
 			with open(file_path, "r", encoding="utf-8") as f:
 				return json.load(f)
@@ -94,6 +114,7 @@ _PATH_FIELDS: tuple[str, ...] = (
 	"intermediates_dir",
 	"output_dir",
 	"build_time_fname",
+	"cache_dir",
 )
 
 
@@ -106,8 +127,16 @@ class Config:
 	templates_dir: Path = field(default_factory=lambda: Path("templates"))
 	default_template: Path = field(default_factory=lambda: Path("default.html.jinja2"))
 	intermediates_dir: Path | None = None
+	# "tar" or "zip" to pack the intermediates of a build into one archive next to `intermediates_dir`
+	intermediates_archive: str | None = None
+	# intermediates_include: glob patterns of document paths to capture (empty = every page)
+	# intermediates_stages: any of "frontmatter", "md", "html", "final" (empty = all)
+	intermediates_include: list[str] = field(default_factory=list)
+	intermediates_stages: list[str] = field(default_factory=list)
 	output_dir: Path = field(default_factory=lambda: Path("output"))
 	build_time_fname: Path = field(default_factory=lambda: Path(".build_time"))
+	# build cache directory, None to disable. frontmatter of unchanged files is reused from here
+	cache_dir: Path | None = None
 
 	# jinja2 settings and extra globals
 	jinja_env_kwargs: dict[str, Any] = field(default_factory=dict)
@@ -234,9 +263,9 @@ Note: JSON config files are supported for reading but not generated as templates
 	args = parser.parse_args()
 
 	if args.format == "toml":
-		print(DEFAULT_CONFIG_TOML)
+		print(default_config_text("toml"))
 	elif args.format == "yaml":
-		print(DEFAULT_CONFIG_YAML)
+		print(default_config_text("yaml"))
 
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ This module defines:
 
 - `Format`: Type alias for supported data formats ('yaml', 'json', 'toml')
 - `FORMAT_MAP`: Maps file extensions to Format values for auto-detection
+- `YAML_LOADER`: PyYAML loader used for all YAML parsing (libyaml-based when available)
+- `yaml_safe_load()`: `yaml.safe_load`, but using `YAML_LOADER`
 - `FORMAT_PARSERS`: Maps Format values to parser functions
 - `FRONTMATTER_DELIMS`: Maps frontmatter delimiter strings to their Format
 - `FRONTMATTER_REGEX`: Compiled regex for splitting frontmatter from content
@@ -12,7 +14,7 @@ This module defines:
 import json
 import re
 import tomllib
-from typing import Any, Callable, Literal
+from typing import IO, Any, Callable, Literal
 
 import yaml
 
@@ -34,10 +36,21 @@ FORMAT_MAP: dict[str, Format] = {
 	"TML": "toml",
 }
 
+# `yaml.safe_load` always uses the pure-python `SafeLoader`. if PyYAML was
+# built with libyaml, use the equivalent C-accelerated `CSafeLoader` instead.
+YAML_LOADER: Any = yaml.CSafeLoader if yaml.__with_libyaml__ else yaml.SafeLoader
+"""PyYAML loader class used by `yaml_safe_load`."""
+
+
+def yaml_safe_load(stream: str | bytes | IO[str] | IO[bytes]) -> Any:
+	"""parse YAML like `yaml.safe_load`, using `YAML_LOADER`"""
+	return yaml.load(stream, Loader=YAML_LOADER)
+
+
 # Maps Format values to parser functions that convert strings to dicts.
 # Each parser takes a string and returns a dictionary.
 FORMAT_PARSERS: dict[Format, Callable[[str], dict[str, Any]]] = {
-	"yaml": yaml.safe_load,
+	"yaml": yaml_safe_load,
 	"json": json.loads,
 	"toml": tomllib.loads,
 }
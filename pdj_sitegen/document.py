@@ -0,0 +1,293 @@
+"""Compact records for the documents of a site
+
+`build_document_tree` returns one `Document` per markdown file. Documents and
+their `FileMeta` are slotted read-only mappings, so templates and code written
+for the original nested dicts keep working: `doc["file_meta"]["path_html"]`,
+`doc.file_meta.path_html`, `doc.get("frontmatter")`, iteration, and comparing
+with a dict all behave as before.
+
+`FileMeta` only stores the document key, the source path, the modification
+time, and whether the output name was normalized from `_index`. The other
+fields (`path_stem`, `path_html`, `path_to_root`, `modified_time_str`) are
+computed on first access. Document keys are interned with `sys.intern`.
+Neither is a `dict`, so JSON encoders need `json_default` to serialize them.
+"""
+
+import contextlib
+import contextvars
+import datetime
+import sys
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+
+def _normalize_newlines(text: str) -> str:
+	"""translate newlines the same way as reading in text mode (universal newlines)"""
+	return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+_body_cache: contextvars.ContextVar[dict[tuple[str, int], str] | None] = (
+	contextvars.ContextVar("_body_cache", default=None)
+)
+
+
+@contextlib.contextmanager
+def cached_bodies() -> Iterator[None]:
+	"""keep the text of every `BodyRef` read in this context until it exits
+
+	used around the rendering of a page, so that a template reading the bodies
+	of other documents (`truncate(doc.body)` over `docs`) reads each file once.
+	nested uses share the outermost cache.
+	"""
+	if _body_cache.get() is not None:
+		yield
+		return
+	token: contextvars.Token[dict[tuple[str, int], str] | None] = _body_cache.set({})
+	try:
+		yield
+	finally:
+		_body_cache.reset(token)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class BodyRef:
+	"""lazy handle to the markdown body of a document
+
+	stores only the source path and the byte offset at which the body starts,
+	so that the document tree does not hold every body in memory. the body is
+	read from disk each time `read()` is called, unless inside `cached_bodies`.
+
+	it behaves like the body text in templates which access `docs[...].body`:
+	`str()`, `len()`, indexing and slicing, `in`, iteration, concatenation,
+	comparing and hashing, and the methods of `str` (like `body.split()`) all
+	read the body first, so filters like `length` and `truncate` work as
+	before, and a body compares equal to its text.
+
+	# Attributes:
+	 - `path : str` - path to the source markdown file
+	 - `offset : int` - byte offset of the start of the body in the file
+	"""
+
+	path: str
+	offset: int
+
+	def read(self) -> str:
+		"""read the body from disk, or from the cache of `cached_bodies`"""
+		cache: dict[tuple[str, int], str] | None = _body_cache.get()
+		if cache is not None and (self.path, self.offset) in cache:
+			return cache[(self.path, self.offset)]
+		with open(self.path, "rb") as f:
+			f.seek(self.offset)
+			text: str = _normalize_newlines(f.read().decode("utf-8"))
+		if cache is not None:
+			cache[(self.path, self.offset)] = text
+		return text
+
+	def __eq__(self, other: object) -> bool:
+		if isinstance(other, BodyRef):
+			return (self.path, self.offset) == (other.path, other.offset)
+		if isinstance(other, str):
+			return self.read() == other
+		return NotImplemented
+
+	def __hash__(self) -> int:
+		# equal to the hash of the text, since it compares equal to it
+		return hash(self.read())
+
+	def __str__(self) -> str:  # pyright: ignore[reportImplicitOverride]
+		return self.read()
+
+	def __len__(self) -> int:
+		return len(self.read())
+
+	def __getitem__(self, key: int | slice) -> str:
+		return self.read()[key]
+
+	def __contains__(self, item: str) -> bool:
+		return item in self.read()
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self.read())
+
+	def __add__(self, other: str) -> str:
+		return self.read() + other
+
+	def __radd__(self, other: str) -> str:
+		return other + self.read()
+
+	def __getattr__(self, name: str) -> Any:
+		# only called for names which are not fields: delegate to the text
+		if name.startswith("_") or not hasattr(str, name):
+			raise AttributeError(name)
+		return getattr(self.read(), name)
+
+
+FILE_META_KEYS: tuple[str, ...] = (
+	"path",
+	"path_stem",
+	"path_html",
+	"path_raw",
+	"path_to_root",
+	"modified_time",
+	"modified_time_str",
+)
+"""Keys of `FileMeta`, in the order of the original `file_meta` dict."""
+
+
+class FileMeta(Mapping[str, Any]):
+	"""metadata about the source file of a document, see `FILE_META_KEYS`
+
+	# Parameters:
+	 - `path : str` - document key: path relative to the content dir, without `.md`
+	 - `path_raw : str` - path of the markdown file
+	 - `modified_time : float` - modification time of the markdown file
+	 - `index_renamed : bool` - whether the output of this `_index.md` is named `index.html`
+	"""
+
+	__slots__ = (
+		"_modified_time_str",
+		"_path_html",
+		"_path_to_root",
+		"index_renamed",
+		"modified_time",
+		"path",
+		"path_raw",
+	)
+
+	def __init__(
+		self,
+		path: str,
+		path_raw: str,
+		modified_time: float,
+		index_renamed: bool = False,
+	) -> None:
+		self.path: str = sys.intern(path)
+		self.path_raw: str = path_raw
+		self.modified_time: float = modified_time
+		self.index_renamed: bool = index_renamed
+		self._path_html: str | None = None
+		self._path_to_root: str | None = None
+		self._modified_time_str: str | None = None
+
+	@property
+	def path_stem(self) -> str:
+		"""file name without the `.md` suffix"""
+		return self.path.rpartition("/")[2]
+
+	@property
+	def path_html(self) -> str:
+		"""output path, relative to the output dir"""
+		if self._path_html is None:
+			if self.index_renamed:
+				parent: str = self.path.rpartition("/")[0]
+				self._path_html = f"{parent}/index.html" if parent else "index.html"
+			else:
+				self._path_html = f"{self.path}.html"
+		return self._path_html
+
+	@property
+	def path_to_root(self) -> str:
+		"""relative path from the output file to the output root, `.` at the root"""
+		if self._path_to_root is None:
+			self._path_to_root = "/".join([".."] * self.path.count("/")) or "."
+		return self._path_to_root
+
+	@property
+	def modified_time_str(self) -> str:
+		"""`modified_time` as local `%Y-%m-%d %H:%M:%S`"""
+		if self._modified_time_str is None:
+			self._modified_time_str = datetime.datetime.fromtimestamp(
+				self.modified_time
+			).strftime("%Y-%m-%d %H:%M:%S")
+		return self._modified_time_str
+
+	def __getitem__(self, key: str) -> Any:
+		if key not in FILE_META_KEYS:
+			raise KeyError(key)
+		return getattr(self, key)
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(FILE_META_KEYS)
+
+	def __len__(self) -> int:
+		return len(FILE_META_KEYS)
+
+	def __repr__(self) -> str:
+		return f"FileMeta({dict(self)!r})"
+
+	def __reduce__(self) -> tuple[Any, ...]:
+		# derived fields are recomputed after unpickling
+		return (
+			FileMeta,
+			(self.path, self.path_raw, self.modified_time, self.index_renamed),
+		)
+
+
+class Document(Mapping[str, Any]):
+	"""a document of the site, with keys `frontmatter`, `body`, and `file_meta`
+
+	a document without a body (see `without_body`) has no `body` key, as if
+	the key was missing from a dict.
+
+	# Parameters:
+	 - `frontmatter : dict[str, Any]` - rendered and parsed frontmatter
+	 - `body : str | BodyRef | None` - markdown body, or a lazy handle to it
+	 - `file_meta : Mapping[str, Any]` - metadata about the source file, usually a `FileMeta`
+	"""
+
+	__slots__ = ("_body", "file_meta", "frontmatter")
+
+	def __init__(
+		self,
+		frontmatter: dict[str, Any],
+		body: str | BodyRef | None,
+		file_meta: Mapping[str, Any],
+	) -> None:
+		self.frontmatter: dict[str, Any] = frontmatter
+		self._body: str | BodyRef | None = body
+		self.file_meta: Mapping[str, Any] = file_meta
+
+	@property
+	def body(self) -> str | BodyRef:
+		"""markdown body, raises `AttributeError` if the document has none"""
+		if self._body is None:
+			raise AttributeError("body")
+		return self._body
+
+	def without_body(self) -> "Document":
+		"""a document sharing this one's frontmatter and file metadata, without a body"""
+		return Document(self.frontmatter, None, self.file_meta)
+
+	def _keys(self) -> tuple[str, ...]:
+		if self._body is None:
+			return ("frontmatter", "file_meta")
+		return ("frontmatter", "body", "file_meta")
+
+	def __getitem__(self, key: str) -> Any:
+		if key == "frontmatter":
+			return self.frontmatter
+		if key == "file_meta":
+			return self.file_meta
+		if key == "body" and self._body is not None:
+			return self._body
+		raise KeyError(key)
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self._keys())
+
+	def __len__(self) -> int:
+		return len(self._keys())
+
+	def __repr__(self) -> str:
+		return f"Document({dict(self)!r})"
+
+	def __reduce__(self) -> tuple[Any, ...]:
+		return (Document, (self.frontmatter, self._body, self.file_meta))
+
+
+def json_default(obj: Any) -> Any:
+	"""`default` for `json.dump`: mappings like `Document` as dicts, anything else as a string"""
+	if isinstance(obj, Mapping):
+		return dict(obj)
+	return str(obj)
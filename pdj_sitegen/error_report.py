@@ -13,6 +13,7 @@ import sys
 import traceback
 from pathlib import Path
 
+from pdj_sitegen.document import json_default
 from pdj_sitegen.exceptions import ConversionError, MultipleExceptions, RenderError
 
 
@@ -241,9 +242,9 @@ def dump_error_context(
 	if isinstance(exc, RenderError) and exc.context:
 		ctx_path = dump_dir / f"context{suffix}.json"
 		try:
-			# Use default=str to handle non-serializable objects
+			# documents as dicts, and str for other non-serializable objects
 			with open(ctx_path, "w", encoding="utf-8") as f:
-				json.dump(exc.context, f, indent=2, default=str)
+				json.dump(exc.context, f, indent=2, default=json_default)
 		except Exception as e:
 			import warnings
 
@@ -290,9 +291,12 @@ def handle_build_error(exc: BaseException, root_dir: Path) -> None:
 	else:
 		print(format_single_error(exc), file=sys.stderr)
 
-	# Print summary in red
+	# Print summary in red, noting files left out by --fail-fast or --max-errors
+	n_skipped: int = getattr(exc, "n_skipped", 0)
 	print(
-		f"\n\033[91m{n_failed}/{n_total} files failed to convert\033[0m",
+		f"\n\033[91m{n_failed}/{n_total} files failed to convert"
+		+ (f", {n_skipped} not converted (stopped early)" if n_skipped else "")
+		+ "\033[0m",
 		file=sys.stderr,
 	)
 	print(f"  Full details: {dump_dir}/", file=sys.stderr)
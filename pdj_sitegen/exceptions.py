@@ -9,9 +9,10 @@ This module defines custom exceptions for the build pipeline:
 """
 
 from collections.abc import Mapping
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
-from jinja2 import Environment, Template
+if TYPE_CHECKING:
+	from jinja2 import Environment, Template
 
 
 class SplitMarkdownError(Exception):
@@ -64,6 +65,7 @@ class ConversionError(Exception):
 	 - `message : str` - description of what went wrong
 	 - `n_failed : int` - number of files that failed to convert
 	 - `n_total : int` - total number of files in the batch
+	 - `n_skipped : int` - number of files not converted because the batch stopped early
 	"""
 
 	def __init__(
@@ -71,11 +73,13 @@ class ConversionError(Exception):
 		message: str,
 		n_failed: int = 1,
 		n_total: int = 1,
+		n_skipped: int = 0,
 	) -> None:
 		super().__init__(message)
 		self.message: str = message
 		self.n_failed: int = n_failed
 		self.n_total: int = n_total
+		self.n_skipped: int = n_skipped
 
 
 class RenderError(Exception):
@@ -99,8 +103,8 @@ class RenderError(Exception):
 		kind: Literal["create_template", "render_template"],
 		content: str | None,
 		context: dict[str, Any] | None,
-		jinja_env: Environment | None,
-		template: Template | None,
+		jinja_env: "Environment | None",
+		template: "Template | None",
 	) -> None:
 		super().__init__(message)
 		self.message: str = message
@@ -146,6 +150,7 @@ class MultipleExceptions(Exception):
 	 - `exceptions : dict[str, Exception]` - dictionary mapping source identifiers to exceptions
 	 - `n_failed : int` - number of failures (computed from len(exceptions))
 	 - `n_total : int` - total number of items that were processed
+	 - `n_skipped : int` - number of items not processed because the batch stopped early
 	"""
 
 	def __init__(
@@ -153,12 +158,14 @@ class MultipleExceptions(Exception):
 		message: str,
 		exceptions: Mapping[str, Exception],
 		n_total: int = 0,
+		n_skipped: int = 0,
 	) -> None:
 		super().__init__(message)
 		self.message: str = message
 		self.exceptions: dict[str, Exception] = dict(exceptions)
 		self.n_failed: int = len(exceptions)
 		self.n_total: int = n_total if n_total > 0 else len(exceptions)
+		self.n_skipped: int = n_skipped
 
 	def __str__(self) -> str:  # pyright: ignore[reportImplicitOverride]
 		return (
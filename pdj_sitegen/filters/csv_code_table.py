@@ -23,18 +23,29 @@ Supported options:
 - `source`: path to external CSV file
 - `aligns`: column alignments (L=left, C=center, R=right, D=default)
 - `caption`: table caption
+- `render`: `ast` (default) to emit a pandoc Table element, or `html` to emit
+  the table as a raw HTML block, skipping pandoc's Table handling entirely.
+  `html` output is dropped by pandoc when converting to non-HTML formats.
 
 By [@mivanit](mivanit.github.io)
 """
 
 import csv
+import html
 import io
 import json
 import os
+import re
 import sys
-from typing import Any
+from json.encoder import encode_basestring_ascii as _encode_str
+from typing import Any, NamedTuple
 
-from pandocfilters import toJSONFilter  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+from pdj_sitegen.filters.pandoc_json import (
+	document_meta,
+	dumps,
+	walk,
+	write_document,
+)
 
 ALIGN_MAP: dict[str, str] = {
 	"L": "AlignLeft",
@@ -43,6 +54,17 @@ ALIGN_MAP: dict[str, str] = {
 	"D": "AlignDefault",
 }
 
+# cell attributes matching what pandoc's HTML writer emits for each alignment
+ALIGN_HTML_ATTRS: dict[str, str] = {
+	"L": ' style="text-align: left;"',
+	"C": ' style="text-align: center;"',
+	"R": ' style="text-align: right;"',
+	"D": "",
+}
+
+# values of the `render` option: pandoc Table AST, or a raw HTML block
+RENDER_MODES: tuple[str, ...] = ("ast", "html")
+
 
 def emptyblock() -> list[Any]:
 	"""Create an empty pandoc AST attribute block.
@@ -150,30 +172,37 @@ def keyvals_process(keyvals: list[tuple[str, str]]) -> dict[str, str]:
 	return {key: val for key, val in keyvals}
 
 
-def codeblock_process(
-	key: str, value: Any, _format: str, _meta: Any
-) -> dict[str, Any] | None:
-	"""Process a CodeBlock and convert csv_table blocks to Table elements.
+class CsvTable(NamedTuple):
+	"""Parsed contents and options of a `csv_table` code block.
+
+	# Attributes:
+	 - `aligns : list[str]` - one of `ALIGN_MAP`'s keys per column
+	 - `header : list[str]` - header row (empty list for no header)
+	 - `rows : list[list[str]]` - body rows
+	 - `caption : str | None` - table caption
+	 - `render : str` - one of `RENDER_MODES`
+	"""
 
-	This is the main pandoc filter function. It checks if a CodeBlock has the
-	'csv_table' class and, if so, parses the CSV content (either inline or from
-	a source file) and returns a pandoc Table AST element.
+	aligns: list[str]
+	header: list[str]
+	rows: list[list[str]]
+	caption: str | None
+	render: str = "ast"
+
+
+def parse_csv_table(key: str, value: Any) -> CsvTable | None:
+	"""Read the options and CSV data of a `csv_table` CodeBlock.
 
 	# Parameters:
 	 - `key : str` - pandoc AST element type (only 'CodeBlock' is processed)
 	 - `value : Any` - pandoc AST element content
-	 - `format_ : str` - output format (unused)
-	 - `_ : Any` - document metadata (unused)
 
 	# Returns:
-	 - `dict[str, Any] | None` - pandoc Table element if processed, None otherwise
+	 - `CsvTable | None` - parsed table, or None if the element is not a csv_table block
 
 	# Raises:
 	 - `ValueError` : if CSV data is empty, not rectangular, or has invalid options
 	 - `FileNotFoundError` : if source CSV file does not exist
-
-	# Notes:
-	 - Use `header=0` or `header=false` to create a table without a header row
 	"""
 	# figure out whether this block should be processed
 	if not (key == "CodeBlock"):
@@ -209,6 +238,11 @@ def codeblock_process(
 		list(keyvals.get("aligns", "")) if "aligns" in keyvals else None
 	)
 	caption: str | None = keyvals.get("caption", None)
+	render: str = keyvals.get("render", "ast").lower()
+	if render not in RENDER_MODES:
+		raise ValueError(
+			f"Invalid render value: {render!r}. Use one of {', '.join(RENDER_MODES)}."
+		)
 
 	# read the csv source into a table
 	table_data: list[list[str]]
@@ -240,14 +274,43 @@ def codeblock_process(
 				f"aligns length mismatch: expected {n_cols}, got {len(aligns)}: {aligns}"
 			)
 
-	row_header: list[str]
-	table_rows: list[list[str]]
 	if header:
-		row_header = table_data[0]
-		table_rows = table_data[1:]
-	else:
-		row_header = []
-		table_rows = table_data
+		return CsvTable(aligns, table_data[0], table_data[1:], caption, render)
+	return CsvTable(aligns, [], table_data, caption, render)
+
+
+def codeblock_process(
+	key: str, value: Any, _format: str, _meta: Any
+) -> dict[str, Any] | None:
+	"""Process a CodeBlock and convert csv_table blocks to Table elements.
+
+	It checks if a CodeBlock has the 'csv_table' class and, if so, parses the
+	CSV content (either inline or from a source file) and returns a pandoc
+	Table AST element. `main` does not use this, since building the AST as
+	nested dicts is slow for large tables -- see `table_json`.
+
+	# Parameters:
+	 - `key : str` - pandoc AST element type (only 'CodeBlock' is processed)
+	 - `value : Any` - pandoc AST element content
+	 - `format_ : str` - output format (unused)
+	 - `_ : Any` - document metadata (unused)
+
+	# Returns:
+	 - `dict[str, Any] | None` - pandoc Table element (or html RawBlock, if
+	   `render=html`) if processed, None otherwise
+
+	# Raises:
+	 - `ValueError` : if CSV data is empty, not rectangular, or has invalid options
+	 - `FileNotFoundError` : if source CSV file does not exist
+
+	# Notes:
+	 - Use `header=0` or `header=false` to create a table without a header row
+	"""
+	table: CsvTable | None = parse_csv_table(key, value)
+	if table is None:
+		return None
+	if table.render == "html":
+		return {"t": "RawBlock", "c": ["html", table_html(table)]}
 
 	# write the table
 	return {
@@ -258,7 +321,7 @@ def codeblock_process(
 			# caption
 			[
 				None,
-				[] if caption is None else [Plain_factory(caption)],
+				[] if table.caption is None else [Plain_factory(table.caption)],
 			],
 			# aligns
 			[
@@ -266,18 +329,179 @@ def codeblock_process(
 					{"t": ALIGN_MAP[aln]},
 					{"t": "ColWidthDefault"},
 				]
-				for aln in aligns
+				for aln in table.aligns
 			],
 			# header
-			header_factory(row_header),
+			header_factory(table.header),
 			# rows
-			body_factory(table_rows),
+			body_factory(table.rows),
 			# ???
 			[emptyblock(), []],
 		],
 	}
 
 
+# pre-serialized fragments of the Table JSON. everything except the cell text
+# is identical for every cell/row, so it is serialized once here and the
+# output is built by string concatenation instead of nested dicts
+_ATTR_JSON: str = '["",[],[]]'
+_CELL_PREFIX_JSON: str = (
+	_ATTR_JSON + ',{"t":"AlignDefault"},1,1,[{"t":"Plain","c":[{"t":"Str","c":'
+)
+_CELL_SEP_JSON: str = "}]}]],[" + _CELL_PREFIX_JSON
+_ROW_PREFIX_JSON: str = "[" + _ATTR_JSON + ",[[" + _CELL_PREFIX_JSON
+_ROW_SUFFIX_JSON: str = "}]}]]]]"
+_COLSPEC_JSON: dict[str, str] = {
+	aln: '[{"t":"' + name + '"},{"t":"ColWidthDefault"}]'
+	for aln, name in ALIGN_MAP.items()
+}
+
+
+def row_json(lst_vals: list[str]) -> str:
+	"""Serialize a table row directly to pandoc JSON.
+
+	equivalent to `json.dumps(table_row_factory(lst_vals))`, up to whitespace
+
+	# Parameters:
+	 - `lst_vals : list[str]` - list of cell text values (must be non-empty)
+
+	# Returns:
+	 - `str` - JSON for the pandoc AST table row
+	"""
+	return (
+		_ROW_PREFIX_JSON
+		+ _CELL_SEP_JSON.join([_encode_str(val.strip()) for val in lst_vals])
+		+ _ROW_SUFFIX_JSON
+	)
+
+
+def table_json(table: CsvTable) -> str:
+	"""Serialize a parsed csv table directly to a pandoc JSON Table element.
+
+	equivalent to `json.dumps` of the `codeblock_process` output, up to
+	whitespace, but without building the intermediate AST.
+
+	# Parameters:
+	 - `table : CsvTable` - parsed table from `parse_csv_table`
+
+	# Returns:
+	 - `str` - JSON for the pandoc AST Table element
+	"""
+	caption_json: str = (
+		""
+		if table.caption is None
+		else '{"t":"Plain","c":[{"t":"Str","c":'
+		+ _encode_str(table.caption.strip())
+		+ "}]}"
+	)
+	return "".join(
+		[
+			'{"t":"Table","c":[',
+			_ATTR_JSON,
+			",[null,[",
+			caption_json,
+			"]],[",
+			",".join([_COLSPEC_JSON[aln] for aln in table.aligns]),
+			"],[",
+			_ATTR_JSON,
+			",[",
+			row_json(table.header) if table.header else "",
+			"]],[[",
+			_ATTR_JSON,
+			",0,[],[",
+			",".join([row_json(row) for row in table.rows]),
+			"]]],[",
+			_ATTR_JSON,
+			",[]]]}",
+		]
+	)
+
+
+def table_html(table: CsvTable) -> str:
+	"""Render a parsed csv table directly to an HTML `<table>`.
+
+	Matches the markup pandoc's HTML writer produces for the Table element
+	from `codeblock_process`: cell text is stripped and escaped, alignments
+	become `text-align` styles, and rows get alternating odd/even classes.
+
+	# Parameters:
+	 - `table : CsvTable` - parsed table from `parse_csv_table`
+
+	# Returns:
+	 - `str` - HTML for the table
+	"""
+	parts: list[str] = ["<table>\n"]
+	if table.caption is not None:
+		parts.append(
+			f"<caption>{html.escape(table.caption.strip(), quote=False)}</caption>\n"
+		)
+
+	col_attrs: list[str] = [ALIGN_HTML_ATTRS[aln] for aln in table.aligns]
+
+	def row_html(row: list[str], tag: str, cls: str) -> str:
+		cells: str = "".join(
+			[
+				f"<{tag}{attrs}>{html.escape(val.strip(), quote=False)}</{tag}>\n"
+				for attrs, val in zip(col_attrs, row)
+			]
+		)
+		return f'<tr class="{cls}">\n{cells}</tr>\n'
+
+	if table.header:
+		parts.append(f"<thead>\n{row_html(table.header, 'th', 'header')}</thead>\n")
+	parts.append("<tbody>\n")
+	parts.extend(
+		[
+			row_html(row, "td", "even" if idx % 2 else "odd")
+			for idx, row in enumerate(table.rows)
+		]
+	)
+	parts.append("</tbody>\n</table>")
+	return "".join(parts)
+
+
+# marker format for the `RawBlock` placeholders `main` puts in the AST in
+# place of each table, before splicing in the pre-serialized table JSON
+_PLACEHOLDER_FORMAT: str = "pdj-csv-code-table"
+_PLACEHOLDER_REGEX: re.Pattern[str] = re.compile(
+	r'\{"t":"RawBlock","c":\["' + re.escape(_PLACEHOLDER_FORMAT) + r'","(\d+)"\]\}'
+)
+
+
+def filter_json(source: str | bytes, format_: str = "") -> str:
+	"""Apply the csv table filter to a JSON-serialized pandoc document.
+
+	Tables are replaced by placeholders while walking the document, and the
+	output of `table_json` is spliced in after the rest of the document is
+	serialized. JSON strings can't contain an unescaped `"`, so placeholders
+	can't collide with document text.
+
+	# Parameters:
+	 - `source : str | bytes` - pandoc JSON document
+	 - `format_ : str` - output format, passed by pandoc as the first argument
+
+	# Returns:
+	 - `str` - filtered pandoc JSON document
+	"""
+	doc: Any = json.loads(source)
+	meta: Any = document_meta(doc)
+	fragments: list[str] = []
+
+	def action(key: str, value: Any, _format: str, _meta: Any) -> Any:
+		table: CsvTable | None = parse_csv_table(key, value)
+		if table is None:
+			return None
+		if table.render == "html":
+			return {"t": "RawBlock", "c": ["html", table_html(table)]}
+		fragments.append(table_json(table))
+		return {"t": "RawBlock", "c": [_PLACEHOLDER_FORMAT, str(len(fragments) - 1)]}
+
+	output: str = dumps(walk(doc, action, format_, meta))
+	if not fragments:
+		return output
+	return _PLACEHOLDER_REGEX.sub(lambda m: fragments[int(m.group(1))], output)
+
+
 def test_filter() -> None:
 	"""Debug helper to test the filter on a JSON file.
 
@@ -298,9 +522,11 @@ def test_filter() -> None:
 def main() -> None:
 	"""Entry point for the pdj-csv-code-table filter.
 
-	Runs the codeblock_process filter on stdin/stdout using pandocfilters.
+	Reads a pandoc JSON document from stdin and writes the filtered document
+	to stdout, same as `pandocfilters.toJSONFilter` but via `filter_json`.
 	"""
-	toJSONFilter(codeblock_process)
+	source: bytes = sys.stdin.buffer.read()
+	write_document(filter_json(source, sys.argv[1] if len(sys.argv) > 1 else ""))
 
 
 if __name__ == "__main__":
@@ -16,12 +16,14 @@ Usage:
     pandoc --filter pdj-links-md2html input.md
 """
 
-from typing import Any
+from pdj_sitegen.filters.pandoc_json import run_filter
 
-from pandocfilters import Link, toJSONFilter  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from typing import Any
 
 
-def links_md2html(key: str, value: Any, _format: str, _meta: Any) -> Any | None:
+def links_md2html(key: str, value: "Any", _format: str, _meta: "Any") -> "Any | None":
 	"""Convert .md links to .html links in pandoc AST Link elements.
 
 	When a Link element's target URL ends with '.md', this filter rewrites
@@ -43,20 +45,19 @@ def links_md2html(key: str, value: Any, _format: str, _meta: Any) -> Any | None:
 		except (IndexError, TypeError):
 			return None  # Malformed link structure, skip
 		if link_tgt.endswith(".md"):
-			return Link(
-				["", [], []],
-				link_txt,
-				[link_tgt[:-3] + ".html", ""],
-			)
+			return {
+				"t": "Link",
+				"c": [["", [], []], link_txt, [link_tgt[:-3] + ".html", ""]],
+			}
 	return None
 
 
 def main() -> None:
 	"""Entry point for the pdj-links-md2html filter.
 
-	Runs the links_md2html filter on stdin/stdout using pandocfilters.
+	Runs the links_md2html filter on stdin/stdout, see `pdj_sitegen.filters.pandoc_json`.
 	"""
-	toJSONFilter(links_md2html)
+	run_filter(links_md2html)
 
 
 if __name__ == "__main__":
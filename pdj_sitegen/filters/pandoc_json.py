@@ -0,0 +1,95 @@
+"""Minimal pandoc JSON filter runtime, used by the filter executables.
+
+pandoc starts a filter process for every page it converts, so the filters
+avoid `pandocfilters` and anything else which is slow to import: this module
+only imports `json` and `sys`.
+
+- `walk` has the same semantics as `pandocfilters.walk`, but modifies the
+  parsed document in place instead of copying every node
+- `read_document` parses a pandoc JSON document from the bytes of stdin
+- `write_document` writes a compact JSON document to stdout
+- `run_filter` combines them, like `pandocfilters.toJSONFilter`
+"""
+
+import json
+import sys
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+	from collections.abc import Callable
+	from typing import Any
+
+	Action = Callable[[str, Any, str, Any], Any]
+
+
+def walk(x: "Any", action: "Action", format_: str, meta: "Any") -> "Any":
+	"""Apply `action` to every pandoc element of `x`, in place.
+
+	`action(key, value, format_, meta)` returns None to keep the element, an
+	element to replace it, or a list of elements to splice in its place.
+	Replacements are walked as well, same as with `pandocfilters.walk`.
+
+	# Parameters:
+	 - `x : Any` - pandoc JSON document or part of one, modified in place
+	 - `action : Callable[[str, Any, str, Any], Any]` - called with the type and contents of each element
+	 - `format_ : str` - output format, passed to `action`
+	 - `meta : Any` - document metadata, passed to `action`
+
+	# Returns:
+	 - `Any` - `x`, or its replacement if `x` is itself replaced
+	"""
+	if isinstance(x, list):
+		replaced: bool = False
+		items: list[Any] = []
+		for item in x:
+			if isinstance(item, dict) and "t" in item:
+				res: Any = action(item["t"], item.get("c"), format_, meta)
+				if res is not None:
+					replaced = True
+					if isinstance(res, list):
+						items.extend(walk(z, action, format_, meta) for z in res)
+					else:
+						items.append(walk(res, action, format_, meta))
+					continue
+			items.append(walk(item, action, format_, meta))
+		if replaced:
+			x[:] = items
+		return x
+	if isinstance(x, dict):
+		for k, v in x.items():
+			if isinstance(v, (list, dict)):
+				x[k] = walk(v, action, format_, meta)
+	return x
+
+
+def document_meta(doc: "Any") -> "Any":
+	"""metadata of a pandoc JSON document, in the current or the pre-1.18 format"""
+	if isinstance(doc, dict):
+		return doc.get("meta", {})
+	return doc[0]["unMeta"] if doc[0] else {}
+
+
+def read_document() -> "Any":
+	"""parse the pandoc JSON document on stdin, decoding its bytes directly"""
+	return json.load(sys.stdin.buffer)
+
+
+def write_document(doc_json: str) -> None:
+	"""write a serialized pandoc JSON document to stdout"""
+	sys.stdout.buffer.write(doc_json.encode("utf-8"))
+	sys.stdout.buffer.flush()
+
+
+def dumps(doc: "Any") -> str:
+	"""compact JSON, as pandoc writes it"""
+	return json.dumps(doc, separators=(",", ":"))
+
+
+def run_filter(action: "Action") -> None:
+	"""Run `action` as a pandoc JSON filter from stdin to stdout.
+
+	pandoc passes the output format as the first command line argument.
+	"""
+	doc: Any = read_document()
+	format_: str = sys.argv[1] if len(sys.argv) > 1 else ""
+	write_document(dumps(walk(doc, action, format_, document_meta(doc))))
@@ -0,0 +1,282 @@
+"""Background writing of intermediate files, see `Config.intermediates_dir`
+
+`dump_intermediate` writes each intermediate file synchronously, unless an
+`IntermediatesWriter` for the same directory was activated with
+`start_writer()`. The pipeline does that for the conversion stage, so that
+files are written by a background thread, fed through a bounded queue, while
+the next pages are rendered. Content can be given as a callable, which is
+then also called in the writer thread (used for the JSON frontmatter dump).
+
+With `Config.intermediates_archive` set to `"tar"` or `"zip"`, the files of a
+build are appended to a single archive next to the directory instead, for
+example `_intermediates.tar`, which replaces the archive of the previous build.
+Archive members have the same relative paths as the files would. Worker
+processes keep their files in an `IntermediatesBuffer` instead, and send them
+to the parent, which writes them like its own.
+
+`Config.intermediates_include` and `Config.intermediates_stages` restrict
+which pages and which of `INTERMEDIATE_STAGES` are captured, see
+`selected_stages`. Nothing is serialized for pages or stages not selected.
+"""
+
+import contextlib
+import fnmatch
+import queue
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Self
+
+if TYPE_CHECKING:
+	import tarfile
+	import zipfile
+
+INTERMEDIATES_QUEUE_SIZE: int = 256
+"""Files waiting to be written before `IntermediatesWriter.write` blocks."""
+
+ARCHIVE_FORMATS: tuple[str, ...] = ("tar", "zip")
+"""Allowed values of `Config.intermediates_archive`, other than None."""
+
+Content = str | Callable[[], str]
+"""Content of an intermediate file, or a callable returning it."""
+
+INTERMEDIATE_STAGES: tuple[str, ...] = ("frontmatter", "md", "html", "final")
+"""Stages that can be captured, with their subdirectories of `intermediates_dir`:
+
+- `frontmatter` : the rendered frontmatter, in `txt/` and `json/`
+- `md` : the markdown body after rendering it as a template, in `md/`
+- `html` : the output of pandoc, in `html/`
+- `final` : the page after applying the HTML template, in `final/`
+"""
+
+
+def check_stages(stages: list[str]) -> None:
+	"""check that every entry of `Config.intermediates_stages` is a known stage
+
+	# Raises:
+	 - `ValueError` : for a stage not in `INTERMEDIATE_STAGES`
+	"""
+	unknown: list[str] = [s for s in stages if s not in INTERMEDIATE_STAGES]
+	if unknown:
+		raise ValueError(
+			f"unknown intermediates stages {unknown}, expected any of {INTERMEDIATE_STAGES}"
+		)
+
+
+def selected_stages(path: str, include: list[str], stages: list[str]) -> frozenset[str]:
+	"""stages to capture for the document at `path`
+
+	# Parameters:
+	 - `path : str` - document path, relative to the content dir, without `.md`
+	 - `include : list[str]` - glob patterns matched against `path` (empty means every page)
+	 - `stages : list[str]` - stages to capture (empty means all of `INTERMEDIATE_STAGES`)
+
+	# Returns:
+	 - `frozenset[str]` - selected stages, empty if `path` matches none of `include`
+	"""
+	if include and not any(fnmatch.fnmatch(path, p) for p in include):
+		return frozenset()
+	return frozenset(stages or INTERMEDIATE_STAGES)
+
+
+def archive_path(intermediates_dir: Path, archive: str) -> Path:
+	"""path of the archive used instead of `intermediates_dir`"""
+	return intermediates_dir.with_name(f"{intermediates_dir.name}.{archive}")
+
+
+class IntermediatesWriter:
+	"""writes intermediate files in a background thread
+
+	use as a context manager, or call `close()`, which waits for all queued
+	files to be written and re-raises the first error of the writer thread.
+
+	# Parameters:
+	 - `intermediates_dir : Path` - directory to write files to, relative paths are under it
+	 - `archive : str | None` - `"tar"` or `"zip"` to write one archive instead, see `archive_path`
+	 - `queue_size : int` - maximum number of files waiting to be written
+
+	# Raises:
+	 - `ValueError` : if `archive` is not None or one of `ARCHIVE_FORMATS`
+	"""
+
+	def __init__(
+		self,
+		intermediates_dir: Path,
+		archive: str | None = None,
+		queue_size: int = INTERMEDIATES_QUEUE_SIZE,
+	) -> None:
+		if archive is not None and archive not in ARCHIVE_FORMATS:
+			raise ValueError(
+				f"invalid intermediates archive format {archive!r}, "
+				f"expected one of {ARCHIVE_FORMATS} or None"
+			)
+		self.intermediates_dir: Path = intermediates_dir
+		self.archive: str | None = archive
+		self.n_written: int = 0
+		self._queue: queue.Queue[tuple[str, Content] | None] = queue.Queue(
+			maxsize=queue_size
+		)
+		self._error: Exception | None = None
+		self._created_dirs: set[Path] = set()
+		self._thread: threading.Thread = threading.Thread(
+			target=self._run, name="pdj-sitegen-intermediates", daemon=True
+		)
+		self._thread.start()
+
+	def write(self, rel_path: str, content: Content) -> None:
+		"""queue a file, blocking while the queue is full"""
+		if self._error is not None:
+			raise self._error
+		self._queue.put((rel_path, content))
+
+	def close(self) -> None:
+		"""write all queued files, then stop the thread"""
+		if self._thread.is_alive():
+			self._queue.put(None)
+			self._thread.join()
+		if self._error is not None:
+			raise self._error
+
+	def __enter__(self) -> Self:
+		return self
+
+	def __exit__(self, *exc_info: object) -> None:
+		self.close()
+
+	def _run(self) -> None:
+		# only needed in the writer thread, so not imported at startup
+		import io
+		import tarfile
+		import time
+		import zipfile
+
+		try:
+			with contextlib.ExitStack() as stack:
+				archive: tarfile.TarFile | zipfile.ZipFile | None = None
+				try:
+					archive = self._open_archive(stack)
+				except OSError as e:
+					self._error = e
+
+				while (item := self._queue.get()) is not None:
+					# after an error, keep draining the queue so producers never block
+					if self._error is not None:
+						continue
+					rel_path, content = item
+					try:
+						data: bytes = (
+							content() if callable(content) else content
+						).encode("utf-8")
+						if isinstance(archive, tarfile.TarFile):
+							info: tarfile.TarInfo = tarfile.TarInfo(rel_path)
+							info.size = len(data)
+							info.mtime = int(time.time())
+							archive.addfile(info, io.BytesIO(data))
+						elif isinstance(archive, zipfile.ZipFile):
+							archive.writestr(rel_path, data)
+						else:
+							self._write_to_dir(rel_path, data)
+						self.n_written += 1
+					# the thread must outlive any error, or producers would block on the
+					# full queue. the error is raised in the producer by `close()`
+					except Exception as e:  # noqa: BLE001
+						self._error = e
+		except OSError as e:
+			# closing the archive failed
+			self._error = self._error or e
+
+	def _open_archive(
+		self, stack: contextlib.ExitStack
+	) -> "tarfile.TarFile | zipfile.ZipFile | None":
+		"""open the archive to write to, closed with `stack`, or None to write files"""
+		import tarfile
+		import zipfile
+
+		if self.archive is None:
+			return None
+		self.intermediates_dir.parent.mkdir(parents=True, exist_ok=True)
+		if self.archive == "tar":
+			return stack.enter_context(
+				tarfile.open(archive_path(self.intermediates_dir, "tar"), "w")
+			)
+		return stack.enter_context(
+			zipfile.ZipFile(
+				archive_path(self.intermediates_dir, "zip"),
+				"w",
+				compression=zipfile.ZIP_DEFLATED,
+			)
+		)
+
+	def _write_to_dir(self, rel_path: str, data: bytes) -> None:
+		output_path: Path = self.intermediates_dir / rel_path
+		if output_path.parent not in self._created_dirs:
+			output_path.parent.mkdir(parents=True, exist_ok=True)
+			self._created_dirs.add(output_path.parent)
+		output_path.write_bytes(data)
+
+
+class IntermediatesBuffer:
+	"""keeps intermediate files in memory instead of writing them
+
+	used in worker processes, which send the files of each page back to the
+	parent with its result, so that they end up in the parent's writer (and
+	archive, if any). see `start_buffer` and `drain`.
+
+	# Parameters:
+	 - `intermediates_dir : Path` - directory the files belong to
+	"""
+
+	def __init__(self, intermediates_dir: Path) -> None:
+		self.intermediates_dir: Path = intermediates_dir
+		self.files: list[tuple[str, str]] = []
+
+	def write(self, rel_path: str, content: Content) -> None:
+		"""keep a file, calling `content` now if it is a callable"""
+		self.files.append((rel_path, content() if callable(content) else content))
+
+	def drain(self) -> list[tuple[str, str]]:
+		"""remove and return the files kept so far"""
+		files: list[tuple[str, str]] = self.files
+		self.files = []
+		return files
+
+
+_active: IntermediatesWriter | IntermediatesBuffer | None = None
+
+
+def start_writer(
+	intermediates_dir: Path, archive: str | None = None
+) -> IntermediatesWriter:
+	"""activate a writer, used by `dump_intermediate` until `stop_writer()`"""
+	global _active
+	_active = IntermediatesWriter(intermediates_dir, archive=archive)
+	return _active
+
+
+def start_buffer(intermediates_dir: Path) -> IntermediatesBuffer:
+	"""activate a buffer, used by `dump_intermediate` instead of a writer
+
+	for worker processes, including those forked while the parent's writer was
+	active: their copy of the writer has no thread, and is forgotten.
+	"""
+	global _active
+	_active = IntermediatesBuffer(intermediates_dir)
+	return _active
+
+
+def active_writer() -> IntermediatesWriter | IntermediatesBuffer | None:
+	"""the active writer or buffer, if any"""
+	return _active
+
+
+def stop_writer() -> None:
+	"""deactivate the active writer and wait for it to finish writing
+
+	# Raises:
+	 - `Exception` : the first error raised while writing, if any
+	"""
+	global _active
+	writer: IntermediatesWriter | IntermediatesBuffer | None = _active
+	_active = None
+	if isinstance(writer, IntermediatesWriter):
+		writer.close()
@@ -0,0 +1,420 @@
+"""Build profiling: wall and CPU time per pipeline stage and per page
+
+The pipeline wraps its stages in `span()`, which does nothing unless a
+`Profiler` was activated with `start_profiling()`. Enable it from the CLI with
+`--profile`, which writes `profile.json` and `profile_summary.txt` into
+`.pdj-sitegen/<timestamp>/`, next to error dumps (see `error_report.create_dump_dir`).
+`--trace` writes the same spans as Chrome trace events to `trace.json` there,
+which can be opened in `chrome://tracing` or https://ui.perfetto.dev
+
+Stages recorded, with the page they belong to where applicable:
+
+- `config` : reading the config and setting up the jinja environment
+- `discovery` : `build_document_tree`, containing one `frontmatter_render` per page
+- `templates` : compiling the templates used by the pages, see `prewarm_templates`
+- `convert` : `convert_markdown_files`, containing one `page` span per
+  `convert_single_markdown_file` call, which contains the per-page stages
+  `context`, `body_render`, `pandoc`, `template_render`, `prettify`, `write`,
+  and with `--executor process` one `shared_docs` for writing the document index
+- `intermediates` : waiting for the background writer of intermediate files
+  to finish, only if `intermediates_dir` is set
+- `copy` : copying content files, containing one `copy_batch` per `COPY_BATCH_SIZE` files
+
+Worker processes record spans against the same clock as the parent (see
+`start_profiling`) and send them back with their results. With `--executor
+async`, the pages in flight all run on the event loop's thread, so each one
+records its spans on its own track (see `trace_track`), and the trace shows
+one row per page being converted concurrently instead of overlapping spans.
+
+Independently of the profiler, `start_page_stages()` keeps the wall time of
+each per-page stage until it is taken with `pop_page_stages()`, for the build
+log (see `pdj_sitegen.build_log`). Only the totals per page and stage are
+kept, so memory does not grow with the number of pages converted.
+
+CPU time is the CPU time of the current thread plus that of finished child
+processes, so it includes pandoc. The report also has the peak memory use, see
+`peak_rss_mb`.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pdj_sitegen.error_report import create_dump_dir
+
+PROFILE_FNAME: str = "profile.json"
+SUMMARY_FNAME: str = "profile_summary.txt"
+TRACE_FNAME: str = "trace.json"
+
+SUMMARY_TOP_N: int = 10
+"""Number of pages and templates listed in the summary."""
+
+TRACK_TID_BASE: int = 1 << 32
+"""Trace thread id of track 0, see `trace_track`, well above real thread ids."""
+
+
+def _cpu_time() -> float:
+	"""CPU seconds used by this thread and by finished child processes"""
+	times: os.times_result = os.times()
+	return time.thread_time() + times.children_user + times.children_system
+
+
+def peak_rss_mb() -> tuple[float | None, float | None]:
+	"""peak resident memory of this process, and of the largest finished child process, in MB
+
+	both are None where the `resource` module is not available (windows)
+	"""
+	try:
+		import resource
+	except ImportError:
+		return None, None
+	# ru_maxrss is in bytes on macos, and in KB elsewhere
+	scale: float = 1 / 1024**2 if sys.platform == "darwin" else 1 / 1024
+	return (
+		resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+		resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+	)
+
+
+@dataclass(slots=True)
+class Span:
+	"""a timed section of the build
+
+	# Attributes:
+	 - `name : str` - stage name, see the module docstring
+	 - `start : float` - wall-clock start, seconds since the profiler started
+	 - `wall : float` - wall-clock duration in seconds
+	 - `cpu : float` - CPU time in seconds
+	 - `page : str | None` - document key, for per-page stages
+	 - `args : dict[str, Any]` - extra information, like the template name
+	 - `pid : int` - process the span was recorded in
+	 - `tid : int` - thread the span was recorded in
+	 - `track : int | None` - track the span was recorded on, see `trace_track`
+	"""
+
+	name: str
+	start: float
+	wall: float
+	cpu: float
+	page: str | None = None
+	args: dict[str, Any] = field(default_factory=dict)
+	pid: int = 0
+	tid: int = 0
+	track: int | None = None
+
+
+class Profiler:
+	"""collects `Span`s, see `span()`"""
+
+	def __init__(self, t0: float | None = None) -> None:
+		self.t0: float = time.perf_counter() if t0 is None else t0
+		self.spans: list[Span] = []
+
+	@contextlib.contextmanager
+	def span(self, name: str, page: str | None = None, **args: Any) -> Iterator[None]:
+		"""time the body of the `with` block"""
+		start: float = time.perf_counter()
+		cpu_start: float = _cpu_time()
+		track: int | None = _track.get()
+		try:
+			yield
+		finally:
+			s: Span = Span(
+				name=name,
+				start=start - self.t0,
+				wall=time.perf_counter() - start,
+				cpu=_cpu_time() - cpu_start,
+				page=page,
+				args=args,
+				pid=os.getpid(),
+				tid=threading.get_native_id(),
+				track=track,
+			)
+			self.spans.append(s)
+			if _page_stages is not None and page is not None:
+				_add_page_stage(page, name, s.wall)
+
+	def report(self) -> dict[str, Any]:
+		"""aggregate the spans by stage, page, and template"""
+		stages: dict[str, dict[str, float]] = {}
+		pages: dict[str, dict[str, Any]] = {}
+		templates: dict[str, dict[str, float]] = {}
+		for s in self.spans:
+			stage: dict[str, float] = stages.setdefault(
+				s.name, {"count": 0, "wall": 0.0, "cpu": 0.0}
+			)
+			stage["count"] += 1
+			stage["wall"] += s.wall
+			stage["cpu"] += s.cpu
+			if s.page is not None:
+				page: dict[str, Any] = pages.setdefault(
+					s.page, {"wall": 0.0, "cpu": 0.0, "stages": {}}
+				)
+				page["wall"] += s.wall
+				page["cpu"] += s.cpu
+				page["stages"][s.name] = page["stages"].get(s.name, 0.0) + s.wall
+			if s.name == "template_render" and "template" in s.args:
+				template: dict[str, float] = templates.setdefault(
+					s.args["template"], {"count": 0, "wall": 0.0}
+				)
+				template["count"] += 1
+				template["wall"] += s.wall
+		peak_rss: float | None
+		peak_rss_children: float | None
+		peak_rss, peak_rss_children = peak_rss_mb()
+		return {
+			"total_wall": time.perf_counter() - self.t0,
+			"peak_rss_mb": peak_rss,
+			"peak_rss_children_mb": peak_rss_children,
+			"stages": stages,
+			"pages": dict(sorted(pages.items(), key=lambda kv: -kv[1]["wall"])),
+			"templates": dict(sorted(templates.items(), key=lambda kv: -kv[1]["wall"])),
+			"spans": [asdict(s) for s in self.spans],
+		}
+
+
+def format_summary(report: dict[str, Any], top_n: int = SUMMARY_TOP_N) -> str:
+	"""human-readable summary of a `Profiler.report()`"""
+	lines: list[str] = [f"total wall time: {report['total_wall']:.3f}s"]
+	if report.get("peak_rss_mb") is not None:
+		lines.append(
+			f"peak memory: {report['peak_rss_mb']:.0f} MB"
+			f" (largest child process: {report['peak_rss_children_mb']:.0f} MB)"
+		)
+	lines.append("")
+	lines.append(f"{'stage':<20}{'count':>8}{'wall (s)':>12}{'cpu (s)':>12}")
+	for name, stage in report["stages"].items():
+		lines.append(
+			f"{name:<20}{stage['count']:>8}{stage['wall']:>12.3f}{stage['cpu']:>12.3f}"
+		)
+
+	lines += ["", f"slowest {top_n} pages:"]
+	for key, page in list(report["pages"].items())[:top_n]:
+		slowest_stage: str = max(page["stages"], key=page["stages"].get)
+		lines.append(
+			f"  {page['wall']:8.3f}s  {key}  (mostly {slowest_stage}: {page['stages'][slowest_stage]:.3f}s)"
+		)
+
+	lines += ["", f"slowest {top_n} templates (total render time):"]
+	for name, template in list(report["templates"].items())[:top_n]:
+		lines.append(
+			f"  {template['wall']:8.3f}s  {name}  ({template['count']} pages, "
+			f"{template['wall'] / template['count'] * 1000:.1f} ms/page)"
+		)
+	return "\n".join(lines)
+
+
+def trace_events(profiler: Profiler) -> dict[str, Any]:
+	"""spans as Chrome trace-event JSON, one complete (`X`) event per span
+
+	timestamps are in microseconds since the profiler started. pages and
+	template names are in the `args` of each event, and processes are named
+	so that discovery workers are easy to tell apart from the main process.
+	spans recorded on a track (see `trace_track`) get a thread of their own,
+	named after the track, since complete events on one thread have to nest.
+	"""
+	main_pid: int = os.getpid()
+	events: list[dict[str, Any]] = []
+	pids: set[int] = set()
+	tracks: set[tuple[int, int]] = set()
+	for s in profiler.spans:
+		pids.add(s.pid)
+		tid: int = s.tid
+		if s.track is not None:
+			tid = TRACK_TID_BASE + s.track
+			tracks.add((s.pid, s.track))
+		args: dict[str, Any] = {"cpu_ms": round(s.cpu * 1000, 3), **s.args}
+		if s.page is not None:
+			args["page"] = s.page
+		events.append(
+			{
+				"name": s.name,
+				"cat": "page" if s.page is not None else "stage",
+				"ph": "X",
+				"ts": round(s.start * 1e6, 3),
+				"dur": round(s.wall * 1e6, 3),
+				"pid": s.pid,
+				"tid": tid,
+				"args": args,
+			}
+		)
+	for pid in sorted(pids):
+		events.append(
+			{
+				"name": "process_name",
+				"ph": "M",
+				"pid": pid,
+				"args": {"name": "pdj-sitegen" if pid == main_pid else f"worker {pid}"},
+			}
+		)
+	for pid, track in sorted(tracks):
+		events.append(
+			{
+				"name": "thread_name",
+				"ph": "M",
+				"pid": pid,
+				"tid": TRACK_TID_BASE + track,
+				"args": {"name": f"page slot {track}"},
+			}
+		)
+	return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_report(
+	profiler: Profiler,
+	root_dir: Path,
+	profile: bool = True,
+	trace: bool = False,
+) -> Path:
+	"""write the profiling output to a new dump directory
+
+	# Parameters:
+	 - `profiler : Profiler` - profiler with the recorded spans
+	 - `root_dir : Path` - the dump directory is created in `root_dir/.pdj-sitegen/`
+	 - `profile : bool` - write `profile.json` and `profile_summary.txt`
+	 - `trace : bool` - write `trace.json`, see `trace_events`
+
+	# Returns:
+	 - `Path` - the dump directory
+	"""
+	dump_dir: Path = create_dump_dir(root_dir)
+	if profile:
+		report: dict[str, Any] = profiler.report()
+		with open(dump_dir / PROFILE_FNAME, "w", encoding="utf-8") as f:
+			json.dump(report, f, indent="\t", default=str)
+		with open(dump_dir / SUMMARY_FNAME, "w", encoding="utf-8") as f:
+			f.write(format_summary(report) + "\n")
+	if trace:
+		with open(dump_dir / TRACE_FNAME, "w", encoding="utf-8") as f:
+			json.dump(trace_events(profiler), f, default=str)
+	return dump_dir
+
+
+_active: Profiler | None = None
+_NO_SPAN: contextlib.nullcontext[None] = contextlib.nullcontext()
+_page_stages: dict[str, dict[str, float]] | None = None
+_track: contextvars.ContextVar[int | None] = contextvars.ContextVar(
+	"pdj_sitegen_track", default=None
+)
+
+
+def start_profiling(t0: float | None = None) -> Profiler:
+	"""activate a new profiler, used by `span()` until `stop_profiling()`
+
+	worker processes pass the `t0` of the parent's profiler, so that their
+	spans line up with the parent's (`time.perf_counter` is system-wide).
+	"""
+	global _active
+	_active = Profiler(t0=t0)
+	return _active
+
+
+def active_profiler() -> Profiler | None:
+	"""the active profiler, if any"""
+	return _active
+
+
+def drain_spans() -> list[Span]:
+	"""remove and return the spans of the active profiler, used to send them from workers"""
+	if _active is None:
+		return []
+	spans: list[Span] = _active.spans
+	_active.spans = []
+	return spans
+
+
+def record_spans(spans: list[Span]) -> None:
+	"""add spans recorded elsewhere (by `drain_spans` in a worker) to the active profiler"""
+	if _active is not None:
+		_active.spans.extend(spans)
+	if _page_stages is not None:
+		for s in spans:
+			if s.page is not None:
+				_add_page_stage(s.page, s.name, s.wall)
+
+
+def stop_profiling() -> Profiler | None:
+	"""deactivate and return the active profiler"""
+	global _active
+	profiler: Profiler | None = _active
+	_active = None
+	return profiler
+
+
+def span(
+	name: str, page: str | None = None, **args: Any
+) -> contextlib.AbstractContextManager[None]:
+	"""time a stage with the active profiler, or do nothing if profiling is off
+
+	per-page stages are also timed if `start_page_stages()` was called
+	"""
+	if _active is None:
+		if _page_stages is not None and page is not None:
+			return _page_stage(name, page)
+		return _NO_SPAN
+	return _active.span(name, page=page, **args)
+
+
+@contextlib.contextmanager
+def trace_track(track: int) -> Iterator[None]:
+	"""record the spans started in the block on `track`
+
+	asyncio tasks created in the block inherit the track. spans of concurrent
+	work on one thread overlap without nesting, which trace viewers can't show
+	on a single row, so each concurrent unit of work should use its own track,
+	reusing a track only once everything recorded on it has finished.
+	"""
+	token: contextvars.Token[int | None] = _track.set(track)
+	try:
+		yield
+	finally:
+		_track.reset(token)
+
+
+def _add_page_stage(page: str, name: str, wall: float) -> None:
+	if _page_stages is None:
+		return
+	stages: dict[str, float] = _page_stages.setdefault(page, {})
+	stages[name] = stages.get(name, 0.0) + wall
+
+
+@contextlib.contextmanager
+def _page_stage(name: str, page: str) -> Iterator[None]:
+	start: float = time.perf_counter()
+	try:
+		yield
+	finally:
+		if _page_stages is not None:
+			_add_page_stage(page, name, time.perf_counter() - start)
+
+
+def start_page_stages() -> None:
+	"""start keeping the wall time of each per-page stage, see `pop_page_stages`"""
+	global _page_stages
+	_page_stages = {}
+
+
+def page_stages_active() -> bool:
+	"""whether per-page stages are being timed"""
+	return _page_stages is not None
+
+
+def pop_page_stages(page: str) -> dict[str, float]:
+	"""wall time in seconds of each stage of `page` so far, forgetting them"""
+	if _page_stages is None:
+		return {}
+	return _page_stages.pop(page, {})
+
+
+def stop_page_stages() -> None:
+	"""stop timing per-page stages, forgetting the ones not popped"""
+	global _page_stages
+	_page_stages = None
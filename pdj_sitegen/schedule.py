@@ -0,0 +1,115 @@
+"""Per-page cost model, for scheduling conversions and estimating the time left
+
+Conversion times vary a lot between pages: a large reference page with many
+tables can take a thousand times longer than a short post. The time each
+page took in the last build is kept in the build cache (see
+`cache.load_page_times`) and used as its cost:
+
+- `page_costs` estimates the cost of every page, pages without a recorded
+  time counting as the median of the recorded ones
+- `longest_first` orders pages by decreasing cost, so that with several
+  workers a large page does not start last and finish long after the rest
+- `ProgressEstimate` tracks the share of the estimated work that is done, and
+  the time left at the rate observed so far
+"""
+
+import time
+from collections.abc import Iterable, Mapping
+
+DEFAULT_PAGE_COST: float = 1.0
+"""Cost of a page when no page has a recorded time."""
+
+
+def page_costs(
+	keys: Iterable[str],
+	page_times: Mapping[str, float],
+) -> dict[str, float]:
+	"""estimated cost of converting each page, in seconds if any time is known
+
+	pages without a time in `page_times` cost the median of the known times of
+	`keys`, or `DEFAULT_PAGE_COST` if none is known
+	"""
+	import statistics
+
+	keys = list(keys)
+	known: list[float] = [page_times[k] for k in keys if k in page_times]
+	default_cost: float = statistics.median(known) if known else DEFAULT_PAGE_COST
+	return {k: page_times.get(k, default_cost) for k in keys}
+
+
+def longest_first(costs: Mapping[str, float]) -> list[str]:
+	"""keys of `costs` by decreasing cost, equal costs keeping their order"""
+	return sorted(costs, key=lambda k: -costs[k])
+
+
+def format_duration(seconds: float | None) -> str:
+	"""`m:ss`, or `h:mm:ss` from one hour, or `?:??` if unknown"""
+	if seconds is None:
+		return "?:??"
+	minutes, secs = divmod(round(seconds), 60)
+	hours, minutes = divmod(minutes, 60)
+	if hours:
+		return f"{hours}:{minutes:02}:{secs:02}"
+	return f"{minutes}:{secs:02}"
+
+
+class ProgressEstimate:
+	"""estimated progress and time left of converting pages with known costs
+
+	the time left is the estimated cost of the remaining pages, times the wall
+	time per unit of cost observed so far. this accounts for the number of
+	workers and for how much faster or slower this build is than the last.
+	before any page is done, the costs are taken as seconds, spread over `jobs`.
+
+	# Parameters:
+	 - `costs : Mapping[str, float]` - estimated cost of each page, see `page_costs`
+	 - `jobs : int` - number of pages converted concurrently
+	 - `timed : bool` - whether the costs are times from a previous build,
+	   otherwise no time left is estimated until a page is done
+	"""
+
+	def __init__(
+		self,
+		costs: Mapping[str, float],
+		jobs: int = 1,
+		timed: bool = True,
+	) -> None:
+		self.costs: Mapping[str, float] = costs
+		self.jobs: int = jobs
+		self.timed: bool = timed
+		self.total: float = sum(costs.values())
+		self.done_cost: float = 0.0
+		self.skipped_cost: float = 0.0
+		self.done_keys: set[str] = set()
+		self.start: float = time.perf_counter()
+
+	def done(self, key: str, skipped: bool = False) -> None:
+		"""mark the page `key` as done, or as `skipped` if it needed no work"""
+		if key in self.done_keys or key not in self.costs:
+			return
+		self.done_keys.add(key)
+		if skipped:
+			self.skipped_cost += self.costs[key]
+		else:
+			self.done_cost += self.costs[key]
+
+	@property
+	def fraction(self) -> float:
+		"""share of the estimated total cost which is done or skipped"""
+		if not self.total:
+			return 1.0
+		return (self.done_cost + self.skipped_cost) / self.total
+
+	def remaining(self) -> float | None:
+		"""estimated seconds left, or None if there is nothing to estimate it from"""
+		remaining_cost: float = self.total - self.done_cost - self.skipped_cost
+		if self.done_cost > 0:
+			elapsed: float = time.perf_counter() - self.start
+			return remaining_cost * elapsed / self.done_cost
+		if self.timed:
+			return remaining_cost / self.jobs
+		return None
+
+	def format(self) -> str:
+		"""progress for a progress line, like ` 42%, 1:05 left`"""
+		return f"{self.fraction:4.0%}, {format_duration(self.remaining())} left"
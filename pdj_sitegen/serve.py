@@ -0,0 +1,361 @@
+"""Development server: render pages on demand and reload the browser on changes
+
+`python -m pdj_sitegen serve config.yml` only discovers the documents at
+startup (see `build_document_tree`), then serves the site over HTTP:
+
+- requests for a page's HTML render just that page with
+  `render_single_markdown_file`, and keep the result in memory until one of
+  its sources changes. changes are detected as in watch mode, see `pdj_sitegen.watch`
+- other requests are served from the content directory (files that would be
+  copied to the output) or from `output_dir`
+- every served page gets a small script that listens to server-sent events
+  at `EVENTS_PATH` and reloads the page after a change
+
+Nothing is written to `output_dir`, so run a normal build before deploying.
+"""
+
+import argparse
+import html
+import mimetypes
+import threading
+import time
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from pdj_sitegen.build import render_single_markdown_file, should_copy
+from pdj_sitegen.document import Document
+from pdj_sitegen.error_report import format_single_error
+from pdj_sitegen.watch import POLL_INTERVAL, WatchState
+
+EVENTS_PATH: str = "/__pdj_sitegen/events"
+"""Path of the server-sent events stream used for live reload."""
+
+RELOAD_SCRIPT: str = (
+	"<script>"
+	f'new EventSource("{EVENTS_PATH}")'
+	'.addEventListener("reload", () => location.reload());'
+	"</script>"
+)
+"""Injected into every served page."""
+
+KEEPALIVE_INTERVAL: float = 15.0
+"""Seconds between keepalive comments on idle event streams."""
+
+
+def inject_reload_script(page: str) -> str:
+	"""add `RELOAD_SCRIPT` before the closing body tag, or at the end of the page"""
+	idx: int = page.lower().rfind("</body>")
+	if idx == -1:
+		return page + RELOAD_SCRIPT
+	return page[:idx] + RELOAD_SCRIPT + page[idx:]
+
+
+class ServeState(WatchState):
+	"""a `WatchState` that renders pages on request instead of writing them
+
+	resource files and removed pages are not copied to or deleted from
+	`output_dir`, see `update_resource` and `remove_page`.
+
+	all access goes through `lock`, since the server handles requests in threads.
+	changes are only polled for by the server's background thread, requests use
+	the state as of the last poll. `version` is incremented and `changed`
+	notified whenever something changed.
+	"""
+
+	def __init__(self, config_path: Path, verbose: bool = True, jobs: int = 1) -> None:
+		super().__init__(config_path, verbose=verbose, jobs=jobs)
+		self.lock: threading.RLock = threading.RLock()
+		self.changed: threading.Condition = threading.Condition(self.lock)
+		self.version: int = 0
+		# rendered HTML by document key
+		self.rendered: dict[str, str] = {}
+		self._pages_by_html: dict[str, str] = {}
+		self._pages_by_html_for: dict[str, Document] | None = None
+
+	def build_all(self) -> None:
+		"""discover documents only, pages are rendered on request"""
+		self.load()
+		self.convert(keys=None)
+
+	def convert(self, keys: set[str] | None) -> None:
+		"""drop the rendered HTML of the given pages, or of all pages if None"""
+		with self.lock:
+			if keys is None:
+				self.rendered.clear()
+			else:
+				for key in keys:
+					self.rendered.pop(key, None)
+			self.version += 1
+			self.changed.notify_all()
+
+	def update_resource(self, rel_path: str, source: Path | None) -> None:
+		"""nothing to do, resource files are served from the content directory"""
+
+	def remove_page(self, key: str, doc: Document) -> None:
+		"""forget the rendered HTML of a removed page"""
+		self.rendered.pop(key, None)
+
+	def page_for(self, path_html: str) -> str | None:
+		"""document key of the page written to `path_html`, if any"""
+		if self._pages_by_html_for is not self.docs:
+			self._pages_by_html = {
+				doc["file_meta"]["path_html"]: key for key, doc in self.docs.items()
+			}
+			self._pages_by_html_for = self.docs
+		return self._pages_by_html.get(path_html)
+
+	def render_page(self, key: str) -> str:
+		"""rendered HTML of a page, from memory if its sources did not change"""
+		if key not in self.rendered:
+			self.rendered[key] = render_single_markdown_file(
+				path=key,
+				doc=self.docs[key],
+				docs=self.docs,
+				jinja_env=self.jinja_env,
+				config=self.config,
+				intermediates_dir=self.intermediates_dir,
+			)
+		return self.rendered[key]
+
+	def static_file(self, rel_path: str) -> Path | None:
+		"""file to serve for a non-page request, if any"""
+		if should_copy(rel_path, self.config.copy_include, self.config.copy_exclude):
+			source: Path = self.content_dir / rel_path
+			if source.is_file():
+				return source
+		output: Path = self.output_dir / rel_path
+		if output.is_file():
+			return output
+		return None
+
+
+class ServeHandler(BaseHTTPRequestHandler):
+	"""serves pages and files from the `ServeState` of the server"""
+
+	server: "DevServer"
+
+	def log_message(self, format: str, *args: Any) -> None:
+		if self.server.verbose:
+			super().log_message(format, *args)
+
+	def _send(self, status: int, body: bytes, content_type: str) -> None:
+		self.send_response(status)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(body)))
+		self.send_header("Cache-Control", "no-store")
+		self.end_headers()
+		self.wfile.write(body)
+
+	def do_GET(self) -> None:
+		path: str = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+		if path == EVENTS_PATH:
+			self._stream_events()
+			return
+
+		rel_path: str = path.lstrip("/")
+		if ".." in Path(rel_path).parts:
+			self._send(HTTPStatus.FORBIDDEN, b"forbidden", "text/plain")
+			return
+		if rel_path == "" or rel_path.endswith("/"):
+			rel_path += "index.html"
+		candidates: list[str] = [rel_path]
+		if not Path(rel_path).suffix:
+			candidates += [f"{rel_path}.html", f"{rel_path}/index.html"]
+
+		state: ServeState = self.server.state
+		page: tuple[int, str] | None = None
+		file_path: Path | None = None
+		with state.lock:
+			for candidate in candidates:
+				key: str | None = state.page_for(candidate)
+				if key is not None:
+					page = self._render_page(key)
+					break
+			else:
+				for candidate in candidates:
+					file_path = state.static_file(candidate)
+					if file_path is not None:
+						break
+
+		if page is not None:
+			self._send(
+				page[0],
+				inject_reload_script(page[1]).encode("utf-8"),
+				"text/html; charset=utf-8",
+			)
+		elif file_path is not None:
+			content_type: str = mimetypes.guess_type(file_path.name)[0] or (
+				"application/octet-stream"
+			)
+			self._send(HTTPStatus.OK, file_path.read_bytes(), content_type)
+		else:
+			self._send(HTTPStatus.NOT_FOUND, b"not found", "text/plain")
+
+	def _render_page(self, key: str) -> tuple[int, str]:
+		"""status and HTML of a page, or of an error page if rendering fails"""
+		try:
+			return HTTPStatus.OK, self.server.state.render_page(key)
+		# any error in the page's sources is shown in the browser
+		except Exception as e:  # noqa: BLE001
+			return HTTPStatus.INTERNAL_SERVER_ERROR, (
+				f"<html><body><h1>error rendering '{html.escape(key)}'</h1>"
+				f"<pre>{html.escape(format_single_error(e))}</pre></body></html>"
+			)
+
+	def _stream_events(self) -> None:
+		"""send a `reload` event whenever the state version changes"""
+		self.send_response(HTTPStatus.OK)
+		self.send_header("Content-Type", "text/event-stream")
+		self.send_header("Cache-Control", "no-store")
+		self.end_headers()
+		state: ServeState = self.server.state
+		with state.lock:
+			version: int = state.version
+		try:
+			self.wfile.write(b"retry: 1000\n\n")
+			self.wfile.flush()
+			while not self.server.stopping.is_set():
+				with state.lock:
+					state.changed.wait_for(
+						lambda version=version: (
+							state.version != version or self.server.stopping.is_set()
+						),
+						timeout=KEEPALIVE_INTERVAL,
+					)
+					new_version: int = state.version
+				if new_version != version:
+					version = new_version
+					self.wfile.write(f"event: reload\ndata: {version}\n\n".encode())
+				else:
+					self.wfile.write(b": keepalive\n\n")
+				self.wfile.flush()
+		except (BrokenPipeError, ConnectionResetError):
+			pass
+
+
+class DevServer(ThreadingHTTPServer):
+	"""HTTP server holding a `ServeState`, polled for changes in a background thread
+
+	# Parameters:
+	 - `state : ServeState` - loaded site state
+	 - `address : tuple[str, int]` - host and port to bind
+	 - `poll_interval : float` - seconds between scans for changes
+	"""
+
+	daemon_threads = True
+
+	def __init__(
+		self,
+		state: ServeState,
+		address: tuple[str, int],
+		poll_interval: float = POLL_INTERVAL,
+	) -> None:
+		super().__init__(address, ServeHandler)
+		self.state: ServeState = state
+		self.verbose: bool = state.verbose
+		self.poll_interval: float = poll_interval
+		self.stopping: threading.Event = threading.Event()
+		self._poller: threading.Thread = threading.Thread(
+			target=self._poll_loop, name="pdj-sitegen-poll", daemon=True
+		)
+		self._poller.start()
+
+	def poll(self) -> None:
+		"""check for changes, printing errors instead of raising them"""
+		with self.state.lock:
+			try:
+				n_changed: int | None = self.state.poll()
+			# keep serving after errors in the site's sources, like watch mode
+			except Exception as e:  # noqa: BLE001
+				print(format_single_error(e))
+				# reload anyway, so the browser shows the error
+				self.state.convert(keys=None)
+				return
+		if n_changed is not None and self.verbose:
+			print(f"change detected, {n_changed} page(s) invalidated")
+
+	def _poll_loop(self) -> None:
+		while not self.stopping.wait(self.poll_interval):
+			self.poll()
+
+	def server_close(self) -> None:
+		self.stopping.set()
+		with self.state.lock:
+			self.state.changed.notify_all()
+		super().server_close()
+
+
+def serve(
+	config_path: Path,
+	host: str = "127.0.0.1",
+	port: int = 8000,
+	verbose: bool = True,
+	jobs: int = 1,
+) -> None:
+	"""discover the site and serve it until interrupted, see the module docstring
+
+	# Parameters:
+	 - `config_path : Path` - path to the config file
+	 - `host : str` - address to bind
+	 - `port : int` - port to bind, 0 picks a free port
+	 - `verbose : bool` - print progress information and requests
+	 - `jobs : int` - worker processes for discovery, see `resolve_jobs`
+	"""
+	start: float = time.perf_counter()
+	state: ServeState = ServeState(config_path, verbose=verbose, jobs=jobs)
+	state.build_all()
+	server: DevServer = DevServer(state, (host, port))
+	print(
+		f"Discovered {len(state.docs)} pages in {time.perf_counter() - start:.2f}s, "
+		f"serving at http://{host}:{server.server_address[1]}/ (Ctrl+C to stop)"
+	)
+	try:
+		server.serve_forever()
+	finally:
+		server.server_close()
+
+
+def main(argv: list[str] | None = None) -> None:
+	"""command-line entry point for `python -m pdj_sitegen serve`"""
+	arg_parser: argparse.ArgumentParser = argparse.ArgumentParser(
+		prog="pdj-sitegen serve",
+		description="Serve a site for development, rendering pages on demand with live reload.",
+	)
+	arg_parser.add_argument(
+		"config_path",
+		type=str,
+		help="path to config file (supports .yml, .yaml, .toml, or .json)",
+	)
+	arg_parser.add_argument(
+		"--host",
+		type=str,
+		default="127.0.0.1",
+		help="address to bind (default: 127.0.0.1)",
+	)
+	arg_parser.add_argument(
+		"-p", "--port", type=int, default=8000, help="port to bind (default: 8000)"
+	)
+	arg_parser.add_argument(
+		"-q",
+		"--quiet",
+		action="store_true",
+		help="disable verbose output (suppress progress messages and request logs)",
+	)
+	arg_parser.add_argument(
+		"-j",
+		"--jobs",
+		type=int,
+		default=1,
+		help="number of worker processes for discovery. 0 uses one per CPU (default: 1)",
+	)
+	args: argparse.Namespace = arg_parser.parse_args(argv)
+	serve(
+		config_path=Path(args.config_path),
+		host=args.host,
+		port=args.port,
+		verbose=not args.quiet,
+		jobs=args.jobs,
+	)
@@ -0,0 +1,285 @@
+"""Sharded builds: split one build across machines, then merge the outputs
+
+`python -m pdj_sitegen config.yml --shard K/N` runs discovery as usual, but
+only converts the pages assigned to shard K of N (see `assign_pages`) and only
+copies the content files assigned to it (see `file_shard`). Each shard writes
+a manifest, `SHARD_MANIFEST_FNAME`, into its output directory.
+
+`python -m pdj_sitegen merge config.yml DIR...` then combines the output
+directories of all N shards into the configured `output_dir`, checking that
+every shard is there exactly once and that all shards agree on the assignment.
+The conversion times recorded by the shards are saved to the build cache, so
+the next sharded build is balanced by them.
+
+Pages are assigned longest first to the least loaded shard, using the
+per-page conversion times of the previous build, see `pdj_sitegen.schedule`.
+All shards must therefore see the same timing history, for example by
+restoring the `cache_dir` written by the last `merge` on every machine;
+`merge` fails if they did not.
+"""
+
+import json
+import shutil
+import zlib
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pdj_sitegen.cache import hash_text, load_page_times, save_page_times
+from pdj_sitegen.config import Config
+from pdj_sitegen.schedule import page_costs
+
+# argparse and filecmp are imported where used, since a normal build
+# imports this module but only needs them when sharding or merging
+
+SHARD_MANIFEST_FNAME: str = ".pdj-sitegen-shard.json"
+"""Name of the manifest each shard writes into its output directory."""
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+	"""shard `index` of `count`, numbered from 1"""
+
+	index: int
+	count: int
+
+	def __post_init__(self) -> None:
+		if not 1 <= self.index <= self.count:
+			raise ValueError(
+				f"invalid shard {self.index}/{self.count}, expected 1 <= K <= N"
+			)
+
+	@classmethod
+	def parse(cls, text: str) -> "ShardSpec":
+		"""parse a `K/N` shard spec, as given to `--shard`
+
+		# Raises:
+		 - `ValueError` : if `text` is not of the form `K/N` with `1 <= K <= N`
+		"""
+		index, sep, count = text.partition("/")
+		try:
+			if not sep:
+				raise ValueError
+			return cls(int(index), int(count))
+		except ValueError as e:
+			raise ValueError(
+				f"invalid shard {text!r}, expected K/N with 1 <= K <= N, e.g. '1/4'"
+			) from e
+
+	def __str__(self) -> str:
+		return f"{self.index}/{self.count}"
+
+
+def assign_pages(
+	keys: Iterable[str],
+	page_times: Mapping[str, float],
+	n_shards: int,
+) -> dict[str, int]:
+	"""assign every page to a shard, balancing the estimated conversion time
+
+	greedy longest-processing-time scheduling: pages are taken by decreasing
+	cost, ties broken by key, and each goes to the shard with the least total
+	cost so far, ties going to the lowest shard. the result only depends on
+	the set of keys and on `page_times`, not on the order of `keys`.
+
+	# Parameters:
+	 - `keys : Iterable[str]` - document keys, see `build_document_tree`
+	 - `page_times : Mapping[str, float]` - seconds each page took to convert last time
+	 - `n_shards : int` - number of shards
+
+	# Returns:
+	 - `dict[str, int]` - shard of each page, numbered from 1, in the order of `keys`
+	"""
+	costs: dict[str, float] = page_costs(keys, page_times)
+	loads: list[float] = [0.0] * n_shards
+	shard_of: dict[str, int] = {}
+	for key in sorted(costs, key=lambda k: (-costs[k], k)):
+		idx: int = loads.index(min(loads))
+		loads[idx] += costs[key]
+		shard_of[key] = idx + 1
+	return {key: shard_of[key] for key in costs}
+
+
+def file_shard(rel_path: str, n_shards: int) -> int:
+	"""shard which copies the content file at `rel_path`, numbered from 1
+
+	files are split by a stable hash of their path, so every shard agrees
+	without needing to know the file sizes
+	"""
+	return zlib.crc32(rel_path.encode("utf-8")) % n_shards + 1
+
+
+def assignment_hash(assignment: Mapping[str, int]) -> str:
+	"""hash identifying an assignment of pages to shards, see `assign_pages`"""
+	return hash_text(json.dumps(sorted(assignment.items())))
+
+
+def write_manifest(
+	output_dir: Path,
+	shard: ShardSpec,
+	assignment: Mapping[str, int],
+	page_times: Mapping[str, float],
+) -> Path:
+	"""write the manifest of `shard` to `output_dir`, returning its path
+
+	`page_times` is filtered down to the pages of `shard`
+	"""
+	pages: list[str] = [k for k, s in assignment.items() if s == shard.index]
+	manifest: dict[str, Any] = {
+		"shard": shard.index,
+		"n_shards": shard.count,
+		"assignment_hash": assignment_hash(assignment),
+		"pages": pages,
+		"page_times": {k: page_times[k] for k in pages if k in page_times},
+	}
+	output_dir.mkdir(parents=True, exist_ok=True)
+	path: Path = output_dir / SHARD_MANIFEST_FNAME
+	path.write_text(json.dumps(manifest, indent="\t"), encoding="utf-8")
+	return path
+
+
+def read_manifests(shard_dirs: list[Path]) -> list[dict[str, Any]]:
+	"""read and check the manifests of the shard output directories
+
+	# Returns:
+	 - `list[dict[str, Any]]` - one manifest per directory, in the order of `shard_dirs`
+
+	# Raises:
+	 - `ValueError` : if a manifest is missing, or the directories are not exactly
+	   the shards 1 to N of the same build
+	"""
+	manifests: list[dict[str, Any]] = []
+	for shard_dir in shard_dirs:
+		path: Path = shard_dir / SHARD_MANIFEST_FNAME
+		try:
+			manifests.append(json.loads(path.read_text(encoding="utf-8")))
+		except FileNotFoundError as e:
+			raise ValueError(
+				f"'{shard_dir}' is not the output of a sharded build: no {SHARD_MANIFEST_FNAME}"
+			) from e
+	if not manifests:
+		raise ValueError("no shard output directories given")
+
+	n_shards: int = manifests[0]["n_shards"]
+	indices: list[int] = sorted(m["shard"] for m in manifests)
+	if any(m["n_shards"] != n_shards for m in manifests) or indices != list(
+		range(1, n_shards + 1)
+	):
+		raise ValueError(
+			f"expected shards 1 to {n_shards} exactly once each, got "
+			+ ", ".join(f"{m['shard']}/{m['n_shards']}" for m in manifests)
+		)
+	if len({m["assignment_hash"] for m in manifests}) > 1:
+		raise ValueError(
+			"shards assigned pages differently, so some pages may be missing: "
+			"every shard must discover the same pages and use the same timing "
+			"history, i.e. the same `cache_dir`"
+		)
+	return manifests
+
+
+def merge_shards(
+	shard_dirs: list[Path],
+	output_dir: Path,
+	cache_dir: Path | None = None,
+	verbose: bool = True,
+) -> int:
+	"""combine the output directories of all shards of a build into `output_dir`
+
+	files present in several shards (such as the output of a file that both a
+	page and a copied content file write to) must be identical. the manifests
+	are not copied, and removed from `output_dir` if it is one of the shard
+	directories. with `cache_dir`, the page times recorded by the shards are
+	saved there for the next build.
+
+	# Returns:
+	 - `int` - number of files copied
+
+	# Raises:
+	 - `ValueError` : if the shards don't belong together (see `read_manifests`)
+	   or two shards wrote different contents to the same file
+	"""
+	import filecmp
+
+	manifests: list[dict[str, Any]] = read_manifests(shard_dirs)
+
+	sources: dict[str, Path] = {}
+	for shard_dir in shard_dirs:
+		for file_path in sorted(shard_dir.rglob("*")):
+			rel_path: str = file_path.relative_to(shard_dir).as_posix()
+			if not file_path.is_file() or rel_path == SHARD_MANIFEST_FNAME:
+				continue
+			other: Path | None = sources.get(rel_path)
+			if other is None:
+				sources[rel_path] = file_path
+			elif not filecmp.cmp(other, file_path, shallow=False):
+				raise ValueError(
+					f"conflicting outputs for '{rel_path}': '{other}' and '{file_path}' differ"
+				)
+
+	n_copied: int = 0
+	output_dir = output_dir.resolve()
+	for rel_path, file_path in sources.items():
+		dest: Path = output_dir / rel_path
+		if dest.resolve() == file_path.resolve():
+			continue
+		dest.parent.mkdir(parents=True, exist_ok=True)
+		shutil.copy2(file_path, dest)
+		n_copied += 1
+	(output_dir / SHARD_MANIFEST_FNAME).unlink(missing_ok=True)
+
+	if cache_dir is not None:
+		page_times: dict[str, float] = load_page_times(cache_dir)
+		for manifest in manifests:
+			page_times.update(manifest["page_times"])
+		all_pages: set[str] = {k for m in manifests for k in m["pages"]}
+		save_page_times(
+			cache_dir, {k: v for k, v in page_times.items() if k in all_pages}
+		)
+
+	if verbose:
+		print(
+			f"Merged {len(manifests)} shards into '{output_dir}' ({n_copied} files copied)"
+		)
+	return n_copied
+
+
+def main(argv: list[str] | None = None) -> None:
+	"""command-line entry point for `python -m pdj_sitegen merge`"""
+	import argparse
+
+	arg_parser: argparse.ArgumentParser = argparse.ArgumentParser(
+		prog="pdj-sitegen merge",
+		description=(
+			"Combine the output directories of a sharded build (see `--shard`) "
+			"into the output directory of the config."
+		),
+	)
+	arg_parser.add_argument(
+		"config_path",
+		type=str,
+		help="path to config file (supports .yml, .yaml, .toml, or .json)",
+	)
+	arg_parser.add_argument(
+		"shard_dirs",
+		type=Path,
+		nargs="+",
+		help="output directories of all shards, in any order",
+	)
+	arg_parser.add_argument(
+		"-q",
+		"--quiet",
+		action="store_true",
+		help="disable verbose output",
+	)
+	args: argparse.Namespace = arg_parser.parse_args(argv)
+	config_path: Path = Path(args.config_path)
+	root_dir: Path = config_path.parent.absolute()
+	config: Config = Config.read(root_dir / config_path.name)
+	merge_shards(
+		shard_dirs=args.shard_dirs,
+		output_dir=root_dir / config.output_dir,
+		cache_dir=root_dir / config.cache_dir if config.cache_dir else None,
+		verbose=not args.quiet,
+	)
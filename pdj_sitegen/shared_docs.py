@@ -0,0 +1,106 @@
+"""Read-only document index shared between worker processes
+
+With `--executor process`, pages are rendered in worker processes which all
+need the site-wide `docs` mapping as template context. Instead of pickling it
+to every worker, or for every page, `write_shared_docs` serializes it once to
+a file, with each document pickled separately. Workers open it as a
+`SharedDocs` mapping, which memory-maps the file, so all processes share the
+same pages of the OS page cache, and unpickles a document only when it is
+accessed. Unpickled documents are kept until `SharedDocs.clear_cache` is
+called, which workers do after every page, so a page reading a document
+several times unpickles it once, and memory per worker is bounded by the
+documents a single page reads instead of growing with the site.
+
+The file starts with the length of the pickled key index as 8 little-endian
+bytes, then the index (document key -> offset and length, in document order),
+then the pickled documents.
+"""
+
+import mmap
+import pickle
+import struct
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+from typing import Any
+
+from pdj_sitegen.document import Document
+
+_HEADER: struct.Struct = struct.Struct("<Q")
+
+
+def write_shared_docs(docs: Mapping[str, Mapping[str, Any]], path: Path) -> int:
+	"""serialize `docs` to `path` for `SharedDocs`, returning the size in bytes"""
+	index: dict[str, tuple[int, int]] = {}
+	blobs: list[bytes] = []
+	offset: int = 0
+	for key, doc in docs.items():
+		if not isinstance(doc, Document):
+			doc = Document(doc["frontmatter"], doc.get("body"), doc["file_meta"])
+		blob: bytes = pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL)
+		index[key] = (offset, len(blob))
+		blobs.append(blob)
+		offset += len(blob)
+	index_blob: bytes = pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)
+	with open(path, "wb") as f:
+		f.write(_HEADER.pack(len(index_blob)))
+		f.write(index_blob)
+		for blob in blobs:
+			f.write(blob)
+	return _HEADER.size + len(index_blob) + offset
+
+
+class SharedDocs(Mapping[str, Document]):
+	"""documents written by `write_shared_docs`, read lazily from a memory-mapped file
+
+	pickling a `SharedDocs` only pickles the path, so it can be sent to worker
+	processes cheaply.
+
+	# Parameters:
+	 - `path : Path` - file written by `write_shared_docs`
+	 - `bodies : bool` - if False, documents are returned without their bodies, see `Document.without_body`
+	"""
+
+	def __init__(self, path: Path, bodies: bool = True) -> None:
+		self.path: Path = path
+		self.bodies: bool = bodies
+		with open(path, "rb") as f:
+			self._mmap: mmap.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		(index_size,) = _HEADER.unpack_from(self._mmap, 0)
+		self._data_start: int = _HEADER.size + index_size
+		self._index: dict[str, tuple[int, int]] = pickle.loads(
+			self._mmap[_HEADER.size : self._data_start]
+		)
+		# unpickled documents, until `clear_cache`
+		self._docs: dict[str, Document] = {}
+
+	def __getitem__(self, key: str) -> Document:
+		doc: Document | None = self._docs.get(key)
+		if doc is None:
+			offset, length = self._index[key]
+			start: int = self._data_start + offset
+			doc = pickle.loads(self._mmap[start : start + length])
+			if not self.bodies:
+				doc = doc.without_body()
+			self._docs[key] = doc
+		return doc
+
+	def __contains__(self, key: object) -> bool:
+		return key in self._index
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self._index)
+
+	def __len__(self) -> int:
+		return len(self._index)
+
+	def clear_cache(self) -> None:
+		"""forget the unpickled documents, which are read again when accessed"""
+		self._docs.clear()
+
+	def close(self) -> None:
+		"""unmap the file, after which documents can't be read"""
+		self._docs.clear()
+		self._mmap.close()
+
+	def __reduce__(self) -> tuple[Any, ...]:
+		return (SharedDocs, (self.path, self.bodies))
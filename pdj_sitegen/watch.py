@@ -0,0 +1,552 @@
+"""Watch mode: keep the site in memory and rebuild only what a change affects
+
+`WatchState` holds the `Config`, the Jinja2 `Environment`, the document tree,
+the frontmatter cache, and stat snapshots of the content and templates
+directories. Each `WatchState.poll()` rescans the snapshots and:
+
+- reloads everything if the config file changed
+- reloads only the frontmatter of modified markdown files
+- rescans the document tree (reusing cached frontmatter) if markdown files were added or removed
+- copies or deletes changed resource files
+- reconverts the changed pages, plus pages whose body or template uses
+  a context variable (`docs`, `dir_files`, ...) or template that the change touched
+
+Edits that leave a page's frontmatter as it was still change its body and
+`file_meta`, so pages reading other documents are reconverted too if their
+sources read `body` or `file_meta` (or one of `FILE_META_KEYS`) anywhere. This
+is decided from attribute names, so a template that reads those through a
+document passed whole to a filter or macro (`doc | tojson`) may be left stale.
+
+Changes are detected by polling `(st_mtime_ns, st_size)` of every file, which
+only uses the standard library and works on every platform and filesystem.
+"""
+
+import datetime
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Environment, TemplateNotFound, TemplateSyntaxError, meta, nodes
+
+from pdj_sitegen.build import (
+	build_document_tree,
+	convert_markdown_files,
+	copy_content_files,
+	create_jinja_env,
+	load_document,
+	should_copy,
+)
+from pdj_sitegen.cache import BuildCache, StatSignature, hash_context, stat_signature
+from pdj_sitegen.config import Config
+from pdj_sitegen.document import FILE_META_KEYS, BodyRef, Document
+from pdj_sitegen.error_report import handle_build_error
+
+POLL_INTERVAL: float = 0.2
+"""Seconds between two scans of the watched directories."""
+
+DOCS_CONTEXT_VARS: frozenset[str] = frozenset(
+	{"docs", "child_docs_dotlist", "child_docs_folder"}
+)
+"""Context variables that expose other documents to a page."""
+
+DIR_CONTEXT_VARS: frozenset[str] = frozenset(
+	{"dir_files", "dir_subdirs", "dir_contents_recursive"}
+)
+"""Context variables that expose the directory listing of a page."""
+
+CONTENT_FIELDS: frozenset[str] = frozenset({"body", "file_meta", *FILE_META_KEYS})
+"""Names through which a template reads the body or file metadata of a document."""
+
+Snapshot = dict[str, StatSignature]
+"""Stat signatures of all files under a directory, keyed by POSIX path."""
+
+
+def snapshot_dir(root: Path) -> Snapshot:
+	"""stat signatures of all files under `root`. empty if `root` does not exist"""
+	snapshot: Snapshot = {}
+	stack: list[str] = [str(root)]
+	while stack:
+		try:
+			entries = os.scandir(stack.pop())
+		except (FileNotFoundError, NotADirectoryError):
+			continue
+		with entries:
+			for entry in entries:
+				try:
+					if entry.is_dir():
+						stack.append(entry.path)
+					elif entry.is_file():
+						snapshot[Path(entry.path).as_posix()] = stat_signature(
+							entry.stat()
+						)
+				except FileNotFoundError:
+					# removed while scanning, will show up in the next scan
+					continue
+	return snapshot
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> tuple[set[str], set[str], set[str]]:
+	"""compare two snapshots
+
+	# Returns:
+	 - `tuple[set[str], set[str], set[str]]`
+	   paths that were added, removed, and modified
+	"""
+	added: set[str] = new.keys() - old.keys()
+	removed: set[str] = old.keys() - new.keys()
+	modified: set[str] = {
+		path for path, sig in new.items() if path in old and old[path] != sig
+	}
+	return added, removed, modified
+
+
+@dataclass(frozen=True)
+class PageDeps:
+	"""what a page's body and template depend on, besides its own frontmatter
+
+	# Attributes:
+	 - `variables : frozenset[str]` - undeclared context variables used
+	 - `templates : frozenset[str] | None` - names of all templates used, None if unknown (dynamic includes)
+	 - `attributes : frozenset[str] | None` - attribute and item names read, and the
+	   dot-separated parts of string constants (for `attribute=` filter arguments).
+	   None if unknown
+	"""
+
+	variables: frozenset[str]
+	templates: frozenset[str] | None
+	attributes: frozenset[str] | None = frozenset()
+
+	def __or__(self, other: "PageDeps") -> "PageDeps":
+		return PageDeps(
+			variables=self.variables | other.variables,
+			templates=(
+				None
+				if self.templates is None or other.templates is None
+				else self.templates | other.templates
+			),
+			attributes=(
+				None
+				if self.attributes is None or other.attributes is None
+				else self.attributes | other.attributes
+			),
+		)
+
+	@property
+	def reads_contents(self) -> bool:
+		"""whether the body or file metadata of other documents may be read"""
+		return self.attributes is None or bool(self.attributes & CONTENT_FIELDS)
+
+
+UNKNOWN_DEPS: PageDeps = PageDeps(
+	variables=DOCS_CONTEXT_VARS | DIR_CONTEXT_VARS, templates=None, attributes=None
+)
+"""Dependencies assumed for sources that can't be parsed."""
+
+
+def _source_deps(jinja_env: Environment, source: str) -> tuple[PageDeps, list[str]]:
+	"""dependencies of a single template source, and the names of templates it references"""
+	try:
+		ast = jinja_env.parse(source)
+	except TemplateSyntaxError:
+		return UNKNOWN_DEPS, []
+	refs: list[str | None] = list(meta.find_referenced_templates(ast))
+	names: list[str] = [ref for ref in refs if ref is not None]
+	attributes: set[str] = {node.attr for node in ast.find_all(nodes.Getattr)}
+	for node in ast.find_all(nodes.Const):
+		if isinstance(node.value, str):
+			attributes.update(node.value.split("."))
+	return (
+		PageDeps(
+			variables=frozenset(meta.find_undeclared_variables(ast)),
+			templates=None if len(names) < len(refs) else frozenset(names),
+			attributes=frozenset(attributes),
+		),
+		names,
+	)
+
+
+def _uses_docs(deps: PageDeps, key: str, changed_docs: set[str]) -> bool:
+	"""whether the page `key` sees any of `changed_docs` through the document context variables"""
+	if not changed_docs:
+		return False
+	page_dir: str = str(Path(key).parent)
+	return (
+		"docs" in deps.variables
+		or (
+			"child_docs_dotlist" in deps.variables
+			and any(k.startswith(key) and k != key for k in changed_docs)
+		)
+		or (
+			"child_docs_folder" in deps.variables
+			and any(str(Path(k).parent) == page_dir for k in changed_docs)
+		)
+	)
+
+
+class WatchState:
+	"""a site kept in memory between rebuilds, see the module docstring
+
+	# Parameters:
+	 - `config_path : Path` - path to the config file
+	 - `verbose : bool` - print progress information
+	 - `jobs : int` - worker processes for the full builds, see `resolve_jobs`
+	"""
+
+	def __init__(self, config_path: Path, verbose: bool = True, jobs: int = 1) -> None:
+		self.root_dir: Path = config_path.parent.absolute()
+		self.config_file: Path = self.root_dir / config_path.name
+		self.verbose: bool = verbose
+		self.jobs: int = jobs
+
+		self.config: Config
+		self.jinja_env: Environment
+		self.frontmatter_context: dict[str, Any]
+		self.cache: BuildCache
+		self.docs: dict[str, Document] = {}
+		self.config_sig: StatSignature | None = None
+		self.content_snapshot: Snapshot = {}
+		self.templates_snapshot: Snapshot = {}
+		# set once the config has been read successfully
+		self.loaded: bool = False
+		# set while the document tree may be out of sync with the snapshots
+		self.stale: bool = True
+		self._body_deps: dict[str, PageDeps] = {}
+		self._template_deps: dict[str, PageDeps] = {}
+
+	@property
+	def content_dir(self) -> Path:
+		return self.root_dir / self.config.content_dir
+
+	@property
+	def templates_dir(self) -> Path:
+		return self.root_dir / self.config.templates_dir
+
+	@property
+	def output_dir(self) -> Path:
+		return self.root_dir / self.config.output_dir
+
+	@property
+	def intermediates_dir(self) -> Path | None:
+		if self.config.intermediates_dir:
+			return self.root_dir / self.config.intermediates_dir
+		return None
+
+	def _load_kwargs(self) -> dict[str, Any]:
+		return {
+			"content_dir": self.content_dir,
+			"frontmatter_context": self.frontmatter_context,
+			"jinja_env": self.jinja_env,
+			"normalize_index_names": self.config.normalize_index_names,
+		}
+
+	def convert(self, keys: set[str] | None) -> None:
+		"""convert the pages with the given keys, or all pages if None"""
+		convert_markdown_files(
+			docs=self.docs,
+			jinja_env=self.jinja_env,
+			config=self.config,
+			output_root=self.root_dir,
+			smart_rebuild=False,
+			rebuild_time=-1.0,
+			verbose=self.verbose,
+			intermediates_dir=self.intermediates_dir,
+			keys=keys,
+		)
+
+	def build_all(self) -> None:
+		"""read the config and build the whole site, like `pipeline`"""
+		self.load()
+		copy_content_files(
+			content_dir=self.content_dir,
+			output_dir=self.output_dir,
+			include=self.config.copy_include,
+			exclude=self.config.copy_exclude,
+			verbose=self.verbose,
+		)
+		self.convert(keys=None)
+		# parse all pages now, so the first edit does not have to
+		for key in self.docs:
+			self.page_deps(key)
+
+	def load(self) -> None:
+		"""read the config, set up the jinja environment, and build the document tree"""
+		self.stale = True
+		self._body_deps.clear()
+		self._template_deps.clear()
+		self.config_sig = stat_signature(self.config_file.stat())
+		self.config = Config.read(self.config_file)
+		self.loaded = True
+		self.jinja_env = create_jinja_env(self.config, self.root_dir)
+		self.frontmatter_context = {"config": self.config.serialize()}
+		self.cache = BuildCache.load(
+			cache_dir=(
+				self.root_dir / self.config.cache_dir if self.config.cache_dir else None
+			),
+			context_hash=hash_context(self.frontmatter_context),
+		)
+		# snapshot first, so edits made during the build are picked up by the next poll
+		self.content_snapshot = snapshot_dir(self.content_dir)
+		self.templates_snapshot = snapshot_dir(self.templates_dir)
+
+		self.docs = build_document_tree(
+			**self._load_kwargs(),
+			verbose=self.verbose,
+			jobs=self.jobs,
+			cache=self.cache,
+		)
+		self.cache.save()
+		self.stale = False
+
+	def template_deps(self, name: str) -> PageDeps:
+		"""dependencies of a template, including everything it extends, includes, or imports"""
+		if name in self._template_deps:
+			return self._template_deps[name]
+		# guard against cycles while recursing
+		self._template_deps[name] = PageDeps(frozenset(), frozenset({name}))
+		deps: PageDeps = PageDeps(frozenset(), frozenset({name}))
+		try:
+			source: str = self.jinja_env.loader.get_source(self.jinja_env, name)[0]  # type: ignore[union-attr]
+		except TemplateNotFound:
+			pass
+		else:
+			source_deps, refs = _source_deps(self.jinja_env, source)
+			deps = deps | source_deps
+			for ref in refs:
+				deps = deps | self.template_deps(ref)
+		self._template_deps[name] = deps
+		return deps
+
+	def page_deps(self, key: str) -> PageDeps:
+		"""dependencies of the page with document key `key`"""
+		doc: dict[str, Any] = self.docs[key]
+		if key not in self._body_deps:
+			body: str | BodyRef = doc["body"]
+			try:
+				body = body.read() if isinstance(body, BodyRef) else body
+			except OSError:
+				body_deps: PageDeps = UNKNOWN_DEPS
+			else:
+				body_deps = _source_deps(self.jinja_env, body)[0]
+			self._body_deps[key] = body_deps
+		template_name: str = doc["frontmatter"].get(
+			"__template__", self.config.default_template.as_posix()
+		)
+		return self._body_deps[key] | self.template_deps(template_name)
+
+	def affected_pages(
+		self,
+		changed_docs: set[str],
+		changed_templates: set[str],
+		changed_dirs: set[str],
+		changed_contents: set[str] | None = None,
+	) -> set[str]:
+		"""keys of pages that use any of the changed documents, templates, or directories
+
+		pages are affected by `changed_contents` only if their sources read the body
+		or file metadata of a document by name, see the module docstring.
+
+		# Parameters:
+		 - `changed_docs : set[str]` - keys of documents that were added, removed, or whose frontmatter changed
+		 - `changed_templates : set[str]` - names of changed templates
+		 - `changed_dirs : set[str]` - content-relative directories in which files were added or removed
+		 - `changed_contents : set[str] | None` - keys of other modified documents, whose body or `file_meta` changed
+		"""
+		affected: set[str] = set()
+		changed_contents = changed_contents or set()
+		if not (changed_docs or changed_templates or changed_dirs or changed_contents):
+			return affected
+		for key in self.docs:
+			deps: PageDeps = self.page_deps(key)
+			page_dir: str = str(Path(key).parent)
+			uses_changed_template: bool = bool(changed_templates) and (
+				deps.templates is None or bool(deps.templates & changed_templates)
+			)
+			uses_changed_doc: bool = _uses_docs(
+				deps,
+				key,
+				changed_docs | changed_contents
+				if deps.reads_contents
+				else changed_docs,
+			)
+			uses_changed_dir: bool = bool(deps.variables & DIR_CONTEXT_VARS) and any(
+				page_dir == "." or d == page_dir or d.startswith(page_dir + "/")
+				for d in changed_dirs
+			)
+			if uses_changed_template or uses_changed_doc or uses_changed_dir:
+				affected.add(key)
+		return affected
+
+	def poll(self) -> int | None:
+		"""scan for changes and rebuild what they affect
+
+		# Returns:
+		 - `int | None`
+		   number of pages converted, or None if nothing changed
+		"""
+		config_sig: StatSignature = stat_signature(self.config_file.stat())
+		if config_sig != self.config_sig:
+			self.build_all()
+			return len(self.docs)
+		if not self.loaded:
+			# the config could not be read, wait for it to change
+			return None
+
+		content_snapshot: Snapshot = snapshot_dir(self.content_dir)
+		templates_snapshot: Snapshot = snapshot_dir(self.templates_dir)
+		if (
+			content_snapshot == self.content_snapshot
+			and templates_snapshot == self.templates_snapshot
+		):
+			return None
+
+		if self.stale:
+			self.build_all()
+			return len(self.docs)
+
+		content_changes = diff_snapshots(self.content_snapshot, content_snapshot)
+		template_changes = diff_snapshots(self.templates_snapshot, templates_snapshot)
+		self.content_snapshot = content_snapshot
+		self.templates_snapshot = templates_snapshot
+		return self.update(content_changes, template_changes)
+
+	def update_resource(self, rel_path: str, source: Path | None) -> None:
+		"""copy a changed resource file to the output, or delete it there if `source` is None"""
+		dest: Path = self.output_dir / rel_path
+		if source is None:
+			dest.unlink(missing_ok=True)
+		else:
+			dest.parent.mkdir(parents=True, exist_ok=True)
+			shutil.copy2(source, dest)
+
+	def remove_page(self, key: str, doc: Document) -> None:
+		"""delete the output of a page whose source was removed"""
+		(self.output_dir / doc["file_meta"]["path_html"]).unlink(missing_ok=True)
+
+	def update(
+		self,
+		content_changes: tuple[set[str], set[str], set[str]],
+		template_changes: tuple[set[str], set[str], set[str]],
+	) -> int:
+		"""apply changes found by `diff_snapshots` and reconvert the affected pages
+
+		# Returns:
+		 - `int` - number of pages converted
+		"""
+		added, removed, modified = content_changes
+		content_dir: Path = self.content_dir
+
+		# resource files
+		for path in sorted(added | modified | removed):
+			rel_path: str = Path(path).relative_to(content_dir).as_posix()
+			if should_copy(
+				rel_path, self.config.copy_include, self.config.copy_exclude
+			):
+				self.update_resource(rel_path, None if path in removed else Path(path))
+
+		md_added: set[str] = {p for p in added if p.endswith(".md")}
+		md_removed: set[str] = {p for p in removed if p.endswith(".md")}
+		md_modified: set[str] = {p for p in modified if p.endswith(".md")}
+
+		to_convert: set[str] = set()
+		changed_docs: set[str] = set()
+		changed_contents: set[str] = set()
+		self.stale = True
+		if md_added or md_removed:
+			old_docs: dict[str, Document] = self.docs
+			self.docs = build_document_tree(
+				**self._load_kwargs(), verbose=False, cache=self.cache
+			)
+			for key in old_docs.keys() - self.docs.keys():
+				self._body_deps.pop(key, None)
+				changed_docs.add(key)
+				self.remove_page(key, old_docs[key])
+			for key in self.docs.keys() - old_docs.keys():
+				changed_docs.add(key)
+				to_convert.add(key)
+		for path in sorted(md_modified):
+			key, doc, entry = load_document(
+				Path(path),
+				**self._load_kwargs(),
+				cache_entry=self.cache.frontmatter.get(path),
+			)
+			self.cache.frontmatter[path] = entry
+			old_doc: Document | None = self.docs.get(key)
+			if old_doc is None or old_doc["frontmatter"] != doc["frontmatter"]:
+				changed_docs.add(key)
+			else:
+				# the modification time changed, and maybe the body
+				changed_contents.add(key)
+			self.docs[key] = doc
+			self._body_deps.pop(key, None)
+			to_convert.add(key)
+		if md_added or md_removed or md_modified:
+			self.cache.save()
+		self.stale = False
+
+		changed_templates: set[str] = set()
+		if any(template_changes):
+			templates_dir: Path = self.templates_dir
+			changed_templates = {
+				Path(path).relative_to(templates_dir).as_posix()
+				for path in set.union(*template_changes)
+			}
+			self._template_deps.clear()
+			if self.jinja_env.cache is not None:
+				self.jinja_env.cache.clear()
+
+		to_convert |= self.affected_pages(
+			changed_docs=changed_docs,
+			changed_templates=changed_templates,
+			changed_dirs={
+				str(Path(path).relative_to(content_dir).parent)
+				for path in added | removed
+			},
+			changed_contents=changed_contents,
+		)
+		if to_convert:
+			self.convert(keys=to_convert)
+		return len(to_convert)
+
+
+def watch(
+	config_path: Path,
+	verbose: bool = True,
+	jobs: int = 1,
+	poll_interval: float = POLL_INTERVAL,
+) -> None:
+	"""build the site, then rebuild affected pages whenever a source file changes
+
+	runs until interrupted. build errors are reported and watching continues.
+
+	# Parameters:
+	 - `config_path : Path` - path to the config file
+	 - `verbose : bool` - print progress information for the initial build
+	 - `jobs : int` - worker processes for full builds, see `resolve_jobs`
+	 - `poll_interval : float` - seconds between scans for changes
+	"""
+	state: WatchState = WatchState(config_path, verbose=verbose, jobs=jobs)
+	try:
+		state.build_all()
+	# like the CLI, report any error in the site's sources, but keep watching:
+	# config, frontmatter, and template errors are not all build exceptions
+	except Exception as e:  # noqa: BLE001
+		handle_build_error(e, state.root_dir)
+	state.verbose = False
+
+	print(f"Watching '{state.root_dir}' for changes, press Ctrl+C to stop")
+	while True:
+		time.sleep(poll_interval)
+		start: float = time.perf_counter()
+		try:
+			n_converted: int | None = state.poll()
+		except Exception as e:  # noqa: BLE001
+			handle_build_error(e, state.root_dir)
+			continue
+		if n_converted is not None:
+			print(
+				f"[{datetime.datetime.now():%H:%M:%S}] rebuilt {n_converted} page(s) "
+				f"in {time.perf_counter() - start:.3f}s"
+			)
@@ -2,11 +2,21 @@
 """Shared pytest fixtures for pdj-sitegen tests."""
 
 import os
+import stat
+import sys
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
+import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
 import pytest
 from jinja2 import Environment, FileSystemLoader
 
+from pdj_sitegen.build import (
+	build_document_tree,
+	convert_markdown_files,
+	create_jinja_env,
+)
 from pdj_sitegen.config import Config
 
 TEST_TEMP_DIR: Path = Path("tests/.temp")
@@ -79,3 +89,114 @@ This is sample content.
 """
 	)
 	return md_file
+
+
+FAKE_PANDOC_SCRIPT: str = """\
+#!{python}
+import os, sys, time
+source = sys.stdin.read()
+args = sys.argv[1:]
+assert args[:2] == ["--from=markdown+smart", "--to=html"], args
+if "fail" in source:
+    sys.stderr.write("pandoc failed")
+    sys.exit(3)
+time.sleep({delay})
+sys.stdout.write({output!r}.format(source=source.strip(), pid=os.getpid()))
+"""
+
+
+@pytest.fixture
+def fake_pandoc(tmp_path, monkeypatch) -> Callable[..., None]:
+	"""Replace pandoc with a fake, failing on sources containing "fail".
+
+	Returns a function installing it, which takes:
+	 - `output : str` - format string for the HTML, with the stripped `{source}`
+	   and the `{pid}` of the converting process (default: `"<p>{source}</p>"`)
+	 - `delay : float` - seconds the pandoc executable takes (default: 0)
+
+	Both `pypandoc.convert_text` and the executable run by `pandoc_convert_async`
+	are replaced.
+	"""
+
+	def install(output: str = "<p>{source}</p>", delay: float = 0.0) -> None:
+		def convert_text(source, to, format, extra_args):
+			if "fail" in source:
+				raise RuntimeError("pandoc failed")
+			return output.format(source=source.strip(), pid=os.getpid())
+
+		script: Path = tmp_path / "fake_pandoc"
+		script.write_text(
+			FAKE_PANDOC_SCRIPT.format(python=sys.executable, delay=delay, output=output)
+		)
+		script.chmod(script.stat().st_mode | stat.S_IEXEC)
+		monkeypatch.setattr(pypandoc, "convert_text", convert_text)
+		monkeypatch.setattr(pypandoc, "get_pandoc_path", lambda: str(script))
+
+	return install
+
+
+@pytest.fixture
+def make_site(tmp_path) -> Callable[..., Path]:
+	"""Write a site with one page per body, titled with its document key.
+
+	Returns a function writing it, which takes:
+	 - `bodies : dict[str, str]` - markdown bodies by document key
+	 - `root : Path | None` - site directory (default: `tmp_path`)
+	 - `template : str` - the default template (default: `"{{ __content__ }}"`)
+	 - `config : str | None` - contents of `config.yml`, not written if None
+	 - `files : dict[str, str] | None` - other files in the content directory
+
+	and returns the site directory.
+	"""
+
+	def write(
+		bodies: dict[str, str],
+		root: Path | None = None,
+		template: str = "{{ __content__ }}",
+		config: str | None = None,
+		files: dict[str, str] | None = None,
+	) -> Path:
+		root = tmp_path if root is None else root
+		(root / "content").mkdir(parents=True)
+		(root / "templates").mkdir()
+		(root / "templates" / "default.html.jinja2").write_text(template)
+		if config is not None:
+			(root / "config.yml").write_text(config)
+		pages: dict[str, str] = {
+			f"{name}.md": f"---\ntitle: {name}\n---\n{body}"
+			for name, body in bodies.items()
+		}
+		for rel_path, content in {**pages, **(files or {})}.items():
+			(root / "content" / rel_path).parent.mkdir(parents=True, exist_ok=True)
+			(root / "content" / rel_path).write_text(content)
+		return root
+
+	return write
+
+
+def discover(root: Path, config: Config | None = None) -> tuple[Config, dict]:
+	"""config and documents of a site written by `make_site`"""
+	config = Config() if config is None else config
+	docs: dict = build_document_tree(
+		content_dir=root / "content",
+		frontmatter_context={},
+		jinja_env=create_jinja_env(config, root),
+		verbose=False,
+	)
+	return config, docs
+
+
+def convert(
+	root: Path, config: Config, docs: dict, verbose: bool = False, **kwargs: Any
+) -> None:
+	"""convert all pages of a site written by `make_site`, ignoring modification times"""
+	convert_markdown_files(
+		docs=docs,
+		jinja_env=create_jinja_env(config, root),
+		config=config,
+		output_root=root,
+		smart_rebuild=False,
+		rebuild_time=0,
+		verbose=verbose,
+		**kwargs,
+	)
@@ -0,0 +1,94 @@
+# pyright: reportMissingParameterType=false
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT: Path = Path(__file__).parent.parent
+
+
+def _run(*args: str) -> subprocess.CompletedProcess[str]:
+	return subprocess.run(
+		[sys.executable, "-m", *args],
+		cwd=REPO_ROOT,
+		capture_output=True,
+		text=True,
+		check=True,
+		timeout=300,
+	)
+
+
+class TestBenchmarks:
+	"""Smoke tests for the benchmark suite in `benchmarks/`."""
+
+	def test_generate_site_is_deterministic(self, tmp_path):
+		for name in ("a", "b"):
+			_run(
+				"benchmarks.generate_site",
+				str(tmp_path / name),
+				"--pages",
+				"12",
+				"--pages-per-section",
+				"5",
+				"--n-assets",
+				"3",
+			)
+		files_a = sorted(
+			p.relative_to(tmp_path / "a") for p in (tmp_path / "a").rglob("*")
+		)
+		files_b = sorted(
+			p.relative_to(tmp_path / "b") for p in (tmp_path / "b").rglob("*")
+		)
+		assert files_a == files_b
+		# 12 pages, 3 section indexes, and the home page
+		assert len([p for p in files_a if p.suffix == ".md"]) == 16
+		for rel in files_a:
+			if (tmp_path / "a" / rel).is_file():
+				assert (tmp_path / "a" / rel).read_bytes() == (
+					tmp_path / "b" / rel
+				).read_bytes()
+
+	def test_run_and_compare(self, tmp_path):
+		results: Path = tmp_path / "results.json"
+		_run(
+			"benchmarks.run",
+			"--pages",
+			"10",
+			"--n-assets",
+			"2",
+			"--template-complexity",
+			"2",
+			"--fake-pandoc",
+			"--work-dir",
+			str(tmp_path / "sites"),
+			"-o",
+			str(results),
+		)
+		data = json.loads(results.read_text())
+		assert data["meta"]["spec"]["n_pages"] == 10
+		scenarios = data["scenarios"]
+		assert list(scenarios) == ["cold", "noop", "single_edit", "template_edit"]
+		# 10 pages, one section index, and the home page
+		assert scenarios["cold"]["pages_converted"] == 12
+		assert scenarios["noop"]["pages_converted"] == 0
+		assert scenarios["single_edit"]["pages_converted"] == 1
+		assert scenarios["template_edit"]["pages_converted"] == 12
+		assert scenarios["cold"]["stages"]["convert"]["count"] == 1
+
+		comparison: str = _run("benchmarks.compare", str(results), str(results)).stdout
+		assert "template_edit:" in comparison
+
+	def test_filter_startup(self, tmp_path):
+		results: Path = tmp_path / "filters.json"
+		_run(
+			"benchmarks.filter_startup",
+			"--repeat",
+			"1",
+			"--paragraphs",
+			"3",
+			"-o",
+			str(results),
+		)
+		data = json.loads(results.read_text())
+		assert {"python", "links_md2html", "csv_code_table"} <= set(data)
+		assert data["links_md2html"]["min_ms"] > 0
@@ -0,0 +1,154 @@
+# pyright: reportMissingParameterType=false
+import io
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from pdj_sitegen.build import main
+from pdj_sitegen.build_log import BuildLog, active_build_log
+from pdj_sitegen.exceptions import ConversionError
+from pdj_sitegen.profiling import (
+	pop_page_stages,
+	span,
+	start_page_stages,
+	stop_page_stages,
+)
+
+
+class TestBuildLog:
+	"""Tests for the JSON lines writer."""
+
+	def test_events(self, tmp_path):
+		(tmp_path / "page.html").write_text("<p>hi</p>")
+		stream = io.StringIO()
+		with BuildLog(stream) as log:
+			log.emit("build_start", config="config.yml")
+			log.page(
+				"page",
+				source="content/page.md",
+				status="built",
+				seconds=0.25,
+				stages={"pandoc": 0.125},
+				output="page.html",
+				output_file=tmp_path / "page.html",
+			)
+			log.page("gone", source="content/gone.md", status="failed", error="boom")
+		events = [json.loads(line) for line in stream.getvalue().splitlines()]
+		assert [e["event"] for e in events] == ["build_start", "page", "page"]
+		assert all(e["t"] >= 0 for e in events)
+		assert events[1]["bytes"] == 9
+		assert events[1]["stages"] == {"pandoc": 0.125}
+		assert events[2]["bytes"] is None and events[2]["error"] == "boom"
+		assert log.page_counts == {"built": 1, "failed": 1}
+		assert log.n_events == 3
+
+	def test_missing_output(self, tmp_path):
+		stream = io.StringIO()
+		with BuildLog(stream) as log:
+			log.page("x", source="x.md", status="built", output_file=tmp_path / "no")
+		assert json.loads(stream.getvalue())["bytes"] is None
+
+	def test_closed_stream(self):
+		attempted = threading.Event()
+
+		class ClosedPipe(io.StringIO):
+			def write(self, s):
+				attempted.set()
+				raise BrokenPipeError(32, "Broken pipe")
+
+		log = BuildLog(ClosedPipe())
+		log.emit("build_start")
+		assert attempted.wait(5)
+		for i in range(100):
+			log.page(f"p{i}", source=f"p{i}.md", status="built")
+		log.close()
+		assert not log._thread.is_alive()
+		assert log._queue.empty()
+
+
+def test_page_stages():
+	with span("pandoc", page="a"):
+		pass
+	assert pop_page_stages("a") == {}
+	start_page_stages()
+	try:
+		with span("pandoc", page="a"), span("write", page="a"), span("convert"):
+			pass
+		with span("pandoc", page="a"):
+			pass
+		stages = pop_page_stages("a")
+		assert set(stages) == {"pandoc", "write"}
+		assert pop_page_stages("a") == {}
+	finally:
+		stop_page_stages()
+
+
+def _make_site(make_site, bodies: dict[str, str]) -> Path:
+	root: Path = make_site(
+		bodies, config="cache_dir: .cache\n", files={"style.css": "p {}"}
+	)
+	return root / "config.yml"
+
+
+def _run(monkeypatch, capsys, *args: str) -> list[dict]:
+	monkeypatch.setattr(sys, "argv", ["pdj_sitegen", *args, "--log-format", "jsonl"])
+	try:
+		main()
+	finally:
+		out = capsys.readouterr().out
+	return [json.loads(line) for line in out.splitlines()]
+
+
+def test_jsonl_build(tmp_path, monkeypatch, capsys, fake_pandoc, make_site):
+	fake_pandoc()
+	config_path = _make_site(make_site, {"index": "hi", "about": "me"})
+	events = _run(monkeypatch, capsys, str(config_path))
+	assert active_build_log() is None
+	assert [e["event"] for e in events] == [
+		"build_start",
+		"discovery",
+		"page",
+		"page",
+		"copy",
+		"build_end",
+	]
+	pages = {e["path"]: e for e in events if e["event"] == "page"}
+	assert pages["index"]["status"] == "built"
+	assert pages["index"]["cache"] == "miss"
+	assert pages["index"]["output"] == "index.html"
+	assert (
+		pages["index"]["bytes"] == (tmp_path / "output" / "index.html").stat().st_size
+	)
+	assert {"context", "body_render", "pandoc", "write"} <= set(
+		pages["index"]["stages"]
+	)
+	assert events[-2]["files_copied"] == 1
+	assert events[-1]["status"] == "ok"
+	assert events[-1]["pages"] == {"built": 2}
+
+	# the second build reads all frontmatter from the cache
+	events = _run(monkeypatch, capsys, str(config_path), "-s")
+	assert events[1]["cache_hits"] == 2
+	pages = {e["path"]: e for e in events if e["event"] == "page"}
+	assert pages["index"]["cache"] == "hit"
+	assert pages["index"]["status"] == "unmodified"
+
+
+def test_jsonl_failed_build(tmp_path, monkeypatch, capsys, fake_pandoc, make_site):
+	fake_pandoc()
+	config_path = _make_site(make_site, {"index": "hi", "broken": "{{ missing() }}"})
+	monkeypatch.setattr(
+		sys, "argv", ["pdj_sitegen", str(config_path), "--log-format", "jsonl"]
+	)
+	with pytest.raises(ConversionError):
+		main()
+	events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+	failed = [e for e in events if e["event"] == "page" and e["status"] == "failed"]
+	assert [e["path"] for e in failed] == ["broken"]
+	assert "UndefinedError" in failed[0]["error"] or "RenderError" in failed[0]["error"]
+	assert events[-1]["event"] == "build_end"
+	assert events[-1]["status"] == "failed"
+	assert events[-1]["error"].startswith("ConversionError")
@@ -0,0 +1,191 @@
+# pyright: reportMissingParameterType=false
+import os
+import pickle
+
+import pytest
+from jinja2 import Environment
+
+import pdj_sitegen.build
+from pdj_sitegen.build import build_document_tree
+from pdj_sitegen.cache import (
+	CACHE_FNAME,
+	CACHE_VERSION,
+	BuildCache,
+	FrontmatterEntry,
+	hash_context,
+	hash_text,
+)
+
+CONTEXT: dict = {"config": {"name": "Site"}}
+
+
+def _make_site(root, n=5):
+	for i in range(n):
+		(root / f"page_{i}.md").write_text(
+			f"---\ntitle: {{{{ config.name }}}} {i}\n---\nBody {i}\n"
+		)
+
+
+def _build(content_dir, cache, **kwargs):
+	return build_document_tree(
+		content_dir=content_dir,
+		frontmatter_context=CONTEXT,
+		jinja_env=Environment(),
+		verbose=False,
+		cache=cache,
+		**kwargs,
+	)
+
+
+class TestHashing:
+	"""Tests for the cache key helpers."""
+
+	def test_hash_text_stable(self):
+		assert hash_text("abc") == hash_text("abc")
+		assert hash_text("abc") != hash_text("abd")
+
+	def test_hash_context_key_order(self):
+		assert hash_context({"a": 1, "b": 2}) == hash_context({"b": 2, "a": 1})
+		assert hash_context({"a": 1}) != hash_context({"a": 2})
+
+
+class TestBuildCacheFile:
+	"""Tests for BuildCache.load and BuildCache.save."""
+
+	def _entry(self):
+		return FrontmatterEntry(
+			stat_sig=(1, 2),
+			content_hash=hash_text("title: x"),
+			frontmatter={"title": "x"},
+			body_offset=18,
+			fmt="yaml",
+		)
+
+	def test_roundtrip(self, tmp_path):
+		cache = BuildCache.load(tmp_path / "cache", context_hash="ctx")
+		cache.frontmatter["a.md"] = self._entry()
+		cache.save()
+
+		assert (tmp_path / "cache" / CACHE_FNAME).exists()
+		loaded = BuildCache.load(tmp_path / "cache", context_hash="ctx")
+		assert loaded.frontmatter == {"a.md": self._entry()}
+
+	def test_context_mismatch_drops_entries(self, tmp_path):
+		cache = BuildCache.load(tmp_path, context_hash="old")
+		cache.frontmatter["a.md"] = self._entry()
+		cache.save()
+
+		assert BuildCache.load(tmp_path, context_hash="new").frontmatter == {}
+
+	def test_version_mismatch_drops_entries(self, tmp_path):
+		with open(tmp_path / CACHE_FNAME, "wb") as f:
+			pickle.dump(
+				{
+					"version": CACHE_VERSION + 1,
+					"context_hash": "ctx",
+					"frontmatter": {"a.md": self._entry()},
+				},
+				f,
+			)
+		assert BuildCache.load(tmp_path, context_hash="ctx").frontmatter == {}
+
+	@pytest.mark.parametrize(
+		"data",
+		[
+			b"not a pickle",
+			b"\x80\x09",  # unsupported protocol
+			b"\x80\x04X\x05\x00\x00\x00\xff\xfe\xfd\xfc\xfb.",  # invalid utf-8
+			b"\x80\x04K\x01)R.",  # calls an int
+			b"\x80\x04\x8e\xff\xff\xff\xff\xff\xff\xff\x7f",  # huge length
+		],
+	)
+	def test_corrupt_file_ignored(self, tmp_path, data):
+		(tmp_path / CACHE_FNAME).write_bytes(data)
+		with pytest.warns(UserWarning, match="unreadable build cache"):
+			cache = BuildCache.load(tmp_path, context_hash="ctx")
+		assert cache.frontmatter == {}
+
+	def test_disabled(self, tmp_path):
+		cache = BuildCache.load(None, context_hash="ctx")
+		cache.frontmatter["a.md"] = self._entry()
+		cache.save()
+		assert list(tmp_path.iterdir()) == []
+
+
+class TestFrontmatterReuse:
+	"""Tests for build_document_tree with a BuildCache."""
+
+	def test_noop_rebuild_parses_nothing(self, tmp_path, monkeypatch):
+		"""Test an unchanged tree is loaded without reading or parsing any frontmatter."""
+		_make_site(tmp_path)
+		cache = BuildCache(context_hash=hash_context(CONTEXT))
+		first = _build(tmp_path, cache)
+		assert len(cache.frontmatter) == 5
+
+		def fail(*args, **kwargs):
+			raise AssertionError("frontmatter was re-read")
+
+		monkeypatch.setattr(pdj_sitegen.build, "read_frontmatter", fail)
+		second = _build(tmp_path, cache)
+
+		assert list(second) == list(first)
+		for key, doc in first.items():
+			assert second[key]["frontmatter"] == doc["frontmatter"]
+			assert second[key]["body"].read() == doc["body"].read()
+
+	def test_changed_file_reloaded(self, tmp_path):
+		"""Test a file whose stat signature changed is read again."""
+		_make_site(tmp_path)
+		cache = BuildCache(context_hash=hash_context(CONTEXT))
+		_build(tmp_path, cache)
+		old_hash = cache.frontmatter[(tmp_path / "page_1.md").as_posix()].content_hash
+
+		page = tmp_path / "page_1.md"
+		page.write_text("---\ntitle: Changed\nextra: 1\n---\nNew body\n")
+		st = page.stat()
+		os.utime(page, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+		docs = _build(tmp_path, cache)
+		assert docs["page_1"]["frontmatter"] == {"title": "Changed", "extra": 1}
+		assert docs["page_1"]["body"].read() == "New body\n"
+		new_entry = cache.frontmatter[page.as_posix()]
+		assert new_entry.content_hash != old_hash
+
+	def test_body_edit_keeps_content_hash(self, tmp_path):
+		"""Test editing only the body leaves the frontmatter hash unchanged."""
+		_make_site(tmp_path)
+		cache = BuildCache(context_hash=hash_context(CONTEXT))
+		_build(tmp_path, cache)
+		page = tmp_path / "page_2.md"
+		old_entry = cache.frontmatter[page.as_posix()]
+
+		page.write_text("---\ntitle: {{ config.name }} 2\n---\nA much longer body\n")
+		st = page.stat()
+		os.utime(page, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+		docs = _build(tmp_path, cache)
+		new_entry = cache.frontmatter[page.as_posix()]
+		assert new_entry is not old_entry
+		assert new_entry.content_hash == old_entry.content_hash
+		assert docs["page_2"]["body"].read() == "A much longer body\n"
+
+	def test_deleted_file_evicted(self, tmp_path):
+		_make_site(tmp_path)
+		cache = BuildCache(context_hash=hash_context(CONTEXT))
+		_build(tmp_path, cache)
+		(tmp_path / "page_0.md").unlink()
+
+		_build(tmp_path, cache)
+		assert (tmp_path / "page_0.md").as_posix() not in cache.frontmatter
+		assert len(cache.frontmatter) == 4
+
+	def test_parallel_uses_cache(self, tmp_path):
+		"""Test parallel discovery reuses cached entries and matches serial output."""
+		_make_site(tmp_path, n=12)
+		cache = BuildCache(context_hash=hash_context(CONTEXT))
+		serial = _build(tmp_path, cache)
+		parallel = _build(tmp_path, cache, jobs=3)
+
+		assert list(parallel) == list(serial)
+		for key, doc in serial.items():
+			assert parallel[key]["frontmatter"] == doc["frontmatter"]
@@ -39,10 +39,14 @@ def test_config_custom_values():
 		"pandoc_fmt_from": "markdown",
 		"pandoc_fmt_to": "html5",
 		"intermediates_dir": None,
+		"intermediates_archive": None,
+		"intermediates_include": [],
+		"intermediates_stages": [],
 		"prettify": False,
 		"copy_include": [],
 		"copy_exclude": ["*.md"],
 		"normalize_index_names": True,
+		"cache_dir": "custom_cache",
 	}
 	config = Config.load(custom_config)
 
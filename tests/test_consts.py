@@ -1,15 +1,24 @@
 # pyright: reportMissingParameterType=false
+from pathlib import Path
+
 import pytest
 import yaml
 import yaml.scanner
+from jinja2 import Environment
 
+from pdj_sitegen.build import read_frontmatter, render
+from pdj_sitegen.config import Config
 from pdj_sitegen.consts import (
 	FORMAT_MAP,
 	FORMAT_PARSERS,
 	FRONTMATTER_DELIMS,
 	FRONTMATTER_REGEX,
+	YAML_LOADER,
+	yaml_safe_load,
 )
 
+SITE_SRC: Path = Path(__file__).parent.parent / "site_src"
+
 
 # Tests for FORMAT_MAP
 def test_format_map():
@@ -163,3 +172,50 @@ def test_frontmatter_regex_no_match():
 	]
 	for case in no_match_cases:
 		assert FRONTMATTER_REGEX.match(case) is None
+
+
+# Tests for YAML_LOADER / yaml_safe_load
+def test_yaml_loader_uses_libyaml_when_available():
+	if yaml.__with_libyaml__:
+		assert YAML_LOADER is yaml.CSafeLoader
+	else:
+		assert YAML_LOADER is yaml.SafeLoader
+	assert FORMAT_PARSERS["yaml"] is yaml_safe_load
+
+
+def test_yaml_safe_load_rejects_unsafe_tags():
+	with pytest.raises(yaml.YAMLError):
+		yaml_safe_load("!!python/object/apply:os.system ['true']")
+
+
+@pytest.mark.skipif(not yaml.__with_libyaml__, reason="PyYAML built without libyaml")
+@pytest.mark.parametrize(
+	"md_path",
+	sorted(SITE_SRC.glob("content/**/*.md")),
+	ids=lambda p: p.name,
+)
+def test_csafeloader_parity_site_src(md_path):
+	"""CSafeLoader and SafeLoader agree on every frontmatter in site_src"""
+	config = Config.read(SITE_SRC / "config.yml")
+	frontmatter_raw, fmt, _ = read_frontmatter(md_path)
+	if fmt != "yaml":
+		pytest.skip("not YAML frontmatter")
+	frontmatter = render(
+		content=frontmatter_raw,
+		context={
+			"config": config.serialize(),
+			"file_meta": {"modified_time_str": "2024-01-01 00:00:00"},
+		},
+		jinja_env=Environment(**config.jinja_env_kwargs),
+	)
+	expected = yaml.load(frontmatter, Loader=yaml.SafeLoader)
+	assert yaml.load(frontmatter, Loader=yaml.CSafeLoader) == expected
+	assert yaml_safe_load(frontmatter) == expected
+
+
+@pytest.mark.skipif(not yaml.__with_libyaml__, reason="PyYAML built without libyaml")
+def test_csafeloader_parity_site_src_config():
+	text = (SITE_SRC / "config.yml").read_text()
+	assert yaml.load(text, Loader=yaml.CSafeLoader) == yaml.load(
+		text, Loader=yaml.SafeLoader
+	)
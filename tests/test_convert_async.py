@@ -0,0 +1,92 @@
+# pyright: reportMissingParameterType=false
+import sys
+import time
+
+import pytest
+from conftest import convert, discover  # pyright: ignore[reportImplicitRelativeImport]
+
+from pdj_sitegen.exceptions import MultipleExceptions
+from pdj_sitegen.profiling import start_profiling, stop_profiling, trace_events
+
+TEMPLATE: str = "<title>{{ title }}</title>{{ __content__ }}"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shebang script")
+class TestConvertAsync:
+	"""Tests for converting pages with concurrent pandoc subprocesses."""
+
+	def test_output_matches_serial(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc("<main>{source}</main>")
+		config, docs = discover(
+			make_site(
+				{f"p{i}": f"body {{{{ {i} + 1 }}}}" for i in range(6)},
+				template=TEMPLATE,
+			)
+		)
+		convert(tmp_path, config, docs, jobs=3)
+		for i in range(6):
+			assert (tmp_path / "output" / f"p{i}.html").read_text() == (
+				f"<title>p{i}</title><main>body {i + 1}</main>"
+			)
+
+		# the serial path through pypandoc gives the same result
+		(tmp_path / "output" / "p0.html").unlink()
+		convert(tmp_path, config, docs, jobs=1)
+		assert (tmp_path / "output" / "p0.html").read_text() == (
+			"<title>p0</title><main>body 1</main>"
+		)
+
+	def test_pandoc_runs_concurrently(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc("<main>{source}</main>", delay=0.5)
+		config, docs = discover(
+			make_site({f"p{i}": "x" for i in range(4)}, template=TEMPLATE)
+		)
+		start: float = time.perf_counter()
+		convert(tmp_path, config, docs, jobs=4)
+		assert time.perf_counter() - start < 1.5
+		assert len(list((tmp_path / "output").glob("*.html"))) == 4
+
+	def test_errors_in_document_order(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc("<main>{source}</main>")
+		config, docs = discover(
+			make_site(
+				{"a": "fail", "b": "ok", "c": "{{ undefined_fn() }}", "d": "fail"},
+				template=TEMPLATE,
+			)
+		)
+		with pytest.raises(MultipleExceptions) as exc_info:
+			convert(tmp_path, config, docs, jobs=2)
+		failed = list(exc_info.value.exceptions)
+		assert failed == [
+			doc["file_meta"]["path_raw"] for key, doc in docs.items() if key != "b"
+		]
+		assert "pandoc failed" in str(
+			exc_info.value.exceptions[docs["a"]["file_meta"]["path_raw"]]
+		)
+		assert (tmp_path / "output" / "b.html").exists()
+
+	def test_trace_spans_nest(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc("<main>{source}</main>", delay=0.1)
+		config, docs = discover(
+			make_site({f"p{i}": "x" for i in range(6)}, template=TEMPLATE)
+		)
+		start_profiling()
+		try:
+			convert(tmp_path, config, docs, jobs=2)
+		finally:
+			profiler = stop_profiling()
+		events = [e for e in trace_events(profiler)["traceEvents"] if e["ph"] == "X"]
+		page_tids = {e["tid"] for e in events if e["name"] == "page"}
+		assert len(page_tids) == 2
+		# complete events on the same thread must nest
+		by_thread: dict[tuple[int, int], list[dict]] = {}
+		for e in events:
+			by_thread.setdefault((e["pid"], e["tid"]), []).append(e)
+		for thread_events in by_thread.values():
+			open_ends: list[float] = []
+			for e in sorted(thread_events, key=lambda e: (e["ts"], -e["dur"])):
+				while open_ends and open_ends[-1] <= e["ts"]:
+					open_ends.pop()
+				end: float = e["ts"] + e["dur"]
+				assert not open_ends or end <= open_ends[-1] + 1
+				open_ends.append(end)
@@ -0,0 +1,132 @@
+# pyright: reportMissingParameterType=false
+import json
+import pickle
+
+from jinja2 import Environment
+
+from pdj_sitegen.build import build_document_tree, create_jinja_env, docs_without_bodies
+from pdj_sitegen.config import Config
+from pdj_sitegen.document import (
+	FILE_META_KEYS,
+	BodyRef,
+	Document,
+	FileMeta,
+	json_default,
+)
+
+
+def _doc(path: str = "blog/post", index_renamed: bool = False) -> Document:
+	return Document(
+		frontmatter={"title": "Post"},
+		body="body",
+		file_meta=FileMeta(
+			path=path,
+			path_raw=f"/site/content/{path}.md",
+			modified_time=0.0,
+			index_renamed=index_renamed,
+		),
+	)
+
+
+class TestFileMeta:
+	"""Tests for `FileMeta`."""
+
+	def test_derived_fields(self):
+		meta = _doc().file_meta
+		assert meta["path_stem"] == "post"
+		assert meta["path_html"] == "blog/post.html"
+		assert meta["path_to_root"] == ".."
+		assert meta["modified_time_str"].startswith(("1970-01-01", "1969-12-31"))
+		assert list(meta) == list(FILE_META_KEYS)
+		assert len(meta) == len(FILE_META_KEYS)
+
+	def test_index_renamed(self):
+		assert _doc("blog/_index", True).file_meta.path_html == "blog/index.html"
+		assert _doc("_index", True).file_meta.path_html == "index.html"
+		assert _doc("_index", False).file_meta.path_html == "_index.html"
+		assert _doc("_index", True).file_meta.path_to_root == "."
+
+	def test_mapping_behaviour(self):
+		meta = _doc().file_meta
+		assert meta.get("missing") is None
+		assert "path" in meta
+		assert "index_renamed" not in meta
+		assert meta == dict(meta)
+		assert meta.path is FileMeta("blog/" + "post", "x", 0.0).path
+
+	def test_no_instance_dict(self):
+		meta = _doc().file_meta
+		assert not hasattr(meta, "__dict__")
+		assert not hasattr(_doc(), "__dict__")
+
+
+class TestDocument:
+	"""Tests for `Document`."""
+
+	def test_mapping_behaviour(self):
+		doc = _doc()
+		assert list(doc) == ["frontmatter", "body", "file_meta"]
+		assert doc["frontmatter"] is doc.frontmatter
+		assert doc.get("body") == "body"
+		assert doc == {
+			"frontmatter": {"title": "Post"},
+			"body": "body",
+			"file_meta": dict(doc.file_meta),
+		}
+
+	def test_without_body(self):
+		doc = _doc().without_body()
+		assert list(doc) == ["frontmatter", "file_meta"]
+		assert "body" not in doc
+		assert doc.get("body") is None
+		env = Environment()
+		assert env.from_string("{{ d.body is defined }}").render(d=doc) == "False"
+
+	def test_pickle_roundtrip(self):
+		doc = _doc("a/_index", True)
+		doc.file_meta.path_html  # noqa: B018
+		loaded = pickle.loads(pickle.dumps(doc))
+		assert loaded == doc
+		assert loaded.file_meta.path_html == "a/index.html"
+
+	def test_templates(self):
+		env = create_jinja_env(Config(), Config().content_dir)
+		docs = {"blog/post": _doc()}
+		template = (
+			"{% for k, d in docs.items() %}{{ d.frontmatter.title }} "
+			"{{ d['file_meta']['path_html'] }} {{ d.file_meta.path_to_root }}"
+			"{% endfor %}"
+		)
+		assert env.from_string(template).render(docs=docs) == "Post blog/post.html .."
+		# `tojson` is html-safe, so only compare the parsed structure
+		out = env.from_string("{{ docs | tojson }}").render(docs=docs)
+		assert json.loads(out.replace("&#39;", "'")) == json.loads(
+			json.dumps(docs, default=json_default)
+		)
+
+
+def test_build_document_tree_returns_documents(tmp_path):
+	(tmp_path / "blog").mkdir()
+	(tmp_path / "blog" / "_index.md").write_text("---\ntitle: Blog\n---\nbody")
+	docs = build_document_tree(
+		content_dir=tmp_path,
+		frontmatter_context={},
+		jinja_env=Environment(),
+		verbose=False,
+	)
+	doc = docs["blog/_index"]
+	assert isinstance(doc, Document)
+	assert isinstance(doc.body, BodyRef)
+	assert doc.file_meta == {
+		"path": "blog/_index",
+		"path_stem": "_index",
+		"path_html": "blog/index.html",
+		"path_raw": (tmp_path / "blog" / "_index.md").as_posix(),
+		"path_to_root": "..",
+		"modified_time": doc.file_meta.modified_time,
+		"modified_time_str": doc.file_meta.modified_time_str,
+	}
+	assert next(iter(docs)) is doc.file_meta.path
+	stripped = docs_without_bodies(docs)["blog/_index"]
+	assert "body" not in stripped
+	assert stripped.file_meta is doc.file_meta
@@ -0,0 +1,138 @@
+# pyright: reportMissingParameterType=false
+import asyncio
+import os
+import time
+from typing import ClassVar
+
+import pytest
+from conftest import convert, discover  # pyright: ignore[reportImplicitRelativeImport]
+
+import pdj_sitegen.build
+from pdj_sitegen.build import PROCESS_TASKS_PER_WORKER
+from pdj_sitegen.error_report import handle_build_error
+from pdj_sitegen.exceptions import ConversionError, MultipleExceptions
+
+
+class TestMaxErrors:
+	"""Tests for stopping a build after a number of failed pages."""
+
+	BODIES: ClassVar[dict[str, str]] = {
+		f"p{i}": "fail" if i % 2 else "ok" for i in range(8)
+	}
+
+	def test_all_errors_by_default(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc()
+		config, docs = discover(make_site(self.BODIES))
+		with pytest.raises(MultipleExceptions) as exc_info:
+			convert(tmp_path, config, docs)
+		assert exc_info.value.n_failed == 4
+		assert exc_info.value.n_skipped == 0
+
+	def test_fail_fast(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc()
+		config, docs = discover(make_site(self.BODIES))
+		with pytest.raises(ConversionError, match="stopped early") as exc_info:
+			convert(tmp_path, config, docs, max_errors=1)
+		first_failed = next(i for i, k in enumerate(docs) if self.BODIES[k] == "fail")
+		assert exc_info.value.n_skipped == len(docs) - first_failed - 1
+		assert len(list((tmp_path / "output").glob("*.html"))) == first_failed
+
+	def test_max_errors(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc()
+		config, docs = discover(make_site(self.BODIES))
+		with pytest.raises(MultipleExceptions) as exc_info:
+			convert(tmp_path, config, docs, max_errors=2)
+		assert exc_info.value.n_failed == 2
+		assert exc_info.value.n_skipped > 0
+
+	def test_limit_not_reached(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc()
+		config, docs = discover(make_site(self.BODIES))
+		with pytest.raises(MultipleExceptions) as exc_info:
+			convert(tmp_path, config, docs, max_errors=10)
+		assert exc_info.value.n_failed == 4
+		assert exc_info.value.n_skipped == 0
+		assert "stopped early" not in str(exc_info.value)
+
+	def test_invalid(self, tmp_path, make_site):
+		config, docs = discover(make_site({}))
+		with pytest.raises(ValueError, match="max_errors must be at least 1"):
+			convert(tmp_path, config, docs, max_errors=0)
+
+	def test_async_cancels_pages_in_flight(self, tmp_path, monkeypatch, make_site):
+		cancelled: list[str] = []
+
+		async def slow_pandoc(source, to, format, extra_args):
+			if "fail" in source:
+				raise RuntimeError("pandoc failed")
+			try:
+				await asyncio.sleep(30)
+			except asyncio.CancelledError:
+				cancelled.append(source)
+				raise
+			return source
+
+		monkeypatch.setattr(pdj_sitegen.build, "pandoc_convert_async", slow_pandoc)
+		bodies = {"slow1": "slow", "slow2": "slow", "bad": "fail", "other": "slow"}
+		config, docs = discover(make_site(bodies))
+		start = time.perf_counter()
+		with pytest.raises(ConversionError) as exc_info:
+			convert(tmp_path, config, docs, max_errors=1, jobs=3)
+		assert time.perf_counter() - start < 10
+		# pages prepared before 'bad' failed are cancelled, the others never start
+		assert cancelled
+		assert exc_info.value.n_skipped == 3
+		assert not (tmp_path / "output").exists()
+
+	@pytest.mark.skipif(
+		os.name != "posix", reason="patches pandoc in the parent, needs fork"
+	)
+	def test_processes(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc()
+		bodies = {f"p{i:02}": "fail" if i == 0 else "ok" for i in range(40)}
+		config, docs = discover(make_site(bodies))
+		with pytest.raises(ConversionError) as exc_info:
+			convert(tmp_path, config, docs, max_errors=1, jobs=2, executor="process")
+		# the exception is the original one, found by converting the page again
+		assert isinstance(exc_info.value.__cause__, RuntimeError)
+		assert exc_info.value.n_skipped > 0
+
+	@pytest.mark.skipif(
+		os.name != "posix", reason="patches pandoc in the parent, needs fork"
+	)
+	def test_processes_stop_at_limit(
+		self, tmp_path, fake_pandoc, make_site, monkeypatch
+	):
+		fake_pandoc()
+		# workers are forked, so only conversions in the parent are recorded
+		converted_here: list[str] = []
+		convert_single = pdj_sitegen.build.convert_single_markdown_file
+
+		def recording(path, **kwargs):
+			converted_here.append(path)
+			return convert_single(path=path, **kwargs)
+
+		monkeypatch.setattr(
+			pdj_sitegen.build, "convert_single_markdown_file", recording
+		)
+		bodies = {
+			**{f"bad{i}": "fail" for i in range(3)},
+			**{f"p{i:02}": "ok" for i in range(20)},
+		}
+		config, docs = discover(make_site(bodies))
+		with pytest.raises(ConversionError, match="stopped early") as exc_info:
+			convert(tmp_path, config, docs, max_errors=1, jobs=3, executor="process")
+		assert not isinstance(exc_info.value, MultipleExceptions)
+		assert exc_info.value.n_failed == 1
+		assert len(converted_here) == 1 and converted_here[0].startswith("bad")
+		# pages which had not started when the first page failed are cancelled
+		n_built = len(list((tmp_path / "output").glob("*.html")))
+		assert n_built <= 3 * PROCESS_TASKS_PER_WORKER
+		assert exc_info.value.n_skipped == len(docs) - 1 - n_built
+
+
+def test_error_report_notes_stopped_builds(tmp_path, capsys):
+	exc = ConversionError("error converting file 'x.md'", n_total=10, n_skipped=7)
+	handle_build_error(exc, tmp_path)
+	err = capsys.readouterr().err
+	assert "1/10 files failed to convert, 7 not converted (stopped early)" in err
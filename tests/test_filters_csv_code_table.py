@@ -1,6 +1,9 @@
 # pyright: reportMissingParameterType=false
 """Tests for pdj_sitegen.filters.csv_code_table"""
 
+import json
+import time
+
 import pytest
 
 from pdj_sitegen.filters.csv_code_table import (
@@ -9,9 +12,14 @@ from pdj_sitegen.filters.csv_code_table import (
 	body_factory,
 	codeblock_process,
 	emptyblock,
+	filter_json,
 	header_factory,
 	keyvals_process,
+	parse_csv_table,
+	row_json,
 	table_cell_factory,
+	table_html,
+	table_json,
 	table_row_factory,
 )
 
@@ -333,3 +341,176 @@ class TestCodeblockProcess:
 		# Body should have 0 rows
 		body = result["c"][4]
 		assert len(body[0][3]) == 0
+
+
+class TestTableJson:
+	"""Tests for the pre-serialized table builder used by the filter entry point."""
+
+	@pytest.mark.parametrize(
+		"keyvals, csv_content",
+		[
+			([], "Name,Age\nAlice,30\nBob,25"),
+			([("header", "0")], "1,2,3\n4,5,6"),
+			([("aligns", "LCR"), ("caption", " My Table ")], "A,B,C\n1,2,3"),
+			([], 'Name,Description\nAlice,"Hello, ""World"""\nBob,  padded  '),
+			([], "H1,H2,H3"),
+			([], "unicode,\u00e9\u00e8\nescapes,\\ \t </tag>"),
+		],
+	)
+	def test_matches_codeblock_process(self, keyvals, csv_content):
+		"""Test table_json produces the same AST as codeblock_process."""
+		value = [["", ["csv_table"], keyvals], csv_content]
+		table = parse_csv_table("CodeBlock", value)
+		assert table is not None
+		assert json.loads(table_json(table)) == codeblock_process(
+			"CodeBlock", value, "html", {}
+		)
+
+	def test_row_json_matches_factory(self):
+		"""Test row_json serializes the same row as table_row_factory."""
+		row = ["a", " b ", '"c"']
+		assert json.loads(row_json(row)) == table_row_factory(row)
+
+	def test_parse_non_csv_table_returns_none(self):
+		"""Test parse_csv_table ignores other elements."""
+		assert parse_csv_table("Para", []) is None
+		assert parse_csv_table("CodeBlock", [["", ["python"], []], "x = 1"]) is None
+
+	def test_filter_json_splices_tables(self):
+		"""Test filter_json replaces csv_table blocks and leaves the rest alone."""
+		block = {"t": "CodeBlock", "c": [["", ["csv_table"], []], "A,B\n1,2"]}
+		para = {"t": "Para", "c": [{"t": "Str", "c": "not a table"}]}
+		doc = {
+			"pandoc-api-version": [1, 23],
+			"meta": {},
+			"blocks": [block, para, block],
+		}
+		result = json.loads(filter_json(json.dumps(doc), "html"))
+
+		expected_table = codeblock_process("CodeBlock", block["c"], "html", {})
+		assert result["blocks"] == [expected_table, para, expected_table]
+		assert result["pandoc-api-version"] == [1, 23]
+
+	def test_filter_json_placeholder_text_in_document(self):
+		"""Test document text that looks like a placeholder is not replaced."""
+		fake = '{"t":"RawBlock","c":["pdj-csv-code-table","0"]}'
+		doc = {
+			"pandoc-api-version": [1, 23],
+			"meta": {},
+			"blocks": [
+				{"t": "CodeBlock", "c": [["", ["csv_table"], []], "A\n1"]},
+				{"t": "Para", "c": [{"t": "Str", "c": fake}]},
+			],
+		}
+		result = json.loads(filter_json(json.dumps(doc)))
+		assert result["blocks"][1]["c"][0]["c"] == fake
+
+	def test_benchmark_cells_per_second(self):
+		"""Compare cells/sec of the AST dict path and the pre-serialized path."""
+		n_rows, n_cols = 2_000, 10
+		csv_content = "\n".join(
+			",".join(f"r{r}c{c}" for c in range(n_cols)) for r in range(n_rows)
+		)
+		value = [["", ["csv_table"], []], csv_content]
+		n_cells = n_rows * n_cols
+
+		start = time.perf_counter()
+		before = json.dumps(codeblock_process("CodeBlock", value, "html", {}))
+		t_before = time.perf_counter() - start
+
+		start = time.perf_counter()
+		table = parse_csv_table("CodeBlock", value)
+		assert table is not None
+		after = table_json(table)
+		t_after = time.perf_counter() - start
+
+		assert json.loads(before) == json.loads(after)
+		print(
+			f"\ncsv_code_table: {n_cells / t_before:,.0f} cells/sec (AST) -> "
+			f"{n_cells / t_after:,.0f} cells/sec (pre-serialized)"
+		)
+
+
+class TestRenderHtml:
+	"""Tests for the `render=html` option."""
+
+	def _process(self, keyvals, csv_content):
+		value = [["", ["csv_table"], [("render", "html"), *keyvals]], csv_content]
+		result = codeblock_process("CodeBlock", value, "html", {})
+		assert result is not None
+		assert result["t"] == "RawBlock"
+		assert result["c"][0] == "html"
+		return result["c"][1]
+
+	def test_basic_table(self):
+		"""Test header row goes in thead and body rows alternate odd/even."""
+		result = self._process([], "Name,Age\nAlice,30\nBob,25")
+		assert result == (
+			"<table>\n"
+			"<thead>\n"
+			'<tr class="header">\n<th>Name</th>\n<th>Age</th>\n</tr>\n'
+			"</thead>\n"
+			"<tbody>\n"
+			'<tr class="odd">\n<td>Alice</td>\n<td>30</td>\n</tr>\n'
+			'<tr class="even">\n<td>Bob</td>\n<td>25</td>\n</tr>\n'
+			"</tbody>\n"
+			"</table>"
+		)
+
+	def test_no_header(self):
+		"""Test header=0 puts every row in the body."""
+		result = self._process([("header", "0")], "1,2\n3,4")
+		assert "<thead>" not in result
+		assert result.count("<tr") == 2
+
+	def test_aligns(self):
+		"""Test alignments become text-align styles, default has none."""
+		result = self._process([("aligns", "lcrd")], "A,B,C,D\n1,2,3,4")
+		assert '<th style="text-align: left;">A</th>' in result
+		assert '<td style="text-align: center;">2</td>' in result
+		assert '<td style="text-align: right;">3</td>' in result
+		assert "<td>4</td>" in result
+
+	def test_caption(self):
+		"""Test caption is escaped and stripped."""
+		result = self._process([("caption", " A & B ")], "A\n1")
+		assert result.startswith("<table>\n<caption>A &amp; B</caption>\n")
+
+	def test_escaping(self):
+		"""Test cell contents are HTML-escaped."""
+		result = self._process([], 'A\n"<script>alert(1)</script> & more"')
+		assert "<script>" not in result
+		assert "<td>&lt;script&gt;alert(1)&lt;/script&gt; &amp; more</td>" in result
+
+	def test_render_value_case_insensitive(self):
+		"""Test render=HTML is accepted."""
+		value = [["", ["csv_table"], [("render", "HTML")]], "A\n1"]
+		result = codeblock_process("CodeBlock", value, "html", {})
+		assert result is not None
+		assert result["t"] == "RawBlock"
+
+	def test_render_ast_is_default(self):
+		"""Test render=ast and no render option both produce a Table."""
+		for keyvals in ([], [("render", "ast")]):
+			value = [["", ["csv_table"], keyvals], "A\n1"]
+			result = codeblock_process("CodeBlock", value, "html", {})
+			assert result is not None
+			assert result["t"] == "Table"
+
+	def test_invalid_render_raises(self):
+		"""Test unknown render values raise ValueError."""
+		value = [["", ["csv_table"], [("render", "latex")]], "A\n1"]
+		with pytest.raises(ValueError, match="Invalid render value"):
+			codeblock_process("CodeBlock", value, "html", {})
+
+	def test_filter_json_emits_raw_block(self):
+		"""Test the filter entry point emits the same RawBlock."""
+		block = {
+			"t": "CodeBlock",
+			"c": [["", ["csv_table"], [["render", "html"]]], "A,B\n1,2"],
+		}
+		doc = {"pandoc-api-version": [1, 23], "meta": {}, "blocks": [block]}
+		result = json.loads(filter_json(json.dumps(doc), "html"))
+		table = parse_csv_table("CodeBlock", block["c"])
+		assert table is not None
+		assert result["blocks"] == [{"t": "RawBlock", "c": ["html", table_html(table)]}]
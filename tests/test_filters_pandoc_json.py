@@ -0,0 +1,120 @@
+# pyright: reportMissingParameterType=false
+import copy
+import json
+import subprocess
+import sys
+
+import pandocfilters  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+import pytest
+
+from pdj_sitegen.filters.pandoc_json import document_meta, dumps, walk
+
+
+def _str(text: str) -> dict:
+	return {"t": "Str", "c": text}
+
+
+DOC: dict = {
+	"pandoc-api-version": [1, 23, 1],
+	"meta": {"title": {"t": "MetaInlines", "c": [_str("Title")]}},
+	"blocks": [
+		{"t": "Para", "c": [_str("a"), {"t": "Space"}, _str("b")]},
+		{"t": "Para", "c": [{"t": "Emph", "c": [_str("drop"), _str("c")]}]},
+		{"t": "CodeBlock", "c": [["", ["x"], []], "code"]},
+		{"t": "HorizontalRule"},
+	],
+}
+
+
+def action(key, value, _format, _meta):
+	if key == "Str" and value == "a":
+		# replacements are walked, but not passed to the action again
+		return _str("b")
+	if key == "Str" and value == "b":
+		return [_str("B1"), _str("B2")]
+	if key == "Str" and value == "drop":
+		return []
+	if key == "HorizontalRule":
+		return {"t": "Para", "c": [_str("rule")]}
+	return None
+
+
+class TestWalk:
+	"""`walk` matches `pandocfilters.walk`, without copying the document."""
+
+	def test_same_as_pandocfilters(self):
+		expected = pandocfilters.walk(copy.deepcopy(DOC), action, "html", {})
+		assert walk(copy.deepcopy(DOC), action, "html", {}) == expected
+
+	def test_in_place(self):
+		doc = copy.deepcopy(DOC)
+		blocks = doc["blocks"]
+		assert walk(doc, action, "html", {}) is doc
+		assert doc["blocks"] is blocks
+		assert doc["blocks"][0]["c"] == [
+			_str("b"),
+			{"t": "Space"},
+			_str("B1"),
+			_str("B2"),
+		]
+
+	def test_unchanged(self):
+		doc = copy.deepcopy(DOC)
+		assert walk(doc, lambda *args: None, "html", {}) == DOC
+
+	def test_action_arguments(self):
+		seen: list = []
+
+		def record(key, value, format_, meta):
+			seen.append((key, format_, meta))
+
+		walk(copy.deepcopy(DOC), record, "latex", {"m": 1})
+		# elements in lists are visited, including those of the metadata
+		assert [key for key, _, _ in seen[:2]] == ["Str", "Para"]
+		assert ("Para", "latex", {"m": 1}) in seen
+		assert {(f, m["m"]) for _, f, m in seen} == {("latex", 1)}
+
+
+def test_document_meta():
+	assert document_meta(DOC) == DOC["meta"]
+	assert document_meta({"blocks": []}) == {}
+	# before pandoc 1.18, documents were a list of meta and blocks
+	assert document_meta([{"unMeta": {"a": 1}}, []]) == {"a": 1}
+
+
+def test_dumps_compact():
+	assert dumps({"t": "Str", "c": "é"}) == '{"t":"Str","c":"\\u00e9"}'
+
+
+@pytest.mark.parametrize(
+	("module", "block", "expected_type"),
+	[
+		(
+			"links_md2html",
+			{
+				"t": "Para",
+				"c": [{"t": "Link", "c": [["", [], []], [_str("x")], ["a/b.md", ""]]}],
+			},
+			"Para",
+		),
+		(
+			"csv_code_table",
+			{"t": "CodeBlock", "c": [["", ["csv_table"], []], "h1,h2\n1,2"]},
+			"Table",
+		),
+	],
+)
+def test_filter_executable(module, block, expected_type):
+	"""filters read pandoc JSON from stdin and write it to stdout, as pandoc runs them"""
+	doc = {"pandoc-api-version": [1, 23, 1], "meta": {}, "blocks": [block]}
+	proc = subprocess.run(
+		[sys.executable, "-m", f"pdj_sitegen.filters.{module}", "html"],
+		input=json.dumps(doc).encode("utf-8"),
+		capture_output=True,
+		check=True,
+	)
+	output = json.loads(proc.stdout)
+	assert output["pandoc-api-version"] == [1, 23, 1]
+	assert output["blocks"][0]["t"] == expected_type
+	if module == "links_md2html":
+		assert output["blocks"][0]["c"][0]["c"][2] == ["a/b.html", ""]
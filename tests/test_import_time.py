@@ -0,0 +1,93 @@
+import subprocess
+import sys
+
+import pytest
+
+# modules which must only be imported when they are used, see the lazy imports
+# at the top of `pdj_sitegen.build`
+DEFERRED_MODULES: tuple[str, ...] = (
+	"argparse",
+	"asyncio",
+	"bs4",
+	"concurrent.futures.process",
+	"importlib.resources",
+	"jinja2",
+	"muutils.json_serialize",
+	"muutils.spinner",
+	"pypandoc",
+	"tarfile",
+	"tqdm",
+	"zipfile",
+)
+
+
+def imported_modules(statement: str) -> set[str]:
+	"""modules imported by `statement` in a fresh interpreter, from `python -X importtime`"""
+	proc = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", statement],
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+	return {
+		line.rpartition("|")[2].strip()
+		for line in proc.stderr.splitlines()
+		if line.startswith("import time:") and "cumulative" not in line
+	}
+
+
+class TestImportTime:
+	"""Regression tests for the modules imported at startup."""
+
+	@pytest.mark.parametrize(
+		"statement",
+		[
+			"import pdj_sitegen.build",
+			"import pdj_sitegen.config",
+			"import pdj_sitegen.__main__",
+		],
+	)
+	def test_heavy_modules_deferred(self, statement):
+		modules = imported_modules(statement)
+		assert "pdj_sitegen.build" in modules or "pdj_sitegen.config" in modules
+		assert [m for m in DEFERRED_MODULES if m in modules] == []
+
+	@pytest.mark.parametrize("filter_name", ["links_md2html", "csv_code_table"])
+	def test_filters_import_stdlib_only(self, filter_name):
+		"""pandoc starts the filters once per page, see `pdj_sitegen.filters.pandoc_json`"""
+		modules = imported_modules(
+			f"from pdj_sitegen.filters.{filter_name} import main"
+		)
+		assert "pandocfilters" not in modules
+		assert [
+			m
+			for m in modules
+			if m.startswith("pdj_sitegen.") and not m.startswith("pdj_sitegen.filters")
+		] == []
+		if filter_name == "links_md2html":
+			assert "typing" not in modules
+
+	@pytest.mark.parametrize("args", [["--help"], ["merge", "--help"]])
+	def test_cli_help(self, args):
+		"""the CLI needs argparse, but nothing else deferred, to print its help"""
+		modules = imported_modules(
+			f"import sys; sys.argv = ['pdj_sitegen', *{args!r}]\n"
+			"from pdj_sitegen.build import main\n"
+			"try:\n\tmain()\nexcept SystemExit:\n\tpass"
+		)
+		assert [m for m in DEFERRED_MODULES if m in modules] == ["argparse"]
+
+	def test_default_config_text(self):
+		from pdj_sitegen.config import default_config_text
+
+		assert "content_dir" in default_config_text("yaml")
+		assert "content_dir" in default_config_text("toml")
+
+	def test_default_config_constants(self):
+		from pdj_sitegen import config
+		from pdj_sitegen.config import DEFAULT_CONFIG_TOML, DEFAULT_CONFIG_YAML
+
+		assert DEFAULT_CONFIG_YAML == config.default_config_text("yaml")
+		assert DEFAULT_CONFIG_TOML == config.default_config_text("toml")
+		with pytest.raises(AttributeError):
+			config.DEFAULT_CONFIG_JSON  # noqa: B018
@@ -0,0 +1,198 @@
+# pyright: reportMissingParameterType=false
+import json
+import os
+import tarfile
+import zipfile
+
+import muutils.json_serialize
+import pytest
+
+from pdj_sitegen.build import dump_intermediate, pipeline
+from pdj_sitegen.intermediates import (
+	INTERMEDIATE_STAGES,
+	IntermediatesWriter,
+	active_writer,
+	archive_path,
+	check_stages,
+	selected_stages,
+	start_writer,
+	stop_writer,
+)
+
+
+class TestIntermediatesWriter:
+	"""Tests for the background intermediates writer."""
+
+	def test_writes_files(self, tmp_path):
+		with IntermediatesWriter(tmp_path / "im", queue_size=2) as writer:
+			for i in range(10):
+				writer.write(f"md/dir/p{i}.md", f"page {i}")
+			writer.write("json/p.json", lambda: json.dumps({"a": 1}))
+		assert writer.n_written == 11
+		assert (tmp_path / "im" / "md" / "dir" / "p9.md").read_text() == "page 9"
+		assert (tmp_path / "im" / "json" / "p.json").read_text() == '{"a": 1}'
+
+	@pytest.mark.parametrize("archive", ["tar", "zip"])
+	def test_archive(self, tmp_path, archive):
+		with IntermediatesWriter(tmp_path / "im", archive=archive) as writer:
+			writer.write("md/a.md", "a")
+			writer.write("html/sub/b.html", lambda: "<p>b</p>")
+		path = archive_path(tmp_path / "im", archive)
+		assert path == tmp_path / f"im.{archive}"
+		assert not (tmp_path / "im").exists()
+		if archive == "tar":
+			with tarfile.open(path) as tar:
+				assert tar.getnames() == ["md/a.md", "html/sub/b.html"]
+				assert tar.extractfile("html/sub/b.html").read() == b"<p>b</p>"
+		else:
+			with zipfile.ZipFile(path) as zf:
+				assert zf.namelist() == ["md/a.md", "html/sub/b.html"]
+				assert zf.read("md/a.md") == b"a"
+
+	def test_invalid_archive(self, tmp_path):
+		with pytest.raises(ValueError, match="archive format"):
+			IntermediatesWriter(tmp_path, archive="rar")
+
+	def test_error_raised_on_close(self, tmp_path):
+		def fail() -> str:
+			raise RuntimeError("serialization failed")
+
+		writer = IntermediatesWriter(tmp_path)
+		writer.write("json/a.json", fail)
+		writer.write("md/b.md", "not written after an error")
+		with pytest.raises(RuntimeError, match="serialization failed"):
+			writer.close()
+		assert not (tmp_path / "md" / "b.md").exists()
+
+
+class TestSelectedStages:
+	"""Tests for selecting pages and stages to capture."""
+
+	def test_defaults_select_everything(self):
+		assert selected_stages("blog/post", [], []) == frozenset(INTERMEDIATE_STAGES)
+
+	def test_include_globs(self):
+		assert selected_stages("blog/post", ["blog/*"], []) == frozenset(
+			INTERMEDIATE_STAGES
+		)
+		assert selected_stages("about", ["blog/*", "index"], []) == frozenset()
+
+	def test_stages(self):
+		assert selected_stages("index", [], ["md", "final"]) == {"md", "final"}
+		assert selected_stages("index", ["other"], ["md"]) == frozenset()
+
+	def test_check_stages(self):
+		check_stages(["frontmatter", "html"])
+		with pytest.raises(ValueError, match="pandoc"):
+			check_stages(["md", "pandoc"])
+
+
+def test_dump_intermediate_uses_active_writer(tmp_path):
+	called: list[str] = []
+
+	def content() -> str:
+		called.append("x")
+		return "lazy"
+
+	dump_intermediate(content, intermediates_dir=None, fmt="json", path="a")
+	assert called == []
+
+	writer = start_writer(tmp_path / "im", archive="zip")
+	try:
+		assert active_writer() is writer
+		dump_intermediate(
+			content, intermediates_dir=tmp_path / "im", fmt="json", path="a"
+		)
+		# a different directory is written directly
+		dump_intermediate(
+			"direct", intermediates_dir=tmp_path / "other", fmt="md", path="b"
+		)
+		assert (tmp_path / "other" / "md" / "b.md").read_text() == "direct"
+	finally:
+		stop_writer()
+	assert active_writer() is None
+	assert called == ["x"]
+	with zipfile.ZipFile(tmp_path / "im.zip") as zf:
+		assert zf.read("json/a.json") == b"lazy"
+
+
+def _make_site(make_site, config: str) -> None:
+	make_site(
+		{"index": "body {{ title }}", "blog/post": "body {{ title }}"},
+		config="cache_dir: null\nintermediates_dir: _im\n" + config,
+	)
+
+
+@pytest.mark.parametrize("archive", [None, "tar"])
+@pytest.mark.parametrize(
+	"executor",
+	[
+		None,
+		pytest.param(
+			"process",
+			marks=pytest.mark.skipif(
+				os.name != "posix", reason="patches pandoc in the parent, needs fork"
+			),
+		),
+	],
+)
+def test_pipeline_intermediates(tmp_path, fake_pandoc, make_site, archive, executor):
+	fake_pandoc()
+	_make_site(
+		make_site,
+		f"intermediates_archive: {archive}\n" if archive else "",
+	)
+
+	if executor is None:
+		pipeline(tmp_path / "config.yml", verbose=False)
+	else:
+		# workers send their files to the parent's writer
+		pipeline(tmp_path / "config.yml", verbose=False, jobs=2, executor=executor)
+	assert active_writer() is None
+	expected = {
+		"md/blog/post.md": "body blog/post",
+		"html/blog/post.html": "<p>body blog/post</p>",
+		"json/index.json": '{"title": "index"}',
+		"txt/index.txt": "{'title': 'index'}",
+		"final/index.html": "<p>body index</p>",
+	}
+	if archive is None:
+		for rel_path, content in expected.items():
+			assert (tmp_path / "_im" / rel_path).read_text() == content
+	else:
+		assert not (tmp_path / "_im").exists()
+		with tarfile.open(tmp_path / "_im.tar") as tar:
+			assert len(tar.getnames()) == 10
+			for rel_path, content in expected.items():
+				assert tar.extractfile(rel_path).read().decode() == content
+
+
+def test_pipeline_selected_intermediates(tmp_path, monkeypatch, fake_pandoc, make_site):
+	fake_pandoc()
+	_make_site(
+		make_site,
+		"intermediates_include: ['blog/*']\nintermediates_stages: [md, final]\n",
+	)
+	serialized: list[object] = []
+	real_json_serialize = muutils.json_serialize.json_serialize
+
+	def json_serialize(obj):
+		serialized.append(obj)
+		return real_json_serialize(obj)
+
+	monkeypatch.setattr(muutils.json_serialize, "json_serialize", json_serialize)
+
+	pipeline(tmp_path / "config.yml", verbose=False)
+	written = sorted(
+		p.relative_to(tmp_path / "_im").as_posix()
+		for p in (tmp_path / "_im").rglob("*")
+		if p.is_file()
+	)
+	assert written == ["final/blog/post.html", "md/blog/post.md"]
+	assert serialized == []
+
+
+def test_pipeline_unknown_stage(tmp_path, make_site):
+	_make_site(make_site, "intermediates_stages: [pandoc]\n")
+	with pytest.raises(ValueError, match="unknown intermediates stages"):
+		pipeline(tmp_path / "config.yml", verbose=False)
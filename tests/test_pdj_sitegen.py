@@ -1,6 +1,7 @@
 # pyright: reportMissingParameterType=false
 from pathlib import Path
 
+import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
 import pytest
 from jinja2 import Environment
 
@@ -219,6 +220,323 @@ class TestBuildDocumentTree:
 		assert result["c"]["frontmatter"]["title"] == "C"
 
 
+class TestBuildDocumentTreeParallel:
+	"""Tests for build_document_tree with a worker pool."""
+
+	def _make_site(self, root):
+		for i in range(20):
+			subdir = root / f"section_{i % 3}"
+			subdir.mkdir(exist_ok=True)
+			(subdir / f"page_{i}.md").write_text(
+				f"---\ntitle: Page {{{{ config.name }}}} {i}\nidx: {i}\n---\nBody {i}"
+			)
+
+	def test_matches_serial(self, tmp_path):
+		"""Test parallel discovery gives the same docs, in the same order."""
+		from pdj_sitegen.build import build_document_tree
+
+		self._make_site(tmp_path)
+		kwargs = {
+			"content_dir": tmp_path,
+			"frontmatter_context": {"config": {"name": "Site"}},
+			"jinja_env": Environment(trim_blocks=True),
+			"verbose": False,
+		}
+		serial = build_document_tree(**kwargs, jobs=1)
+		parallel = build_document_tree(**kwargs, jobs=3)
+
+		assert list(parallel) == list(serial)
+		for key, doc in serial.items():
+			assert parallel[key]["frontmatter"] == doc["frontmatter"]
+			assert parallel[key]["file_meta"] == doc["file_meta"]
+			assert parallel[key]["body"] == doc["body"]
+		assert serial["section_1/page_4"]["frontmatter"]["title"] == "Page Site 4"
+
+	def test_missing_frontmatter_aggregated(self, tmp_path):
+		"""Test files without frontmatter are collected into MultipleExceptions."""
+		from pdj_sitegen.build import build_document_tree
+		from pdj_sitegen.exceptions import MultipleExceptions, SplitMarkdownError
+
+		self._make_site(tmp_path)
+		bad_files = [tmp_path / "bad_a.md", tmp_path / "section_0" / "bad_b.md"]
+		for bad in bad_files:
+			bad.write_text("no frontmatter")
+
+		with pytest.raises(MultipleExceptions) as exc_info:
+			build_document_tree(
+				content_dir=tmp_path,
+				frontmatter_context={"config": {"name": "Site"}},
+				jinja_env=Environment(),
+				verbose=False,
+				jobs=2,
+			)
+		assert exc_info.value.n_total == 22
+		assert sorted(exc_info.value.exceptions) == sorted(
+			f.as_posix() for f in bad_files
+		)
+		for path, exc in exc_info.value.exceptions.items():
+			assert isinstance(exc, SplitMarkdownError)
+			assert exc.file_path == path
+
+	def test_render_error_keeps_cause(self, tmp_path):
+		"""Test errors from workers are re-raised with their original cause."""
+		from pdj_sitegen.build import build_document_tree
+		from pdj_sitegen.exceptions import RenderError
+
+		self._make_site(tmp_path)
+		(tmp_path / "broken.md").write_text("---\ntitle: {{ unclosed\n---\nBody")
+
+		with pytest.raises(RenderError) as exc_info:
+			build_document_tree(
+				content_dir=tmp_path,
+				frontmatter_context={"config": {"name": "Site"}},
+				jinja_env=Environment(),
+				verbose=False,
+				jobs=2,
+			)
+		assert exc_info.value.kind == "create_template"
+		assert exc_info.value.__cause__ is not None
+
+
+# Tests for find_frontmatter
+class TestFindFrontmatter:
+	"""Tests for the line-scanning frontmatter splitter."""
+
+	# lines which exercise delimiters in and around the frontmatter
+	LINE_POOL: tuple[str, ...] = (
+		"---",
+		";;;",
+		"+++",
+		"",
+		"title: x",
+		"a: ---",
+		"----",
+		" ---",
+		"--- ",
+		"---x",
+		"body text",
+	)
+
+	def test_agrees_with_regex(self):
+		"""Property test: on LF input, find_frontmatter accepts and splits exactly like FRONTMATTER_REGEX."""
+		import random
+
+		from pdj_sitegen.build import find_frontmatter
+		from pdj_sitegen.consts import FRONTMATTER_DELIMS, FRONTMATTER_REGEX
+		from pdj_sitegen.exceptions import SplitMarkdownError
+
+		rng = random.Random(42)
+		n_matched = 0
+		for _ in range(5000):
+			lines = [rng.choice(self.LINE_POOL) for _ in range(rng.randint(0, 8))]
+			if rng.random() < 0.7:
+				lines.insert(0, rng.choice(list(FRONTMATTER_DELIMS)))
+			content = "\n".join(lines) + rng.choice(["", "\n"])
+
+			match = FRONTMATTER_REGEX.match(content)
+			if match is None:
+				with pytest.raises(SplitMarkdownError):
+					find_frontmatter(content)
+				continue
+
+			n_matched += 1
+			fmt, fm_start, fm_end, body_start = find_frontmatter(content)
+			assert fmt == FRONTMATTER_DELIMS[match.group("delimiter")]
+			assert (fm_start, fm_end) == match.span("frontmatter")
+			assert body_start == match.start("body")
+		# make sure the generator covers both cases
+		assert 500 < n_matched < 4500
+
+	def test_returns_offsets(self):
+		"""Test offsets index into the original content."""
+		from pdj_sitegen.build import find_frontmatter
+
+		content = "---\ntitle: Test\n---\nBody"
+		fmt, fm_start, fm_end, body_start = find_frontmatter(content)
+		assert fmt == "yaml"
+		assert content[fm_start:fm_end] == "title: Test"
+		assert content[body_start:] == "Body"
+
+	@pytest.mark.parametrize(
+		"content",
+		[
+			"---\r\ntitle: Test\r\nb: 2\r\n---\r\nBody\r\n",
+			"\ufeff---\ntitle: Test\nb: 2\n---\nBody\r\n",
+			"\ufeff+++\r\ntitle: Test\r\nb: 2\r\n+++\r\nBody\r\n",
+		],
+	)
+	def test_crlf_and_bom(self, content):
+		"""Test CRLF line endings and a leading BOM are accepted."""
+		from pdj_sitegen.build import split_md
+
+		frontmatter, body, _ = split_md(content)
+		assert frontmatter.replace("\r\n", "\n") == "title: Test\nb: 2"
+		assert body == "Body\r\n"
+
+	def test_crlf_empty_frontmatter(self):
+		"""Test empty frontmatter with CRLF line endings."""
+		from pdj_sitegen.build import split_md
+
+		assert split_md("---\r\n\r\n---\r\nBody") == ("", "Body", "yaml")
+
+	def test_benchmark_large_file(self):
+		"""Compare the regex and the line scanner on a large document."""
+		import time
+
+		from pdj_sitegen.build import find_frontmatter
+		from pdj_sitegen.consts import FRONTMATTER_REGEX
+
+		frontmatter = "\n".join(f"key_{i}: value {i}" for i in range(2_000))
+		body = "\n".join(
+			f"line {i} of the body, --- not a delimiter" for i in range(200_000)
+		)
+		content = f"---\n{frontmatter}\n---\n{body}"
+		n_runs = 5
+
+		start = time.perf_counter()
+		for _ in range(n_runs):
+			match = FRONTMATTER_REGEX.match(content)
+			assert match is not None
+			regex_parts = (match.group("frontmatter"), match.group("body"))
+		t_regex = (time.perf_counter() - start) / n_runs
+
+		start = time.perf_counter()
+		for _ in range(n_runs):
+			_, fm_start, fm_end, body_start = find_frontmatter(content)
+		t_scan = (time.perf_counter() - start) / n_runs
+
+		assert regex_parts == (content[fm_start:fm_end], content[body_start:])
+		print(
+			f"\nsplit {len(content) / 1e6:.1f} MB: regex {t_regex * 1e3:.2f} ms, "
+			f"find_frontmatter {t_scan * 1e3:.3f} ms"
+		)
+
+
+# Tests for read_frontmatter and BodyRef
+class TestReadFrontmatter:
+	"""Tests for the streaming frontmatter reader and lazy body handles."""
+
+	@pytest.mark.parametrize(
+		"content",
+		[
+			"---\ntitle: Test\n---\nBody content",
+			';;;\n{"title": "JSON"}\n;;;\nBody',
+			'+++\ntitle = "TOML"\n+++\nBody\n',
+			"---\ntitle: Test\n---\n",
+			"---\n\n---\nempty frontmatter",
+			"---\n---\n---\nfirst line is frontmatter",
+			"---\na: 1\n---\nBody with ---\n---\nMore content",
+			"---\na: 1\nb:\n  c: 2\n---\n\n# Heading\n\ntext \u00e9\n",
+		],
+	)
+	def test_matches_split_md(self, tmp_path, content):
+		"""Test read_frontmatter and BodyRef agree with split_md."""
+		from pdj_sitegen.build import BodyRef, read_frontmatter, split_md
+
+		md_file = tmp_path / "test.md"
+		md_file.write_bytes(content.encode("utf-8"))
+
+		frontmatter, body, fmt = split_md(content)
+		fm_streamed, fmt_streamed, offset = read_frontmatter(md_file)
+		assert fm_streamed == frontmatter
+		assert fmt_streamed == fmt
+		assert BodyRef(md_file.as_posix(), offset).read() == body
+
+	def test_crlf(self, tmp_path):
+		"""Test CRLF files are read the same as in text mode."""
+		from pdj_sitegen.build import BodyRef, read_frontmatter
+
+		md_file = tmp_path / "test.md"
+		md_file.write_bytes(b"---\r\ntitle: Test\r\nx: 1\r\n---\r\nBody\r\nmore")
+
+		frontmatter, fmt, offset = read_frontmatter(md_file)
+		assert frontmatter == "title: Test\nx: 1"
+		assert fmt == "yaml"
+		assert BodyRef(md_file.as_posix(), offset).read() == "Body\nmore"
+
+	@pytest.mark.parametrize(
+		"content",
+		[
+			"No frontmatter here",
+			"---",
+			"---\nMissing closing delimiter\nBody content",
+			"---\ntitle: Test\n---",
+			"---\ntitle: Test\n+++\nBody",
+		],
+	)
+	def test_no_frontmatter_raises(self, tmp_path, content):
+		"""Test SplitMarkdownError with the file path for invalid files."""
+		from pdj_sitegen.build import read_frontmatter
+		from pdj_sitegen.exceptions import SplitMarkdownError
+
+		md_file = tmp_path / "test.md"
+		md_file.write_text(content)
+		with pytest.raises(SplitMarkdownError) as exc_info:
+			read_frontmatter(md_file)
+		assert exc_info.value.file_path == md_file.as_posix()
+
+	def test_stops_at_closing_delimiter(self, tmp_path):
+		"""Test the body is not read, even if it is not valid utf-8."""
+		from pdj_sitegen.build import read_frontmatter
+
+		md_file = tmp_path / "test.md"
+		md_file.write_bytes(b"---\ntitle: Test\n---\n\xff\xfe invalid")
+
+		frontmatter, _, offset = read_frontmatter(md_file)
+		assert frontmatter == "title: Test"
+		assert offset == len(b"---\ntitle: Test\n---\n")
+
+	def test_document_tree_body_is_lazy(self, tmp_path):
+		"""Test build_document_tree stores a BodyRef which reads the current file."""
+		from pdj_sitegen.build import BodyRef, build_document_tree
+
+		md_file = tmp_path / "test.md"
+		md_file.write_text("---\ntitle: Test\n---\nBody content")
+
+		result = build_document_tree(
+			content_dir=tmp_path,
+			frontmatter_context={},
+			jinja_env=Environment(),
+			verbose=False,
+		)
+		body = result["test"]["body"]
+		assert isinstance(body, BodyRef)
+		assert body.path == md_file.as_posix()
+
+		md_file.write_text("---\ntitle: Test\n---\nEdited body")
+		assert body.read() == "Edited body"
+		# templates get the text when rendering the body
+		assert Environment().from_string("{{ b }}").render(b=body) == "Edited body"
+
+	def test_body_ref_compares_as_text(self, tmp_path):
+		"""Test a BodyRef is equal to, and hashes like, its text."""
+		from pdj_sitegen.build import BodyRef
+
+		md_file = tmp_path / "test.md"
+		md_file.write_text("---\ntitle: Test\n---\nBody")
+		body = BodyRef(md_file.as_posix(), len("---\ntitle: Test\n---\n"))
+		assert body == "Body" and "Body" == body
+		assert body != "Other"
+		assert body == BodyRef(md_file.as_posix(), body.offset)
+		assert hash(body) == hash("Body")
+		assert {"Body": 1}[body] == 1
+
+	def test_body_ref_cached_while_rendering(self, tmp_path):
+		"""Test cached_bodies reads each body once."""
+		from pdj_sitegen.document import BodyRef, cached_bodies
+
+		md_file = tmp_path / "test.md"
+		md_file.write_text("Body")
+		body = BodyRef(md_file.as_posix(), 0)
+		with cached_bodies():
+			assert len(body) == 4
+			md_file.write_text("Edited")
+			assert body[:2] == "Bo"
+			with cached_bodies():
+				assert body == "Body"
+		assert body == "Edited"
+
+
 # Tests for dump_intermediate function
 class TestDumpIntermediate:
 	"""Tests for the dump_intermediate function."""
@@ -596,6 +914,44 @@ This is a test."""
 	assert "<p>This is a test.</p>" in content
 
 
+def test_pipeline_low_memory(tmp_path, monkeypatch, capsys):
+	from pdj_sitegen.build import docs_without_bodies, pipeline
+
+	monkeypatch.setattr(
+		pypandoc,
+		"convert_text",
+		lambda source, to, format, extra_args: f"<main>{source}</main>",
+	)
+	(tmp_path / "content").mkdir()
+	(tmp_path / "templates").mkdir()
+	(tmp_path / "config.yml").write_text("cache_dir: null\n")
+	(tmp_path / "templates" / "default.html.jinja2").write_text("{{ __content__ }}")
+	(tmp_path / "content" / "a.md").write_text("---\ntitle: A\n---\nbody of a")
+	(tmp_path / "content" / "index.md").write_text(
+		"---\ntitle: Home\n---\n"
+		"{% for k, d in docs.items() %}{{ k }}:{{ d.frontmatter.title }}:"
+		"{{ 'body' in d }};{% endfor %}"
+	)
+
+	pipeline(tmp_path / "config.yml", verbose=False, low_memory=True)
+	output = tmp_path / "output"
+	assert (output / "a.html").read_text() == "<main>body of a</main>"
+	assert "a:A:False;" in (output / "index.html").read_text()
+	# only reported in verbose mode
+	assert "Peak memory:" not in capsys.readouterr().out
+	pipeline(tmp_path / "config.yml", verbose=True, low_memory=True)
+	assert "Peak memory:" in capsys.readouterr().out
+
+	# without low-memory mode, templates still see the bodies
+	pipeline(tmp_path / "config.yml", verbose=False)
+	assert "a:A:True;" in (output / "index.html").read_text()
+
+	docs = {"a": {"frontmatter": {"x": 1}, "body": "b", "file_meta": {}}}
+	stripped = docs_without_bodies(docs)
+	assert stripped == {"a": {"frontmatter": {"x": 1}, "file_meta": {}}}
+	assert stripped["a"]["frontmatter"] is docs["a"]["frontmatter"]
+
+
 # Test for main function
 def test_main(monkeypatch):
 	from pdj_sitegen.build import main
@@ -0,0 +1,202 @@
+# pyright: reportMissingParameterType=false
+import json
+import os
+
+import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+import pytest
+from jinja2 import Environment, FileSystemLoader
+
+import pdj_sitegen.profiling
+from pdj_sitegen.build import (
+	COPY_BATCH_SIZE,
+	build_document_tree,
+	convert_markdown_files,
+	copy_content_files,
+)
+from pdj_sitegen.profiling import (
+	PROFILE_FNAME,
+	SUMMARY_FNAME,
+	TRACE_FNAME,
+	Profiler,
+	format_summary,
+	span,
+	start_profiling,
+	stop_profiling,
+	trace_events,
+	write_report,
+)
+
+
+@pytest.fixture
+def profiler():
+	profiler = start_profiling()
+	yield profiler
+	stop_profiling()
+
+
+class TestSpan:
+	"""Tests for span recording and aggregation."""
+
+	def test_noop_when_inactive(self):
+		assert pdj_sitegen.profiling._active is None
+		with span("config"):
+			pass
+		assert stop_profiling() is None
+
+	def test_report_aggregates(self):
+		profiler = Profiler()
+		with profiler.span("discovery"):
+			pass
+		for page in ["a", "b", "a"]:
+			with profiler.span("template_render", page=page, template="t.jinja2"):
+				pass
+		with profiler.span("pandoc", page="b"):
+			sum(range(10000))
+
+		report = profiler.report()
+		assert report["stages"]["template_render"]["count"] == 3
+		assert report["stages"]["discovery"]["count"] == 1
+		assert set(report["pages"]) == {"a", "b"}
+		assert next(iter(report["pages"])) == "b"
+		assert set(report["pages"]["b"]["stages"]) == {"template_render", "pandoc"}
+		assert report["templates"]["t.jinja2"]["count"] == 3
+		assert len(report["spans"]) == 5
+		assert report["stages"]["pandoc"]["cpu"] >= 0
+
+		summary = format_summary(report)
+		assert "slowest 10 pages" in summary
+		if report["peak_rss_mb"] is not None:
+			assert report["peak_rss_mb"] > 0
+			assert "peak memory:" in summary
+		assert "t.jinja2" in summary
+
+	def test_span_recorded_on_error(self):
+		profiler = Profiler()
+		with pytest.raises(ValueError), profiler.span("write", page="a"):
+			raise ValueError("boom")
+		assert [s.name for s in profiler.spans] == ["write"]
+
+
+def test_write_report(tmp_path):
+	profiler = Profiler()
+	with profiler.span("copy"):
+		pass
+	dump_dir = write_report(profiler, tmp_path)
+	assert dump_dir.parent == tmp_path / ".pdj-sitegen"
+	report = json.loads((dump_dir / PROFILE_FNAME).read_text())
+	assert report["stages"]["copy"]["count"] == 1
+	assert "copy" in (dump_dir / SUMMARY_FNAME).read_text()
+	assert not (dump_dir / TRACE_FNAME).exists()
+
+
+def test_write_trace_only(tmp_path):
+	profiler = Profiler()
+	with profiler.span("copy"):
+		pass
+	dump_dir = write_report(profiler, tmp_path, profile=False, trace=True)
+	trace = json.loads((dump_dir / TRACE_FNAME).read_text())
+	assert [e["name"] for e in trace["traceEvents"]] == ["copy", "process_name"]
+	assert not (dump_dir / PROFILE_FNAME).exists()
+
+
+class TestTraceEvents:
+	"""Tests for the Chrome trace-event export."""
+
+	def test_events(self):
+		profiler = Profiler()
+		with profiler.span("convert"), profiler.span("pandoc", page="a", extra=1):
+			pass
+		trace = trace_events(profiler)
+		events = {e["name"]: e for e in trace["traceEvents"]}
+		pandoc, convert = events["pandoc"], events["convert"]
+		assert pandoc["ph"] == convert["ph"] == "X"
+		assert pandoc["cat"] == "page"
+		assert pandoc["args"]["page"] == "a"
+		assert pandoc["args"]["extra"] == 1
+		assert "cpu_ms" in pandoc["args"]
+		# nesting is expressed by time ranges on the same thread
+		assert convert["ts"] <= pandoc["ts"]
+		assert pandoc["ts"] + pandoc["dur"] <= convert["ts"] + convert["dur"]
+		assert pandoc["tid"] == convert["tid"]
+		assert events["process_name"]["args"]["name"] == "pdj-sitegen"
+
+	def test_worker_spans(self, tmp_path, profiler):
+		"""Test frontmatter spans from discovery workers reach the parent."""
+		for i in range(8):
+			(tmp_path / f"p{i}.md").write_text(f"---\ntitle: {i}\n---\nbody")
+		build_document_tree(
+			content_dir=tmp_path,
+			frontmatter_context={},
+			jinja_env=Environment(),
+			verbose=False,
+			jobs=2,
+		)
+		spans = [s for s in profiler.spans if s.name == "frontmatter_render"]
+		assert sorted(s.page for s in spans) == [f"p{i}" for i in range(8)]
+		assert all(s.pid != os.getpid() for s in spans)
+		assert all(s.start >= 0 for s in spans)
+		names = {
+			e["args"]["name"]
+			for e in trace_events(profiler)["traceEvents"]
+			if e["ph"] == "M"
+		}
+		assert any(name.startswith("worker ") for name in names)
+
+	def test_copy_batches(self, tmp_path, profiler):
+		content_dir = tmp_path / "content"
+		content_dir.mkdir()
+		n_files: int = COPY_BATCH_SIZE + 3
+		for i in range(n_files):
+			(content_dir / f"f{i}.txt").write_text(str(i))
+		copy_content_files(
+			content_dir, tmp_path / "output", include=[], exclude=[], verbose=False
+		)
+		batches = [s for s in profiler.spans if s.name == "copy_batch"]
+		assert [s.args["n_files"] for s in batches] == [COPY_BATCH_SIZE, 3]
+
+
+def test_pipeline_stages_recorded(
+	temp_site_structure, basic_config, default_template, profiler, monkeypatch
+):
+	"""Test per-page stages are recorded while converting."""
+	monkeypatch.setattr(
+		pypandoc,
+		"convert_text",
+		lambda source, to, format, extra_args: f"<p>{source}</p>",
+	)
+	content_dir = temp_site_structure["content_dir"]
+	for name in ["a", "b"]:
+		(content_dir / f"{name}.md").write_text(f"---\ntitle: {name}\n---\nbody {name}")
+	jinja_env = Environment(
+		loader=FileSystemLoader(temp_site_structure["templates_dir"])
+	)
+	docs = build_document_tree(
+		content_dir=content_dir,
+		frontmatter_context={},
+		jinja_env=jinja_env,
+		verbose=False,
+	)
+	convert_markdown_files(
+		docs=docs,
+		jinja_env=jinja_env,
+		config=basic_config,
+		output_root=temp_site_structure["root"],
+		smart_rebuild=False,
+		rebuild_time=0,
+		verbose=False,
+	)
+
+	report = profiler.report()
+	for stage in [
+		"frontmatter_render",
+		"context",
+		"body_render",
+		"pandoc",
+		"template_render",
+		"write",
+	]:
+		assert report["stages"][stage]["count"] == 2, stage
+	assert "prettify" not in report["stages"]
+	assert report["stages"]["page"]["count"] == 2
+	assert set(report["pages"]) == {"a", "b"}
+	assert report["templates"]["default.html.jinja2"]["count"] == 2
@@ -0,0 +1,111 @@
+# pyright: reportMissingParameterType=false
+import os
+import re
+
+import pytest
+from conftest import convert, discover  # pyright: ignore[reportImplicitRelativeImport]
+
+from pdj_sitegen.schedule import (
+	ProgressEstimate,
+	format_duration,
+	longest_first,
+	page_costs,
+)
+
+
+class TestCostModel:
+	"""Tests for estimating page costs and ordering pages by them."""
+
+	def test_page_costs(self):
+		times = {"a": 4.0, "b": 1.0, "c": 2.0, "gone": 100.0}
+		assert page_costs(["a", "b", "c", "new"], times) == {
+			"a": 4.0,
+			"b": 1.0,
+			"c": 2.0,
+			"new": 2.0,
+		}
+		assert page_costs(["x", "y"], {}) == {"x": 1.0, "y": 1.0}
+
+	def test_longest_first(self):
+		costs = {"a": 1.0, "b": 30.0, "c": 1.0, "d": 5.0}
+		assert longest_first(costs) == ["b", "d", "a", "c"]
+
+	@pytest.mark.parametrize(
+		("seconds", "expected"),
+		[(None, "?:??"), (0, "0:00"), (65.4, "1:05"), (3725, "1:02:05")],
+	)
+	def test_format_duration(self, seconds, expected):
+		assert format_duration(seconds) == expected
+
+
+class TestProgressEstimate:
+	"""Tests for the estimated time left."""
+
+	def test_before_any_page(self):
+		progress = ProgressEstimate({"a": 6.0, "b": 2.0}, jobs=2)
+		assert progress.fraction == 0
+		assert progress.remaining() == 4.0
+		assert ProgressEstimate({"a": 1.0}, timed=False).remaining() is None
+
+	def test_rate_from_done_pages(self, monkeypatch):
+		now = [100.0]
+		monkeypatch.setattr("pdj_sitegen.schedule.time.perf_counter", lambda: now[0])
+		progress = ProgressEstimate({"a": 6.0, "b": 2.0, "c": 2.0})
+		progress.done("c", skipped=True)
+		now[0] = 103.0
+		progress.done("a")
+		progress.done("a")
+		# 3s for 6 units of cost, so 1s for the remaining 2
+		assert progress.fraction == 0.8
+		assert progress.remaining() == 1.0
+		assert progress.format() == " 80%, 0:01 left"
+
+	def test_empty(self):
+		assert ProgressEstimate({}).fraction == 1.0
+
+
+def _bodies(*names: str) -> dict[str, str]:
+	return {name: name for name in names}
+
+
+def _started(output: str) -> list[str]:
+	return re.findall(r"\[building\.\.\]  '.*/(\w+)\.md'", output)
+
+
+class TestScheduling:
+	"""Tests for converting pages in order of their last conversion time."""
+
+	def test_serial_keeps_document_order(
+		self, tmp_path, fake_pandoc, make_site, capsys
+	):
+		fake_pandoc()
+		config, docs = discover(make_site(_bodies("a", "b", "c")))
+		page_times = {"c": 9.0, "b": 0.5}
+		convert(tmp_path, config, docs, verbose=True, page_times=page_times)
+		output = capsys.readouterr().out
+		assert _started(output) == list(docs)
+		# "a" has no recorded time, so it counts as the median, 4.75
+		assert "(  0%, 0:14 left)  [building..]" in output
+		assert set(page_times) == {"a", "b", "c"}
+		assert page_times["c"] < 9.0
+
+	@pytest.mark.skipif(
+		os.name != "posix", reason="patches pandoc in the parent, needs fork"
+	)
+	def test_longest_first_in_processes(self, tmp_path, fake_pandoc, make_site, capsys):
+		fake_pandoc()
+		config, docs = discover(make_site(_bodies("a", "b", "c", "d", "e")))
+		page_times = {"a": 0.1, "b": 0.2, "d": 30.0, "e": 5.0}
+		convert(
+			tmp_path,
+			config,
+			docs,
+			verbose=True,
+			jobs=2,
+			executor="process",
+			page_times=page_times,
+		)
+		# 'c' has no recorded time, so it counts as the median, 2.6
+		assert _started(capsys.readouterr().out) == ["d", "e", "c", "b", "a"]
+		assert set(page_times) == {"a", "b", "c", "d", "e"}
+		assert (tmp_path / "output" / "d.html").read_text() == "<p>d</p>"
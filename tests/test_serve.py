@@ -0,0 +1,154 @@
+# pyright: reportMissingParameterType=false
+import os
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+import pytest
+
+from pdj_sitegen.serve import (
+	EVENTS_PATH,
+	RELOAD_SCRIPT,
+	DevServer,
+	ServeState,
+	inject_reload_script,
+)
+
+
+def _touch(path: Path, content: str) -> None:
+	old_mtime_ns: int = path.stat().st_mtime_ns if path.exists() else 0
+	path.write_text(content)
+	st = path.stat()
+	if st.st_mtime_ns <= old_mtime_ns:
+		os.utime(path, ns=(st.st_atime_ns, old_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def converted(monkeypatch):
+	"""replace pandoc with a passthrough and record which sources were converted"""
+	sources: list[str] = []
+
+	def fake_convert_text(source, to, format, extra_args):
+		sources.append(source)
+		return f"<main>{source}</main>"
+
+	monkeypatch.setattr(pypandoc, "convert_text", fake_convert_text)
+	return sources
+
+
+@pytest.fixture
+def server(tmp_path, converted):
+	(tmp_path / "content" / "blog").mkdir(parents=True)
+	(tmp_path / "templates").mkdir()
+	(tmp_path / "config.yml").write_text("cache_dir: null\n")
+	(tmp_path / "templates" / "default.html.jinja2").write_text(
+		"<html><body>{{ __content__ }}</body></html>"
+	)
+	(tmp_path / "content" / "index.md").write_text("---\ntitle: Home\n---\nhome")
+	(tmp_path / "content" / "blog" / "_index.md").write_text(
+		"---\ntitle: Blog\n---\nblog"
+	)
+	(tmp_path / "content" / "style.css").write_text("body {}")
+
+	state = ServeState(tmp_path / "config.yml", verbose=False)
+	state.build_all()
+	# tests call poll() to control when changes are seen
+	srv = DevServer(state, ("127.0.0.1", 0), poll_interval=3600)
+	thread = threading.Thread(target=srv.serve_forever, daemon=True)
+	thread.start()
+	yield srv
+	srv.shutdown()
+	srv.server_close()
+
+
+def _get(srv, path):
+	url: str = f"http://127.0.0.1:{srv.server_address[1]}{path}"
+	with urllib.request.urlopen(url, timeout=5) as response:
+		return response.status, response.headers["Content-Type"], response.read()
+
+
+def test_inject_reload_script():
+	assert inject_reload_script("<body>x</BODY>") == f"<body>x{RELOAD_SCRIPT}</BODY>"
+	assert inject_reload_script("x") == f"x{RELOAD_SCRIPT}"
+
+
+class TestServe:
+	"""Tests for the development server."""
+
+	def test_startup_is_discovery_only(self, server, converted):
+		assert len(server.state.docs) == 2
+		assert converted == []
+		assert not (server.state.output_dir / "index.html").exists()
+
+	def test_render_on_demand_and_cache(self, server, converted):
+		status, content_type, body = _get(server, "/")
+		assert status == 200
+		assert content_type.startswith("text/html")
+		assert b"<main>home</main>" in body
+		assert RELOAD_SCRIPT.encode() in body
+
+		_get(server, "/index.html")
+		assert converted == ["home"]
+		assert _get(server, "/blog/")[2].count(b"<main>blog</main>") == 1
+		assert _get(server, "/blog")[0] == 200
+		assert converted == ["home", "blog"]
+
+	def test_changed_source_rerendered(self, server, converted):
+		_get(server, "/")
+		_touch(server.state.content_dir / "index.md", "---\ntitle: Home\n---\nnew home")
+		# requests use the last polled state
+		assert b"<main>home</main>" in _get(server, "/")[2]
+		server.poll()
+		assert b"<main>new home</main>" in _get(server, "/")[2]
+		assert converted == ["home", "new home"]
+
+	def test_static_files(self, server):
+		status, content_type, body = _get(server, "/style.css")
+		assert (status, content_type, body) == (200, "text/css", b"body {}")
+		with pytest.raises(urllib.error.HTTPError) as exc_info:
+			_get(server, "/missing.png")
+		assert exc_info.value.code == 404
+		with pytest.raises(urllib.error.HTTPError) as exc_info:
+			_get(server, "/index.md")
+		assert exc_info.value.code == 404
+
+	def test_render_error_page(self, server):
+		_touch(
+			server.state.content_dir / "index.md", "---\ntitle: Home\n---\n{{ broken"
+		)
+		server.poll()
+		with pytest.raises(urllib.error.HTTPError) as exc_info:
+			_get(server, "/")
+		assert exc_info.value.code == 500
+		assert RELOAD_SCRIPT.encode() in exc_info.value.read()
+
+	def test_reload_event(self, server):
+		url: str = f"http://127.0.0.1:{server.server_address[1]}{EVENTS_PATH}"
+		with urllib.request.urlopen(url, timeout=5) as stream:
+			assert stream.headers["Content-Type"] == "text/event-stream"
+			assert stream.readline() == b"retry: 1000\n"
+			stream.readline()
+			_touch(server.state.content_dir / "index.md", "---\ntitle: Home\n---\nx")
+			server.poll()
+			assert stream.readline() == b"event: reload\n"
+			assert stream.readline().startswith(b"data: ")
+
+	def test_output_dir_untouched(self, server, tmp_path):
+		output = tmp_path / "output"
+		output.mkdir()
+		(output / "index.html").write_text("old build")
+		(output / "blog").mkdir()
+		(output / "blog" / "index.html").write_text("old blog")
+		(server.state.content_dir / "blog" / "_index.md").unlink()
+		_touch(server.state.content_dir / "style.css", "body { color: red }")
+		(server.state.content_dir / "new.css").write_text("p {}")
+		server.poll()
+		assert _get(server, "/style.css")[2] == b"body { color: red }"
+		assert _get(server, "/new.css")[2] == b"p {}"
+		assert sorted(p.relative_to(output).as_posix() for p in output.rglob("*")) == [
+			"blog",
+			"blog/index.html",
+			"index.html",
+		]
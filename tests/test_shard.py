@@ -0,0 +1,181 @@
+# pyright: reportMissingParameterType=false
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from pdj_sitegen.build import pipeline
+from pdj_sitegen.cache import load_page_times, save_page_times
+from pdj_sitegen.shard import (
+	SHARD_MANIFEST_FNAME,
+	ShardSpec,
+	assign_pages,
+	file_shard,
+	merge_shards,
+	read_manifests,
+	write_manifest,
+)
+
+
+class TestShardSpec:
+	"""Tests for parsing `--shard K/N`."""
+
+	def test_parse(self):
+		assert ShardSpec.parse("2/4") == ShardSpec(2, 4)
+		assert str(ShardSpec.parse("1/1")) == "1/1"
+
+	@pytest.mark.parametrize("text", ["0/4", "5/4", "2", "a/b", "1/0", "-1/2"])
+	def test_invalid(self, text):
+		with pytest.raises(ValueError, match="invalid shard"):
+			ShardSpec.parse(text)
+
+
+class TestAssignPages:
+	"""Tests for the cost-balanced assignment of pages to shards."""
+
+	def test_longest_first(self):
+		times = {"a": 10.0, "b": 6.0, "c": 5.0, "d": 4.0, "e": 1.0}
+		assignment = assign_pages(times, times, 2)
+		assert list(assignment) == list(times)
+		assert assignment == {"a": 1, "b": 2, "c": 2, "d": 1, "e": 2}
+
+	def test_unknown_pages_cost_the_median(self):
+		# 'new' counts as 2.0, so it goes with 'c' rather than with 'a'
+		times = {"a": 5.0, "b": 2.0, "c": 1.0}
+		assignment = assign_pages(["a", "b", "c", "new"], times, 2)
+		assert assignment == {"a": 1, "b": 2, "c": 2, "new": 2}
+
+	def test_no_history(self):
+		assignment = assign_pages([f"p{i}" for i in range(7)], {}, 3)
+		assert sorted(assignment.values()) == [1, 1, 1, 2, 2, 3, 3]
+
+	def test_independent_of_order(self):
+		keys = [f"page{i}" for i in range(20)]
+		times = {k: float(i % 7) for i, k in enumerate(keys)}
+		assert assign_pages(keys, times, 3) == assign_pages(reversed(keys), times, 3)
+
+	def test_file_shard(self):
+		shards = [file_shard(f"img/{i}.png", 3) for i in range(30)]
+		assert set(shards) == {1, 2, 3}
+		assert shards == [file_shard(f"img/{i}.png", 3) for i in range(30)]
+
+
+def test_page_times_cache(tmp_path):
+	assert load_page_times(None) == {}
+	assert load_page_times(tmp_path) == {}
+	save_page_times(tmp_path / "cache", {"b": 0.5, "a": 1})
+	assert load_page_times(tmp_path / "cache") == {"a": 1.0, "b": 0.5}
+	(tmp_path / "cache" / "page_times.json").write_text("[1, 2]")
+	assert load_page_times(tmp_path / "cache") == {}
+
+
+class TestMerge:
+	"""Tests for combining shard outputs."""
+
+	def _shard(self, root: Path, index: int, files: dict[str, str]) -> Path:
+		out = root / f"shard{index}"
+		for rel_path, content in files.items():
+			(out / rel_path).parent.mkdir(parents=True, exist_ok=True)
+			(out / rel_path).write_text(content)
+		assignment = {"a": 1, "b": 2}
+		write_manifest(out, ShardSpec(index, 2), assignment, {"a": 1.0, "b": 2.0})
+		return out
+
+	def test_merge(self, tmp_path):
+		dirs = [
+			self._shard(tmp_path, 1, {"a.html": "A", "img/x.png": "X"}),
+			self._shard(tmp_path, 2, {"b.html": "B", "img/x.png": "X"}),
+		]
+		manifest = json.loads((dirs[0] / SHARD_MANIFEST_FNAME).read_text())
+		assert manifest["pages"] == ["a"] and manifest["page_times"] == {"a": 1.0}
+
+		n_copied = merge_shards(
+			dirs, tmp_path / "out", cache_dir=tmp_path / "cache", verbose=False
+		)
+		assert n_copied == 3
+		assert sorted(
+			p.relative_to(tmp_path / "out").as_posix()
+			for p in (tmp_path / "out").rglob("*")
+			if p.is_file()
+		) == ["a.html", "b.html", "img/x.png"]
+		assert load_page_times(tmp_path / "cache") == {"a": 1.0, "b": 2.0}
+
+	def test_merge_into_shard_dir(self, tmp_path):
+		dirs = [
+			self._shard(tmp_path, 1, {"a.html": "A"}),
+			self._shard(tmp_path, 2, {"b.html": "B"}),
+		]
+		merge_shards(dirs, dirs[0], verbose=False)
+		assert (dirs[0] / "b.html").read_text() == "B"
+		assert not (dirs[0] / SHARD_MANIFEST_FNAME).exists()
+
+	def test_conflict(self, tmp_path):
+		dirs = [
+			self._shard(tmp_path, 1, {"x.html": "one"}),
+			self._shard(tmp_path, 2, {"x.html": "two"}),
+		]
+		with pytest.raises(ValueError, match="conflicting outputs for 'x.html'"):
+			merge_shards(dirs, tmp_path / "out", verbose=False)
+
+	def test_missing_shard(self, tmp_path):
+		dirs = [self._shard(tmp_path, 1, {}), self._shard(tmp_path, 1, {})]
+		with pytest.raises(ValueError, match="expected shards 1 to 2"):
+			read_manifests(dirs)
+		with pytest.raises(ValueError, match="not the output of a sharded build"):
+			read_manifests([tmp_path / "nowhere"])
+
+	def test_different_assignment(self, tmp_path):
+		dirs = [self._shard(tmp_path, 1, {}), self._shard(tmp_path, 2, {})]
+		write_manifest(dirs[1], ShardSpec(2, 2), {"a": 2, "b": 1}, {})
+		with pytest.raises(ValueError, match="assigned pages differently"):
+			read_manifests(dirs)
+
+
+def _make_site(make_site, root: Path) -> Path:
+	make_site(
+		{
+			name: f"body of {name}"
+			for name in ("index", "about", "blog/post1", "blog/post2", "blog/post3")
+		},
+		root=root,
+		template="<title>{{ title }}</title>{{ __content__ }}",
+		config="cache_dir: .cache\n",
+		files={f"blog/image{i}.txt": f"image {i}" for i in range(6)},
+	)
+	return root / "config.yml"
+
+
+def _output(root: Path) -> dict[str, str]:
+	return {
+		p.relative_to(root / "output").as_posix(): p.read_text()
+		for p in (root / "output").rglob("*")
+		if p.is_file()
+	}
+
+
+def test_sharded_build(tmp_path, fake_pandoc, make_site):
+	fake_pandoc()
+	pipeline(_make_site(make_site, tmp_path / "full"), verbose=False)
+	expected = _output(tmp_path / "full")
+	times = load_page_times(tmp_path / "full" / ".cache")
+	assert set(times) == {"index", "about", "blog/post1", "blog/post2", "blog/post3"}
+
+	# every machine starts from the same timing history
+	for index in (1, 2):
+		site = tmp_path / f"machine{index}"
+		_make_site(make_site, site)
+		shutil.copytree(tmp_path / "full" / ".cache", site / ".cache")
+		pipeline(site / "config.yml", verbose=False, shard=ShardSpec(index, 2))
+	shard_outputs = [_output(tmp_path / f"machine{i}") for i in (1, 2)]
+	assert all(SHARD_MANIFEST_FNAME in out for out in shard_outputs)
+	assert not set(shard_outputs[0]) & set(shard_outputs[1]) - {SHARD_MANIFEST_FNAME}
+
+	merge_shards(
+		[tmp_path / "machine1" / "output", tmp_path / "machine2" / "output"],
+		tmp_path / "machine1" / "output",
+		cache_dir=tmp_path / "machine1" / ".cache",
+		verbose=False,
+	)
+	assert _output(tmp_path / "machine1") == expected
+	assert set(load_page_times(tmp_path / "machine1" / ".cache")) == set(times)
@@ -0,0 +1,128 @@
+# pyright: reportMissingParameterType=false
+import os
+import pickle
+from pathlib import Path
+
+import pytest
+from conftest import convert, discover  # pyright: ignore[reportImplicitRelativeImport]
+
+from pdj_sitegen.config import Config
+from pdj_sitegen.document import BodyRef, Document, FileMeta
+from pdj_sitegen.exceptions import ConversionError
+from pdj_sitegen.shared_docs import SharedDocs, write_shared_docs
+
+TEMPLATE: str = "<title>{{ title }}</title>{{ __content__ }}"
+
+
+def _docs() -> dict[str, Document]:
+	return {
+		name: Document(
+			{"title": name, "tags": ["a", "b"]},
+			BodyRef(f"/content/{name}.md", 12),
+			FileMeta(name, f"/content/{name}.md", 1.5),
+		)
+		for name in ("index", "blog/post", "blog/other", "about")
+	}
+
+
+class TestSharedDocs:
+	"""Tests for the memory-mapped document index."""
+
+	def test_round_trip(self, tmp_path):
+		docs = _docs()
+		size = write_shared_docs(docs, tmp_path / "docs.bin")
+		assert size == (tmp_path / "docs.bin").stat().st_size
+		shared = SharedDocs(tmp_path / "docs.bin")
+		assert list(shared) == list(docs)
+		assert len(shared) == 4
+		assert "blog/post" in shared and "missing" not in shared
+		assert dict(shared) == docs
+		assert shared["blog/post"]["file_meta"]["path_html"] == "blog/post.html"
+		with pytest.raises(KeyError):
+			shared["missing"]
+		shared.close()
+
+	def test_without_bodies(self, tmp_path):
+		write_shared_docs(_docs(), tmp_path / "docs.bin")
+		shared = SharedDocs(tmp_path / "docs.bin", bodies=False)
+		assert "body" not in shared["index"]
+		assert shared["index"]["frontmatter"] == {"title": "index", "tags": ["a", "b"]}
+
+	def test_plain_mappings(self, tmp_path):
+		docs = {"x": {"frontmatter": {"a": 1}, "body": "text", "file_meta": {"p": 1}}}
+		write_shared_docs(docs, tmp_path / "docs.bin")
+		assert SharedDocs(tmp_path / "docs.bin")["x"] == docs["x"]
+
+	def test_lazy_and_cached(self, tmp_path):
+		write_shared_docs(_docs(), tmp_path / "docs.bin")
+		shared = SharedDocs(tmp_path / "docs.bin")
+		assert shared["index"] is shared["index"]
+		assert list(shared._docs) == ["index"]
+		docs = [shared[key] for key in shared]
+		assert all(shared[key] is doc for key, doc in zip(shared, docs))
+		shared.clear_cache()
+		assert shared._docs == {}
+		assert shared["index"] == docs[0] and shared["index"] is not docs[0]
+
+	def test_pickles_as_path(self, tmp_path):
+		write_shared_docs(_docs(), tmp_path / "docs.bin")
+		shared = SharedDocs(tmp_path / "docs.bin", bodies=False)
+		data = pickle.dumps(shared)
+		assert len(data) < 300
+		restored = pickle.loads(data)
+		assert restored.bodies is False
+		assert dict(restored) == dict(shared)
+
+
+@pytest.mark.skipif(
+	os.name != "posix", reason="patches pandoc in the parent, needs fork"
+)
+class TestProcessExecutor:
+	"""Tests for converting pages in worker processes."""
+
+	def test_convert(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc("<p>{source}</p><pid>{pid}</pid>")
+		bodies = {
+			"index": "{% for k in docs | sort %}{{ k }};{% endfor %}",
+			**{
+				f"blog/p{i}": f"post {i} of {{{{ docs | length }}}}, {{{{ child_docs_folder | length }}}}"
+				for i in range(6)
+			},
+		}
+		config, docs = discover(
+			make_site(bodies, template=TEMPLATE), Config(intermediates_dir=Path("_im"))
+		)
+		convert(
+			tmp_path,
+			config,
+			docs,
+			intermediates_dir=tmp_path / "_im",
+			jobs=2,
+			executor="process",
+		)
+		out = tmp_path / "output"
+		assert "<p>post 3 of 7, 5</p>" in (out / "blog" / "p3.html").read_text()
+		index = (out / "index.html").read_text()
+		assert "blog/p0;" in index and "blog/p5;" in index
+		pids = {
+			(out / f"{name}.html").read_text().split("<pid>")[1].split("<")[0]
+			for name in bodies
+		}
+		assert str(os.getpid()) not in pids
+		# intermediates of the workers are written by the parent
+		assert (
+			tmp_path / "_im" / "md" / "blog" / "p3.md"
+		).read_text() == "post 3 of 7, 5"
+
+	def test_errors_raised_in_parent(self, tmp_path, fake_pandoc, make_site):
+		fake_pandoc()
+		config, docs = discover(make_site({"index": "ok", "blog/bad": "fail here"}))
+		with pytest.raises(ConversionError, match="bad.md") as exc_info:
+			convert(tmp_path, config, docs, jobs=2, executor="process")
+		assert isinstance(exc_info.value.__cause__, RuntimeError)
+		assert (tmp_path / "output" / "index.html").exists()
+
+	def test_invalid_executor(self, tmp_path, make_site):
+		config, docs = discover(make_site({"index": "ok"}))
+		with pytest.raises(ValueError, match="executor"):
+			convert(tmp_path, config, docs, executor="threads")
@@ -0,0 +1,153 @@
+# pyright: reportMissingParameterType=false
+from pathlib import Path
+
+import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+import pytest
+
+from pdj_sitegen.build import (
+	build_document_tree,
+	create_jinja_env,
+	pipeline,
+	prewarm_templates,
+)
+from pdj_sitegen.cache import TEMPLATE_BYTECODE_DIRNAME
+from pdj_sitegen.config import Config
+from pdj_sitegen.document import BodyRef, Document, FileMeta
+from pdj_sitegen.exceptions import RenderError
+
+
+def _doc(path: str, frontmatter: dict) -> Document:
+	return Document(frontmatter, "", FileMeta(path, f"content/{path}.md", 0.0))
+
+
+@pytest.fixture
+def site(tmp_path) -> Path:
+	templates: Path = tmp_path / "templates"
+	templates.mkdir()
+	(templates / "default.html.jinja2").write_text("{{ __content__ }}")
+	(templates / "base.html.jinja2").write_text(
+		"<main>{% block main %}{% endblock %}</main>"
+	)
+	(templates / "page.html.jinja2").write_text(
+		'{% extends "base.html.jinja2" %}{% block main %}{{ __content__ }}{% endblock %}'
+	)
+	return tmp_path
+
+
+class TestPrewarmTemplates:
+	"""Tests for compiling templates before conversion."""
+
+	def test_compiles_used_templates(self, site):
+		config = Config()
+		jinja_env = create_jinja_env(config, site)
+		docs = {"a": _doc("a", {"__template__": "page.html.jinja2"})}
+		names = prewarm_templates(jinja_env, docs, config)
+		assert names == ["base.html.jinja2", "default.html.jinja2", "page.html.jinja2"]
+		# compiled templates are reused from the environment's cache
+		assert jinja_env.get_template("page.html.jinja2") is jinja_env.get_template(
+			"page.html.jinja2"
+		)
+
+	def test_ignores_other_files(self, site):
+		templates: Path = site / "templates"
+		(templates / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\xff\xfe")
+		(templates / "script.js").write_text("let re = /{#/;")
+		(templates / "unused.html.jinja2").write_text("{% if x %}unclosed")
+		config = Config()
+		names = prewarm_templates(create_jinja_env(config, site), {}, config)
+		assert names == ["default.html.jinja2"]
+
+	def test_syntax_error_in_included_template(self, site):
+		templates: Path = site / "templates"
+		(templates / "default.html.jinja2").write_text(
+			'{% include "partial.html.jinja2" %}{% include "opt.html" ignore missing %}'
+			"{% include name %}{{ __content__ }}"
+		)
+		(templates / "partial.html.jinja2").write_text("{% if x %}unclosed")
+		config = Config()
+		with pytest.raises(RenderError) as exc_info:
+			prewarm_templates(create_jinja_env(config, site), {}, config)
+		assert exc_info.value.kind == "create_template"
+		assert "partial.html.jinja2" in exc_info.value.message
+		assert exc_info.value.content == "{% if x %}unclosed"
+
+		# templates which can be missing, or are only known when rendering, are skipped
+		(templates / "partial.html.jinja2").write_text("ok")
+		names = prewarm_templates(create_jinja_env(config, site), {}, config)
+		assert names == ["default.html.jinja2", "partial.html.jinja2"]
+
+	def test_missing_referenced_template(self, site):
+		config = Config()
+		docs = {
+			"blog/post": _doc("blog/post", {"__template__": "missing.html.jinja2"}),
+			"index": _doc("index", {}),
+		}
+		with pytest.raises(RenderError, match="missing.html.jinja2") as exc_info:
+			prewarm_templates(create_jinja_env(config, site), docs, config)
+		assert "'blog/post'" in exc_info.value.message
+		assert exc_info.value.content is None
+
+	def test_bytecode_cache(self, site):
+		config = Config(cache_dir=Path("cache"))
+		docs = {"a": _doc("a", {"__template__": "page.html.jinja2"})}
+		prewarm_templates(create_jinja_env(config, site), docs, config)
+		bytecode_dir: Path = site / "cache" / TEMPLATE_BYTECODE_DIRNAME
+		assert len(list(bytecode_dir.iterdir())) == 3
+
+		# a new environment, like the next build, loads the compiled templates
+		jinja_env = create_jinja_env(config, site)
+		assert jinja_env.bytecode_cache is not None
+		assert (
+			jinja_env.get_template("page.html.jinja2").render(__content__="x")
+			== "<main>x</main>"
+		)
+
+	def test_no_bytecode_cache_without_cache_dir(self, site):
+		assert create_jinja_env(Config(), site).bytecode_cache is None
+
+
+def test_pipeline_fails_before_conversion(site, monkeypatch):
+	converted: list[str] = []
+
+	def convert_text(source, to, format, extra_args):
+		converted.append(source)
+		return source
+
+	monkeypatch.setattr(pypandoc, "convert_text", convert_text)
+	(site / "templates" / "rare.html.jinja2").write_text("{{ broken ")
+	(site / "templates" / "default.html.jinja2").write_text(
+		'{{ __content__ }}{% if false %}{% include "rare.html.jinja2" %}{% endif %}'
+	)
+	(site / "content").mkdir()
+	(site / "content" / "index.md").write_text("---\ntitle: index\n---\nbody")
+	(site / "config.yml").write_text("cache_dir: null\n")
+
+	with pytest.raises(RenderError, match="rare.html.jinja2"):
+		pipeline(site / "config.yml", verbose=False)
+	assert converted == []
+	assert not (site / "output").exists()
+
+
+def test_lazy_body_in_templates(tmp_path):
+	(tmp_path / "post.md").write_text(
+		"---\ntitle: post\n---\nThe quick brown fox jumps over the lazy dog, twice."
+	)
+	config = Config()
+	jinja_env = create_jinja_env(config, tmp_path)
+	docs = build_document_tree(
+		content_dir=tmp_path,
+		frontmatter_context={},
+		jinja_env=jinja_env,
+		verbose=False,
+	)
+	body = docs["post"].body
+	assert isinstance(body, BodyRef)
+	template = jinja_env.from_string(
+		"{% set b = docs['post'].body %}"
+		"{{ b | length }}|{{ b | truncate(20) }}|{{ b[:9] }}|{{ 'fox' in b }}"
+		"|{{ b.split() | length }}|{{ b.upper()[:3] }}|{{ b ~ '!' }}"
+	)
+	assert template.render(docs=docs) == (
+		"51|The quick brown...|The quick|True|10|THE"
+		"|The quick brown fox jumps over the lazy dog, twice.!"
+	)
@@ -0,0 +1,252 @@
+# pyright: reportMissingParameterType=false
+import os
+from pathlib import Path
+
+import pypandoc  # type: ignore[import-untyped]  # pyright: ignore[reportMissingTypeStubs]
+import pytest
+
+from pdj_sitegen.exceptions import ConversionError, MultipleExceptions
+from pdj_sitegen.watch import PageDeps, WatchState, diff_snapshots, snapshot_dir
+
+
+def _touch(path: Path, content: str) -> None:
+	"""write `content` and make sure the mtime moves forward, even on coarse filesystems"""
+	old_mtime_ns: int = path.stat().st_mtime_ns if path.exists() else 0
+	path.write_text(content)
+	st = path.stat()
+	if st.st_mtime_ns <= old_mtime_ns:
+		os.utime(path, ns=(st.st_atime_ns, old_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def converted(monkeypatch):
+	"""replace pandoc with a passthrough and record which sources were converted"""
+	sources: list[str] = []
+
+	def fake_convert_text(source, to, format, extra_args):
+		sources.append(source)
+		return f"<main>{source}</main>"
+
+	monkeypatch.setattr(pypandoc, "convert_text", fake_convert_text)
+	return sources
+
+
+@pytest.fixture
+def site(tmp_path):
+	root: Path = tmp_path
+	(root / "content" / "blog").mkdir(parents=True)
+	(root / "templates").mkdir()
+	(root / "config.yml").write_text(
+		"content_dir: content\n"
+		"templates_dir: templates\n"
+		"output_dir: output\n"
+		"default_template: default.html.jinja2\n"
+		"cache_dir: null\n"
+	)
+	(root / "templates" / "default.html.jinja2").write_text(
+		"{% include 'footer.html.jinja2' %}<title>{{ title }}</title>{{ __content__ }}"
+	)
+	(root / "templates" / "footer.html.jinja2").write_text("<footer/>")
+	(root / "templates" / "plain.html.jinja2").write_text("{{ __content__ }}")
+	(root / "content" / "index.md").write_text(
+		"---\ntitle: Home\n---\n"
+		"{% for k, d in docs.items() %}[{{ d.frontmatter.title }}]{% endfor %}"
+	)
+	(root / "content" / "about.md").write_text(
+		"---\ntitle: About\n__template__: plain.html.jinja2\n---\nabout body"
+	)
+	(root / "content" / "blog" / "post.md").write_text(
+		"---\ntitle: Post\n---\npost body"
+	)
+	(root / "content" / "blog" / "files.md").write_text(
+		"---\ntitle: Files\n---\n{{ dir_files | sort | join(',') }}"
+	)
+	(root / "content" / "style.css").write_text("body {}")
+	return root
+
+
+def _state(site):
+	state = WatchState(site / "config.yml", verbose=False)
+	state.build_all()
+	return state
+
+
+def _read(site, rel):
+	return (site / "output" / rel).read_text()
+
+
+class TestSnapshots:
+	"""Tests for snapshot_dir and diff_snapshots."""
+
+	def test_snapshot_and_diff(self, tmp_path):
+		(tmp_path / "a").mkdir()
+		(tmp_path / "a" / "x.md").write_text("x")
+		(tmp_path / "y.md").write_text("y")
+		old = snapshot_dir(tmp_path)
+		assert set(old) == {
+			(tmp_path / "a" / "x.md").as_posix(),
+			(tmp_path / "y.md").as_posix(),
+		}
+
+		_touch(tmp_path / "y.md", "yy")
+		(tmp_path / "a" / "x.md").unlink()
+		(tmp_path / "z.md").write_text("z")
+		added, removed, modified = diff_snapshots(old, snapshot_dir(tmp_path))
+		assert added == {(tmp_path / "z.md").as_posix()}
+		assert removed == {(tmp_path / "a" / "x.md").as_posix()}
+		assert modified == {(tmp_path / "y.md").as_posix()}
+
+	def test_missing_dir(self, tmp_path):
+		assert snapshot_dir(tmp_path / "nope") == {}
+
+
+class TestWatchState:
+	"""Tests for incremental rebuilds in WatchState."""
+
+	def test_initial_build(self, site, converted):
+		_state(site)
+		assert _read(site, "index.html").count("[") == 4
+		assert "about body" in _read(site, "about.html")
+		assert _read(site, "blog/files.html").endswith("files.md,post.md</main>")
+		assert _read(site, "style.css") == "body {}"
+
+	def test_no_changes(self, site, converted):
+		state = _state(site)
+		converted.clear()
+		assert state.poll() is None
+		assert converted == []
+
+	def test_body_edit_converts_one_page(self, site, converted):
+		state = _state(site)
+		converted.clear()
+		_touch(site / "content" / "blog" / "post.md", "---\ntitle: Post\n---\nnew body")
+
+		assert state.poll() == 1
+		assert converted == ["new body"]
+		assert "new body" in _read(site, "blog/post.html")
+
+	def test_body_edit_converts_body_readers(self, site, converted):
+		(site / "content" / "latest.md").write_text(
+			"---\ntitle: Latest\n---\n"
+			"{% for k, d in docs.items() %}({{ d.body | truncate(9, leeway=0) }}){% endfor %}"
+		)
+		(site / "content" / "recent.md").write_text(
+			"---\ntitle: Recent\n---\n"
+			"{{ docs.values() | sort(attribute='file_meta.modified_time') | length }}"
+		)
+		state = _state(site)
+		converted.clear()
+		_touch(site / "content" / "blog" / "post.md", "---\ntitle: Post\n---\nnew body")
+
+		# not index, which only reads frontmatter
+		assert state.poll() == 3
+		assert "(new body)" in _read(site, "latest.html")
+
+	def test_frontmatter_edit_converts_docs_users(self, site, converted):
+		state = _state(site)
+		converted.clear()
+		_touch(site / "content" / "about.md", "---\ntitle: About Us\n---\nabout body")
+
+		assert state.poll() == 2
+		assert "[About Us]" in _read(site, "index.html")
+		# template changed from plain to default
+		assert "<footer/>" in _read(site, "about.html")
+
+	def test_included_template_edit(self, site, converted):
+		"""Test editing an included template rebuilds only the pages that use it."""
+		state = _state(site)
+		converted.clear()
+		_touch(site / "templates" / "footer.html.jinja2", "<footer>new</footer>")
+
+		assert state.poll() == 3
+		assert "<footer>new</footer>" in _read(site, "blog/post.html")
+		assert "footer" not in _read(site, "about.html")
+
+	def test_add_and_remove_page(self, site, converted):
+		state = _state(site)
+		converted.clear()
+		(site / "content" / "blog" / "new.md").write_text(
+			"---\ntitle: New\n---\nnew post"
+		)
+
+		# the new page, index (uses docs), and files (uses dir_files)
+		assert state.poll() == 3
+		assert "[New]" in _read(site, "index.html")
+		assert "files.md,new.md,post.md" in _read(site, "blog/files.html")
+
+		(site / "content" / "blog" / "new.md").unlink()
+		assert state.poll() == 2
+		assert not (site / "output" / "blog" / "new.html").exists()
+		assert "[New]" not in _read(site, "index.html")
+
+	def test_resource_files(self, site, converted):
+		state = _state(site)
+		_touch(site / "content" / "style.css", "body { color: red }")
+		assert state.poll() == 0
+		assert _read(site, "style.css") == "body { color: red }"
+
+		(site / "content" / "style.css").unlink()
+		state.poll()
+		assert not (site / "output" / "style.css").exists()
+
+	def test_config_change_rebuilds_all(self, site, converted):
+		state = _state(site)
+		converted.clear()
+		config_path: Path = site / "config.yml"
+		_touch(config_path, config_path.read_text() + "globals_:\n  x: 1\n")
+		assert state.poll() == 4
+		assert len(converted) == 4
+
+	def test_errors_do_not_break_state(self, site, converted):
+		"""Test a failed update is retried on the next change."""
+		state = _state(site)
+		bad = site / "content" / "bad.md"
+		bad.write_text("no frontmatter")
+		with pytest.raises(MultipleExceptions):
+			state.poll()
+		assert state.stale
+
+		_touch(bad, "---\ntitle: Bad\n---\nfixed")
+		assert state.poll() == 5
+		assert not state.stale
+		assert "fixed" in _read(site, "bad.html")
+
+		_touch(site / "content" / "about.md", "---\ntitle: About\n---\n{{ broken")
+		with pytest.raises(ConversionError):
+			state.poll()
+		assert not state.stale
+
+	def test_page_deps(self, site, converted):
+		state = _state(site)
+		assert "docs" in state.page_deps("index").variables
+		assert state.page_deps("index").templates == frozenset(
+			{"default.html.jinja2", "footer.html.jinja2"}
+		)
+		assert state.page_deps("about") == PageDeps(
+			variables=frozenset({"__content__"}),
+			templates=frozenset({"plain.html.jinja2"}),
+		)
+		assert not state.page_deps("index").reads_contents
+
+
+def test_single_edit_latency(tmp_path, converted):
+	"""Benchmark the save-to-refresh latency of a body edit on a larger site."""
+	import time
+
+	(tmp_path / "templates").mkdir()
+	(tmp_path / "templates" / "default.html.jinja2").write_text("{{ __content__ }}")
+	(tmp_path / "config.yml").write_text("cache_dir: null\n")
+	n_pages: int = 500
+	for i in range(n_pages):
+		section: Path = tmp_path / "content" / f"section_{i % 20}"
+		section.mkdir(parents=True, exist_ok=True)
+		(section / f"page_{i}.md").write_text(f"---\ntitle: Page {i}\n---\nBody {i}")
+	state = _state(tmp_path)
+
+	page: Path = tmp_path / "content" / "section_7" / "page_7.md"
+	_touch(page, "---\ntitle: Page 7\n---\nedited")
+	start: float = time.perf_counter()
+	assert state.poll() == 1
+	elapsed: float = time.perf_counter() - start
+	print(f"\nsingle edit rebuild on {n_pages} pages: {elapsed * 1000:.1f} ms")
+	assert elapsed < 1.0